@@ -25,6 +25,136 @@ class Config:
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+    # Workers
+    # Preload fonts, system templates and codecs before taking jobs
+    WORKER_WARMUP = os.getenv('WORKER_WARMUP', 'true').lower() == 'true'
+    # 'fork' = stock RQ (one work-horse per job)
+    # 'persistent' = pool of long-lived processes that keep render caches
+    # 'autoscale' = persistent pool sized to queue demand (AUTOSCALE_*)
+    WORKER_MODE = os.getenv('WORKER_MODE', 'fork')
+    WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', 2))
+    WORKER_MAX_JOBS = int(os.getenv('WORKER_MAX_JOBS', 500))  # 0 = unlimited
+    WORKER_MAX_MEMORY_MB = int(os.getenv('WORKER_MAX_MEMORY_MB', 1024))  # 0 = unlimited
+
+    # Autoscaled pool bounds
+    AUTOSCALE_MIN_WORKERS = int(os.getenv('AUTOSCALE_MIN_WORKERS', 1))
+    AUTOSCALE_MAX_WORKERS = int(os.getenv('AUTOSCALE_MAX_WORKERS', 8))
+    # Scale up past this many waiting jobs per worker...
+    AUTOSCALE_JOBS_PER_WORKER = int(os.getenv('AUTOSCALE_JOBS_PER_WORKER', 10))
+    # ...or once the next job has waited this many seconds
+    AUTOSCALE_MAX_QUEUE_AGE = int(os.getenv('AUTOSCALE_MAX_QUEUE_AGE', 60))
+    # Seconds of low demand before retiring a worker
+    AUTOSCALE_SCALE_DOWN_DELAY = int(os.getenv('AUTOSCALE_SCALE_DOWN_DELAY', 120))
+    # Seconds between pool size changes, and between demand checks
+    AUTOSCALE_COOLDOWN = int(os.getenv('AUTOSCALE_COOLDOWN', 30))
+    AUTOSCALE_INTERVAL = int(os.getenv('AUTOSCALE_INTERVAL', 5))
+
+    # Generation lanes: route by plan tier and request size
+    LANE_ROUTING = os.getenv('LANE_ROUTING', 'true').lower() == 'true'
+    # Requests with at most this many products use the interactive lanes
+    INTERACTIVE_MAX_PRODUCTS = int(os.getenv('INTERACTIVE_MAX_PRODUCTS', 1))
+    # Relative share of worker capacity per lane
+    LANE_WEIGHTS = os.getenv(
+        'LANE_WEIGHTS',
+        'poster-interactive-priority:8,poster-interactive:4,'
+        'poster-bulk-priority:2,poster-bulk:1'
+    )
+
+    # Send each template's jobs (per user) to the same persistent worker,
+    # whose caches already hold it; idle workers steal from the others
+    AFFINITY_ROUTING = os.getenv('AFFINITY_ROUTING', 'false').lower() == 'true'
+    # Affinity queues per lane; one per pool position by default
+    # (WORKER_POOL_SIZE, or AUTOSCALE_MAX_WORKERS when autoscaling)
+    AFFINITY_SLOTS = int(os.getenv('AFFINITY_SLOTS') or (
+        AUTOSCALE_MAX_WORKERS if WORKER_MODE == 'autoscale' else WORKER_POOL_SIZE
+    ))
+    # Seconds an idle worker waits for its own jobs before stealing
+    AFFINITY_STEAL_INTERVAL = int(os.getenv('AFFINITY_STEAL_INTERVAL', 2))
+
+    # Fair share between tenants on the bulk lanes
+    FAIR_SCHEDULING = os.getenv('FAIR_SCHEDULING', 'true').lower() == 'true'
+    # Chunks one tenant may have queued or running per lane
+    # (plans can override with the 'max_concurrent_chunks' feature)
+    FAIR_TENANT_CONCURRENCY = int(os.getenv('FAIR_TENANT_CONCURRENCY', 2))
+    # Chunks kept waiting on each bulk lane; the rest wait per tenant
+    FAIR_LANE_DEPTH = int(os.getenv('FAIR_LANE_DEPTH', 4))
+    # Products of credit per tenant per round (0 = BATCH_CHUNK_SIZE)
+    FAIR_QUANTUM = int(os.getenv('FAIR_QUANTUM', 0))
+
+    # Times an interrupted or failed chunk is retried (it resumes from its checkpoint)
+    BATCH_MAX_RETRIES = int(os.getenv('BATCH_MAX_RETRIES', 2))
+    # Seconds a payload job's upload checkpoint is kept
+    BATCH_CHECKPOINT_TTL = int(os.getenv('BATCH_CHECKPOINT_TTL', 86400))
+
+    # Upload threads per batch job; rendering continues while they upload
+    # (0 = render, upload and save each poster in turn)
+    PIPELINE_UPLOAD_WORKERS = int(os.getenv('PIPELINE_UPLOAD_WORKERS', 4))
+    # Rendered posters allowed in flight before rendering pauses
+    PIPELINE_DEPTH = int(os.getenv('PIPELINE_DEPTH', 8))
+
+    # Max job IDs per bulk status request
+    JOB_STATUS_BATCH_MAX = int(os.getenv('JOB_STATUS_BATCH_MAX', 50))
+
+    # Job status streams: forced status read interval and max connection time
+    JOB_STREAM_HEARTBEAT = int(os.getenv('JOB_STREAM_HEARTBEAT', 15))
+    JOB_STREAM_MAX_SECONDS = int(os.getenv('JOB_STREAM_MAX_SECONDS', 600))
+    # Seconds a single-use stream token stays valid
+    JOB_STREAM_TOKEN_TTL = int(os.getenv('JOB_STREAM_TOKEN_TTL', 60))
+    # Each open stream holds a server worker (or thread) and a Redis
+    # connection: with sync workers, keep JOB_STREAM_MAX_OPEN well below
+    # the worker count, or serve the API with gevent/gthread workers and
+    # size it to what they can hold (0 = unlimited)
+    JOB_STREAM_MAX_PER_USER = int(os.getenv('JOB_STREAM_MAX_PER_USER', 3))
+    JOB_STREAM_MAX_OPEN = int(os.getenv('JOB_STREAM_MAX_OPEN', 20))
+
+    # Seconds an Idempotency-Key keeps returning the same job
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))
+    # Identical generation requests within this many seconds share a job (0 = off)
+    GENERATION_DEDUP_WINDOW = int(os.getenv('GENERATION_DEDUP_WINDOW', 10))
+
+    # Seconds between flushes of quota usage from Redis to the database
+    # (checked on each worker maintenance pass, every 10 minutes by default)
+    QUOTA_SYNC_INTERVAL = int(os.getenv('QUOTA_SYNC_INTERVAL', 600))
+
+    # Render campaign posters ahead of their start date, on the owner's bulk
+    # lane (plans opt in with the 'campaign_prerender' feature)
+    # Seconds between scheduler runs (0 = off)
+    PRERENDER_INTERVAL = int(os.getenv('PRERENDER_INTERVAL', 1800))
+    # Campaigns starting within this many days are pre-rendered
+    PRERENDER_HORIZON_DAYS = int(os.getenv('PRERENDER_HORIZON_DAYS', 3))
+    # Off-peak hours (UTC, 'start-end', may wrap midnight; empty = any time)
+    PRERENDER_HOURS = os.getenv('PRERENDER_HOURS', '0-6')
+
+    # Per-poster batch results are stored in the database (job_results),
+    # not in Redis. Finished jobs and their rows are both kept this many
+    # seconds (it is also the jobs' result_ttl)
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))
+    # Seconds between purges of expired rows (0 = off)
+    RESULT_CLEANUP_INTERVAL = int(os.getenv('RESULT_CLEANUP_INTERVAL', 3600))
+
+    # Re-render posters when their product or template is edited. Off by
+    # default: every re-rendered poster counts against the user's quota
+    RERENDER_ON_CHANGE = os.getenv('RERENDER_ON_CHANGE', 'false').lower() == 'true'
+    # Seconds without edits before a user's changes are re-rendered
+    RERENDER_DEBOUNCE = int(os.getenv('RERENDER_DEBOUNCE', 30))
+    # Re-render at the latest this many seconds after the first edit
+    RERENDER_MAX_DELAY = int(os.getenv('RERENDER_MAX_DELAY', 300))
+
+    # Batches larger than this are split into chunk jobs
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 25))
+    BATCH_CHUNK_TIMEOUT = int(os.getenv('BATCH_CHUNK_TIMEOUT', 900))  # seconds
+    # Posters buffered before a bulk insert + quota update
+    BATCH_FLUSH_SIZE = int(os.getenv('BATCH_FLUSH_SIZE', 25))
+
+    # Snapshot template + product data into the job payload so render
+    # workers need no database round trips
+    SELF_CONTAINED_JOBS = os.getenv('SELF_CONTAINED_JOBS', 'false').lower() == 'true'
+
+    # Decoded image cache (logos, badges, product shots)
+    # Shared = one copy in shared memory for all workers on the host
+    ASSET_CACHE_SHARED = os.getenv('ASSET_CACHE_SHARED', 'false').lower() == 'true'
+    ASSET_CACHE_MAX_MB = int(os.getenv('ASSET_CACHE_MAX_MB', 256))
+
     # AWS S3
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
@@ -1,4 +1,6 @@
 from app.models import User
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import QuotaLedger
 
 class AuthorizationService:
     """Handles user permissions and plan limits"""
@@ -40,7 +42,8 @@ class AuthorizationService:
         if user.plan.monthly_generations == -1:
             return True, ""
         
-        if user.monthly_generations >= user.plan.monthly_generations:
+        # Usage lives in Redis (users.monthly_generations is synced periodically)
+        if QuotaLedger(QueueManager.get_redis_connection()).remaining(user) <= 0:
             return False, f"Monthly generation limit reached ({user.plan.monthly_generations}). Upgrade your plan."
         
         return True, ""
@@ -0,0 +1,139 @@
+from app.extensions import db
+from app.models import Campaign, Product, User
+from app.core.campaigns.rules import CampaignRules
+from app.core.posters.generation_service import PosterGenerationService
+from typing import List, Dict, Any, Optional
+
+class CampaignService:
+    """Resolves campaign rules into products and generates their posters"""
+
+    @staticmethod
+    def get_campaign(campaign_id: int, user: User) -> Campaign:
+        """
+        Get a campaign
+
+        Raises:
+            ValueError: If not found or unauthorized
+        """
+        campaign = db.session.get(Campaign, campaign_id)
+
+        if not campaign or campaign.user_id != user.id:
+            raise ValueError('Campaign not found or unauthorized')
+
+        return campaign
+
+    @staticmethod
+    def product_query(campaign: Campaign, *columns):
+        """
+        Query for the products a campaign's rules select
+
+        A single query on the (user_id, category) index plus price and ID
+        filters; pass columns to load only those.
+
+        Args:
+            campaign: Campaign
+            columns: Columns to select (default: Product.id)
+
+        Raises:
+            ValueError: If the rules are invalid
+        """
+        rules = CampaignRules(campaign.rules)
+
+        query = db.session.query(*(columns or (Product.id,))).filter(
+            Product.user_id == campaign.user_id
+        )
+
+        if rules.categories:
+            query = query.filter(Product.category.in_(rules.categories))
+
+        if rules.min_price is not None:
+            query = query.filter(Product.price >= rules.min_price)
+
+        if rules.max_price is not None:
+            query = query.filter(Product.price <= rules.max_price)
+
+        if rules.product_ids is not None:
+            query = query.filter(Product.id.in_(rules.product_ids))
+
+        if rules.exclude_product_ids:
+            query = query.filter(Product.id.notin_(rules.exclude_product_ids))
+
+        return query.order_by(Product.id)
+
+    @staticmethod
+    def resolve_product_ids(campaign: Campaign) -> List[int]:
+        """
+        IDs of the products a campaign's rules select, in ID order
+
+        Raises:
+            ValueError: If the rules are invalid
+        """
+        return [product_id for (product_id,) in CampaignService.product_query(campaign)]
+
+    @staticmethod
+    def preview(user: User, campaign_id: int, limit: int = 20) -> Dict[str, Any]:
+        """
+        Products a campaign would render, with their derived fields
+
+        Args:
+            user: Current user
+            campaign_id: Campaign ID
+            limit: Products to include
+
+        Returns:
+            dict: Total matching products and the first `limit` of them
+
+        Raises:
+            ValueError: If not found, unauthorized or the rules are invalid
+        """
+        campaign = CampaignService.get_campaign(campaign_id, user)
+        query = CampaignService.product_query(campaign, Product.id, Product.name, Product.price)
+
+        rows = query.limit(max(1, min(limit, 100))).all()
+        derived = CampaignRules(campaign.rules).derive([row.price for row in rows])
+
+        return {
+            'campaign_id': campaign.id,
+            'total': query.order_by(None).count(),
+            'products': [
+                {'id': row.id, 'name': row.name, 'price': row.price, **fields}
+                for row, fields in zip(rows, derived)
+            ],
+        }
+
+    @staticmethod
+    def generate(user: User, campaign_id: int, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate posters for every product a campaign's rules select
+
+        The whole product set is submitted as one generation, which is
+        split into chunk jobs and merged like any other large batch.
+
+        Args:
+            user: Current user
+            campaign_id: Campaign ID
+            idempotency_key: Optional client-supplied Idempotency-Key
+
+        Returns:
+            dict: Job information (see PosterGenerationService.queue_generation)
+
+        Raises:
+            ValueError: If not found, unauthorized, without a template,
+                matching no products, or over the generation limit
+        """
+        campaign = CampaignService.get_campaign(campaign_id, user)
+
+        if not campaign.template_id:
+            raise ValueError('Campaign has no template')
+
+        product_ids = CampaignService.resolve_product_ids(campaign)
+        if not product_ids:
+            raise ValueError('No products match the campaign rules')
+
+        return PosterGenerationService.queue_generation(
+            user,
+            campaign.template_id,
+            product_ids,
+            campaign_id=campaign.id,
+            idempotency_key=idempotency_key
+        )
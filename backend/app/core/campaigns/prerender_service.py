@@ -0,0 +1,188 @@
+from flask import current_app
+from app.extensions import db
+from app.models import Campaign, Poster, Product, User
+from app.core.campaigns.campaign_service import CampaignService
+from app.core.posters.generation_service import PosterGenerationService
+from app.workers.lanes import BULK, BULK_PRIORITY, LEGACY, is_priority_plan
+from app.workers.queue_manager import QueueManager
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+class CampaignPrerenderService:
+    """
+    Renders campaign posters ahead of the campaign's start date
+    
+    Pre-renders are charged to the owner's quota like any other
+    generation, so only plans with the 'campaign_prerender' feature get
+    them.
+    """
+    
+    KEY_PREFIX = 'postraft:prerender'
+    FEATURE = 'campaign_prerender'
+    
+    @staticmethod
+    def in_hours(spec: str, hour: int) -> bool:
+        """
+        Whether `hour` falls in an hour window like '1-6' (end exclusive)
+        
+        Windows may wrap past midnight ('22-5'); an empty spec means always.
+        """
+        if not spec:
+            return True
+        
+        start, end = (int(part) % 24 for part in spec.split('-', 1))
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+    
+    @staticmethod
+    def due_campaigns(today: date, horizon_days: int) -> List[Campaign]:
+        """
+        Active campaigns with a template that start within the horizon
+        
+        Only campaigns whose owner's plan has pre-rendering are returned.
+        
+        Args:
+            today: Current date
+            horizon_days: How far ahead to look
+            
+        Returns:
+            list: Campaigns, soonest first
+        """
+        campaigns = Campaign.query.filter(
+            Campaign.is_active.is_(True),
+            Campaign.template_id.isnot(None),
+            Campaign.start_date >= today,
+            Campaign.start_date <= today + timedelta(days=horizon_days)
+        ).order_by(Campaign.start_date, Campaign.id).all()
+        
+        owners = {
+            user.id: user
+            for user in User.query.filter(User.id.in_({campaign.user_id for campaign in campaigns}))
+        } if campaigns else {}
+        
+        return [
+            campaign for campaign in campaigns
+            if CampaignPrerenderService.enabled_for(owners.get(campaign.user_id))
+        ]
+    
+    @staticmethod
+    def enabled_for(user: Optional[User]) -> bool:
+        """Whether the user's plan opted in to campaign pre-rendering"""
+        if user is None or user.plan is None:
+            return False
+        return bool((user.plan.features or {}).get(CampaignPrerenderService.FEATURE))
+    
+    @staticmethod
+    def prerender_lane(user: User) -> str:
+        """
+        Bulk lane of the user's plan tier
+        
+        Pre-renders are never urgent, so they always wait behind
+        interactive work, but a priority plan keeps its priority.
+        """
+        if not current_app.config['LANE_ROUTING']:
+            return LEGACY
+        return BULK_PRIORITY if is_priority_plan(user.plan) else BULK
+    
+    @staticmethod
+    def missing_products(campaign: Campaign) -> List[int]:
+        """
+        Products of a campaign that have no poster for it yet
+        
+        Products are those the campaign's rules select (see
+        CampaignService.product_query). Products with a generated poster
+        for this campaign and template are left out, so a run picks up
+        where the last one stopped; failed renders are tried again.
+        """
+        rendered = db.session.query(Poster.product_id).filter(
+            Poster.user_id == campaign.user_id,
+            Poster.campaign_id == campaign.id,
+            Poster.template_id == campaign.template_id,
+            Poster.status == 'generated'
+        )
+        
+        query = CampaignService.product_query(campaign).filter(Product.id.notin_(rendered))
+        
+        return [product_id for (product_id,) in query]
+    
+    @staticmethod
+    def prerender_campaign(campaign: Campaign) -> Optional[Dict[str, Any]]:
+        """
+        Queue the missing posters of one campaign on its owner's bulk lane
+        
+        A campaign whose previous pre-render job is still queued or
+        running is skipped.
+        
+        Args:
+            campaign: Campaign to pre-render
+            
+        Returns:
+            dict: Job information, or None if there was nothing to do
+            
+        Raises:
+            ValueError: If generation is refused (e.g. quota exhausted)
+        """
+        redis_conn = QueueManager.get_redis_connection()
+        key = f'{CampaignPrerenderService.KEY_PREFIX}:{campaign.id}'
+        
+        previous = redis_conn.get(key)
+        if previous:
+            job = QueueManager.get_job(previous.decode())
+            if job and job.get_status(refresh=False) not in ('finished', 'failed', 'canceled', 'stopped'):
+                return None
+        
+        product_ids = CampaignPrerenderService.missing_products(campaign)
+        if not product_ids:
+            return None
+        
+        user = db.session.get(User, campaign.user_id)
+        result = PosterGenerationService.queue_generation(
+            user,
+            campaign.template_id,
+            product_ids,
+            campaign_id=campaign.id,
+            queue_name=CampaignPrerenderService.prerender_lane(user)
+        )
+        
+        # Remember the job until the campaign has started
+        expires = datetime.combine(campaign.start_date + timedelta(days=1), datetime.min.time())
+        ttl = max(60, int((expires - datetime.utcnow()).total_seconds()))
+        redis_conn.set(key, result['job_id'], ex=ttl)
+        
+        return result
+    
+    @staticmethod
+    def prerender_due(horizon_days: int, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Queue pre-renders for every campaign starting within the horizon
+        
+        Args:
+            horizon_days: How far ahead to look
+            today: Current date (default: today, UTC)
+            
+        Returns:
+            dict: Campaigns queued, skipped and refused
+        """
+        today = today or datetime.utcnow().date()
+        summary = {'queued': [], 'skipped': 0, 'refused': []}
+        
+        for campaign in CampaignPrerenderService.due_campaigns(today, horizon_days):
+            try:
+                result = CampaignPrerenderService.prerender_campaign(campaign)
+            except ValueError as e:
+                # e.g. quota exhausted; retried on the next run
+                summary['refused'].append({'campaign_id': campaign.id, 'error': str(e)})
+                continue
+            
+            if result is None:
+                summary['skipped'] += 1
+            else:
+                summary['queued'].append({
+                    'campaign_id': campaign.id,
+                    'job_id': result['job_id'],
+                    'queue': result['queue'],
+                    'total': result['total'],
+                })
+        
+        return summary
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional
+
+
+class CampaignRules:
+    """
+    Parsed campaign rules
+
+    Selection rules pick the campaign's products:
+        category             Category or list of categories
+        min_price/max_price  Price range (inclusive)
+        product_ids          Only these products
+        exclude_product_ids  Never these products
+
+    Pricing rules add derived fields to each product's data context:
+        discount             Percent off (0-100)
+        discount_amount      Fixed amount off, after the percentage
+
+    Any other key (e.g. banner_text) is passed to templates untouched as
+    `campaign.<key>`.
+
+    Derived fields are computed column-wise over a whole product set in
+    one pass with the rule constants worked out once, rather than by
+    interpreting the rules again for every product.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        rules = rules or {}
+
+        category = rules.get('category')
+        if isinstance(category, str):
+            category = [category]
+        self.categories = [str(c) for c in category] if category else []
+
+        self.min_price = self._number(rules, 'min_price')
+        self.max_price = self._number(rules, 'max_price')
+        self.product_ids = self._ids(rules, 'product_ids')
+        self.exclude_product_ids = self._ids(rules, 'exclude_product_ids')
+
+        self.discount = self._number(rules, 'discount') or 0.0
+        self.discount_amount = self._number(rules, 'discount_amount') or 0.0
+
+        if not 0 <= self.discount <= 100:
+            raise ValueError('discount must be between 0 and 100')
+
+        if self.discount_amount < 0:
+            raise ValueError('discount_amount cannot be negative')
+
+    @staticmethod
+    def _number(rules: dict, key: str) -> Optional[float]:
+        value = rules.get(key)
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must be a number')
+
+    @staticmethod
+    def _ids(rules: dict, key: str) -> Optional[List[int]]:
+        value = rules.get(key)
+        if value is None:
+            return None
+        if not isinstance(value, list):
+            raise ValueError(f'{key} must be an array')
+        try:
+            return [int(product_id) for product_id in value]
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must contain product IDs')
+
+    @property
+    def has_pricing(self) -> bool:
+        return bool(self.discount or self.discount_amount)
+
+    def derive(self, prices: List[float]) -> List[Dict[str, Any]]:
+        """
+        Derived fields for a product set, in the order of `prices`
+
+        Args:
+            prices: Product prices
+
+        Returns:
+            list: Per product, the fields to merge into data['product']
+                (empty dicts when the campaign sets no pricing)
+        """
+        if not self.has_pricing:
+            return [{} for _ in prices]
+
+        factor = 1 - self.discount / 100
+        amount = self.discount_amount
+
+        sale_prices = [max(0.0, round(price * factor - amount, 2)) for price in prices]
+        savings = [round(price - sale, 2) for price, sale in zip(prices, sale_prices)]
+        percents = [
+            round(saved * 100 / price) if price else 0
+            for price, saved in zip(prices, savings)
+        ]
+
+        return [
+            {
+                'original_price': price,
+                'sale_price': sale,
+                'savings': saved,
+                'discount_percent': percent,
+            }
+            for price, sale, saved, percent in zip(prices, sale_prices, savings, percents)
+        ]
@@ -0,0 +1,305 @@
+from flask import current_app
+from app.extensions import db
+from app.models import Poster, Template, User
+from app.core.posters.generation_service import PosterGenerationService
+from app.workers.checkpoint import saved_posters
+from app.workers.lanes import BULK
+from app.workers.queue_manager import QueueManager
+from app.workers.rerender import record_replaced, retire_replaced
+from datetime import timedelta
+from sqlalchemy import inspect, or_
+from typing import Dict, Any, Iterable, Set
+import time
+import uuid
+
+# Product columns behind each derived `product.<field>` a template can show
+DERIVED_FIELDS = {
+    'image': 'image_url',
+    'original_price': 'price',
+    'sale_price': 'price',
+    'savings': 'price',
+    'discount_percent': 'price',
+}
+
+# Product columns that can change what a poster shows
+TRACKED_COLUMNS = {'name', 'price', 'image_url', 'category', 'sku', 'description'}
+
+
+def changed_columns(instance) -> Set[str]:
+    """Columns of a pending (not yet flushed) instance whose value changed"""
+    changed = set()
+
+    for attr in inspect(instance).attrs:
+        history = attr.history
+        if history.has_changes() and list(history.added) != list(history.deleted):
+            changed.add(attr.key)
+
+    return changed
+
+
+def tracked_values(product) -> Dict[str, Any]:
+    """
+    Current values of a product's tracked columns
+
+    Take this before an edit that runs queries: a query autoflushes the
+    pending changes and clears the history changed_columns reads.
+    """
+    return {column: getattr(product, column) for column in TRACKED_COLUMNS}
+
+
+def changed_since(product, before: Dict[str, Any]) -> Set[str]:
+    """Tracked columns whose value differs from a tracked_values snapshot"""
+    return {column for column, value in before.items() if getattr(product, column) != value}
+
+
+def template_product_columns(json_definition: dict) -> Set[str]:
+    """
+    Product columns a template's layers read
+
+    Args:
+        json_definition: Template definition
+
+    Returns:
+        set: Product column names (e.g. {'name', 'price', 'image_url'})
+    """
+    columns = set()
+
+    for layer in (json_definition or {}).get('layers', []):
+        if layer.get('type') == 'text':
+            if 'value' in layer or 'key' not in layer:
+                continue
+            key = layer['key']
+        elif layer.get('type') == 'image':
+            key = layer.get('key', 'product.image')
+        else:
+            continue
+
+        section, _, field = str(key).partition('.')
+        if section != 'product' or not field:
+            continue
+
+        field = field.split('.', 1)[0]
+        columns.add(DERIVED_FIELDS.get(field, field))
+
+    return columns
+
+
+class ChangeTracker:
+    """
+    Re-renders posters whose product or template changed
+
+    Edits are recorded per user in Redis and flushed by one background
+    job once the user has stopped editing for RERENDER_DEBOUNCE seconds
+    (or RERENDER_MAX_DELAY after the first edit, for users who never
+    stop). A flush finds every affected poster in one query and queues
+    one generation per template and campaign on the bulk lane, so a
+    burst of edits costs one re-render per poster, not one per edit.
+    The old posters stay 'generated' until their replacements are saved
+    (see retire_replaced), so a failed re-render loses nothing.
+
+    A product change only counts for posters whose template shows one of
+    the changed columns; a template change only for posters drawn from
+    an older render_version.
+    """
+
+    KEY_PREFIX = 'postraft:changes'
+
+    @staticmethod
+    def _keys(user_id: int):
+        base = f'{ChangeTracker.KEY_PREFIX}:{user_id}'
+        return base, f'{base}:meta', f'{base}:scheduled'
+
+    @staticmethod
+    def product_changed(product, columns: Iterable[str]) -> bool:
+        """
+        Record an edit to a product
+
+        Args:
+            product: Product (already committed)
+            columns: Changed column names
+
+        Returns:
+            bool: Whether anything was recorded
+        """
+        columns = set(columns) & TRACKED_COLUMNS
+        if not columns:
+            return False
+
+        return ChangeTracker._record(
+            product.user_id,
+            [f'p:{product.id}:{column}' for column in sorted(columns)]
+        )
+
+    @staticmethod
+    def template_changed(template) -> bool:
+        """
+        Record an edit to a template's rendered content
+
+        Returns:
+            bool: Whether anything was recorded
+        """
+        if not template.user_id:
+            return False
+
+        return ChangeTracker._record(template.user_id, [f't:{template.id}'])
+
+    @staticmethod
+    def _record(user_id: int, members: list) -> bool:
+        config = current_app.config
+        if not config['RERENDER_ON_CHANGE']:
+            return False
+
+        redis_conn = QueueManager.get_redis_connection()
+        changes_key, meta_key, scheduled_key = ChangeTracker._keys(user_id)
+
+        debounce = config['RERENDER_DEBOUNCE']
+        # Outlives the longest wait, so a lost flush job cannot wedge the user
+        ttl = config['RERENDER_MAX_DELAY'] + debounce * 2 + 60
+        now = time.time()
+
+        with redis_conn.pipeline() as pipe:
+            pipe.sadd(changes_key, *members)
+            pipe.hsetnx(meta_key, 'first', now)
+            pipe.hset(meta_key, 'last', now)
+            pipe.expire(changes_key, ttl)
+            pipe.expire(meta_key, ttl)
+            pipe.set(scheduled_key, 1, nx=True, ex=ttl)
+            scheduled = pipe.execute()[-1]
+
+        # Only the first edit of a window schedules the flush
+        if scheduled:
+            ChangeTracker._schedule(user_id, debounce)
+
+        return True
+
+    @staticmethod
+    def _schedule(user_id: int, delay: float) -> None:
+        from app.workers.rerender import rerender_changes
+
+        QueueManager.get_queue('default').enqueue_in(
+            timedelta(seconds=max(1, int(delay))),
+            rerender_changes,
+            user_id,
+            job_timeout=900
+        )
+
+    @staticmethod
+    def flush(user_id: int) -> Dict[str, Any]:
+        """
+        Re-render the posters affected by a user's recorded edits
+
+        Reschedules itself instead while the user is still editing.
+
+        Args:
+            user_id: User whose edits to flush
+
+        Returns:
+            dict: Jobs queued, posters being replaced, groups refused
+        """
+        config = current_app.config
+        redis_conn = QueueManager.get_redis_connection()
+        changes_key, meta_key, scheduled_key = ChangeTracker._keys(user_id)
+        summary = {'deferred': False, 'queued': [], 'replacing': 0, 'refused': []}
+
+        meta = redis_conn.hgetall(meta_key)
+        if not meta:
+            redis_conn.delete(scheduled_key)
+            return summary
+
+        now = time.time()
+        quiet = now - float(meta[b'last'])
+        age = now - float(meta[b'first'])
+        debounce = config['RERENDER_DEBOUNCE']
+
+        if quiet < debounce and age < config['RERENDER_MAX_DELAY']:
+            ChangeTracker._schedule(user_id, debounce - quiet)
+            summary['deferred'] = True
+            return summary
+
+        # Take the batch; edits from here on open a new window
+        with redis_conn.pipeline() as pipe:
+            pipe.smembers(changes_key)
+            pipe.delete(changes_key, meta_key, scheduled_key)
+            members = pipe.execute()[0]
+
+        product_columns: Dict[int, Set[str]] = {}
+        template_ids = set()
+
+        for member in members:
+            kind, _, rest = member.decode().partition(':')
+            if kind == 't':
+                template_ids.add(int(rest))
+            elif kind == 'p':
+                product_id, _, column = rest.partition(':')
+                product_columns.setdefault(int(product_id), set()).add(column)
+
+        user = db.session.get(User, user_id)
+        if not user or not (product_columns or template_ids):
+            return summary
+
+        conditions = []
+        if template_ids:
+            conditions.append(Poster.template_id.in_(template_ids))
+        if product_columns:
+            conditions.append(Poster.product_id.in_(product_columns))
+
+        posters = db.session.query(
+            Poster.id, Poster.product_id, Poster.template_id,
+            Poster.campaign_id, Poster.template_version
+        ).filter(
+            Poster.user_id == user_id,
+            Poster.status == 'generated',
+            or_(*conditions)
+        ).all()
+
+        templates = {
+            template.id: (template.render_version, template_product_columns(template.json_definition))
+            for template in Template.query.filter(
+                Template.id.in_({poster.template_id for poster in posters})
+            )
+        }
+
+        # (template_id, campaign_id) -> product ID to render -> poster IDs it replaces
+        groups: Dict[tuple, Dict[int, list]] = {}
+
+        for poster in posters:
+            if poster.template_id not in templates:
+                continue
+
+            version, used_columns = templates[poster.template_id]
+            affected = (
+                (poster.template_id in template_ids and poster.template_version != version)
+                or bool(product_columns.get(poster.product_id, set()) & used_columns)
+            )
+
+            if affected:
+                replaced = groups.setdefault((poster.template_id, poster.campaign_id), {})
+                replaced.setdefault(poster.product_id, []).append(poster.id)
+
+        # Own key per flush: a re-render repeats an earlier request on purpose,
+        # so it must not be folded into it by request deduplication
+        flush_id = uuid.uuid4().hex
+
+        for (template_id, campaign_id), replaced in groups.items():
+            try:
+                result = PosterGenerationService.queue_generation(
+                    user,
+                    template_id,
+                    sorted(replaced),
+                    campaign_id=campaign_id,
+                    idempotency_key=f'rerender:{flush_id}:{template_id}:{campaign_id or 0}',
+                    queue_name=BULK
+                )
+            except ValueError as e:
+                summary['refused'].append({'template_id': template_id, 'campaign_id': campaign_id, 'error': str(e)})
+                continue
+
+            job_id = result['job_id']
+            record_replaced(job_id, replaced)
+            # Replacements saved before the record existed were not retired by the job
+            retire_replaced(job_id, list(saved_posters(job_id, list(replaced))))
+
+            summary['queued'].append(job_id)
+            summary['replacing'] += sum(len(poster_ids) for poster_ids in replaced.values())
+
+        return summary
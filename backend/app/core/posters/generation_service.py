@@ -1,9 +1,17 @@
+from flask import current_app
 from app.extensions import db
 from app.models import Poster, Product, Template, Campaign, User
-from app.workers.batch_job import enqueue_single_poster, enqueue_batch_posters
+from app.core.campaigns.rules import CampaignRules
+from app.core.posters.idempotency import IdempotencyService
+from app.core.posters.job_streams import JobStreamService
+from app.workers.batch_job import enqueue_single_poster, enqueue_batch_posters, enqueue_payload_posters
+from app.workers.cancellation import request_cancel
+from app.workers.events import watch_job
+from app.workers.lanes import LEGACY, select_lane
 from app.workers.queue_manager import QueueManager
+from app.workers.quota import QuotaLedger, current_period
 from typing import List, Dict, Any, Optional
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 
 class PosterGenerationService:
     """Handles poster generation business logic"""
@@ -13,16 +21,24 @@ class PosterGenerationService:
         user: User,
         template_id: int,
         product_ids: List[int],
-        campaign_id: Optional[int] = None
+        campaign_id: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
+        queue_name: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Queue poster generation jobs
         
+        Repeats of a request (same Idempotency-Key, or the same template,
+        products and campaign within GENERATION_DEDUP_WINDOW seconds)
+        return the job already queued instead of enqueuing again.
+        
         Args:
             user: Current user
             template_id: Template ID
             product_ids: List of product IDs
             campaign_id: Optional campaign ID
+            idempotency_key: Optional client-supplied Idempotency-Key
+            queue_name: Optional lane, instead of routing by plan and size
             
         Returns:
             dict: Job information
@@ -43,74 +59,275 @@ class PosterGenerationService:
         if not product_ids or len(product_ids) == 0:
             raise ValueError('At least one product is required')
         
-        # Check all products belong to user
-        products = Product.query.filter(
+        # Check all products belong to user (a count; workers load the rows)
+        owned = db.session.query(func.count(Product.id)).filter(
             Product.id.in_(product_ids),
             Product.user_id == user.id
-        ).all()
+        ).scalar()
         
-        if len(products) != len(product_ids):
+        if owned != len(product_ids):
             raise ValueError('Some products not found or unauthorized')
         
         # Validate campaign if provided
+        campaign = None
         if campaign_id:
             campaign = Campaign.query.get(campaign_id)
             if not campaign or campaign.user_id != user.id:
                 raise ValueError('Campaign not found or unauthorized')
+            
+            # Rules saved before they were validated fail here, not in the worker
+            try:
+                CampaignRules(campaign.rules)
+            except ValueError as e:
+                raise ValueError(f'Invalid campaign rules: {e}')
+        
+        # Same request already queued (retry, double-click)? Reuse its job
+        claim_key, job_id, existing = IdempotencyService.claim(
+            user.id,
+            IdempotencyService.fingerprint(user.id, template_id, product_ids, campaign_id),
+            idempotency_key
+        )
+        
+        # Route to a lane by plan tier and request size
+        queue_name = queue_name or PosterGenerationService._select_queue(user, len(product_ids))
+        
+        result = {
+            'job_id': job_id,
+            'type': 'single' if len(product_ids) == 1 else 'batch',
+            'queue': queue_name,
+            'template_id': template_id,
+            'product_ids': product_ids,
+            'total': len(product_ids),
+            'deduplicated': existing
+        }
+        
+        if existing:
+            return result
+        
+        try:
+            PosterGenerationService._enqueue(
+                user, template, product_ids, campaign, job_id, queue_name
+            )
+        except Exception:
+            IdempotencyService.forget(claim_key)
+            raise
+        
+        return result
+    
+    @staticmethod
+    def _enqueue(user: User, template: Template, product_ids: List[int],
+                 campaign: Optional[Campaign], job_id: str, queue_name: str) -> None:
+        """Reserve quota and enqueue the generation job(s) under job_id"""
+        # Reserve the posters atomically, so concurrent requests can't
+        # overshoot the plan; the jobs charge or release the reservation
+        ledger = QuotaLedger(QueueManager.get_redis_connection())
+        period = current_period()
         
-        # Check generation limits
-        remaining = PosterGenerationService._check_generation_limit(user, len(product_ids))
-        if remaining < len(product_ids):
+        reserved, remaining = ledger.reserve(user, len(product_ids), job_id, period)
+        if not reserved:
             raise ValueError(
                 f'Monthly generation limit exceeded. You can generate {remaining} more posters this month.'
             )
         
+        try:
+            PosterGenerationService._enqueue_jobs(
+                user, template, product_ids, campaign, job_id, queue_name, period
+            )
+        except Exception:
+            ledger.release(user.id, period, job_id)
+            raise
+    
+    @staticmethod
+    def _enqueue_jobs(user: User, template: Template, product_ids: List[int],
+                      campaign: Optional[Campaign], job_id: str, queue_name: str, period: str) -> None:
+        """Enqueue the generation job(s) under job_id"""
+        campaign_id = campaign.id if campaign else None
+        
+        # Self-contained jobs: snapshot template and product data now so
+        # render workers never touch the database
+        if current_app.config['SELF_CONTAINED_JOBS']:
+            products_by_id = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(product_ids)).all()
+            }
+            enqueue_payload_posters(
+                template=template,
+                products=[products_by_id[pid] for pid in product_ids],
+                user_id=user.id,
+                campaign=campaign,
+                queue_name=queue_name,
+                job_id=job_id,
+                quota_period=period
+            )
+        
         # Queue job(s)
-        if len(product_ids) == 1:
+        elif len(product_ids) == 1:
             # Single poster
-            job_id = enqueue_single_poster(
-                template_id=template_id,
+            enqueue_single_poster(
+                template_id=template.id,
                 product_id=product_ids[0],
                 user_id=user.id,
-                campaign_id=campaign_id
+                campaign_id=campaign_id,
+                queue_name=queue_name,
+                job_id=job_id,
+                quota_period=period
             )
-            
-            return {
-                'job_id': job_id,
-                'type': 'single',
-                'template_id': template_id,
-                'product_ids': product_ids,
-                'total': 1
-            }
         else:
             # Batch generation
-            job_id = enqueue_batch_posters(
-                template_id=template_id,
+            enqueue_batch_posters(
+                template_id=template.id,
                 product_ids=product_ids,
                 user_id=user.id,
-                campaign_id=campaign_id
+                campaign_id=campaign_id,
+                queue_name=queue_name,
+                job_id=job_id,
+                quota_period=period
             )
-            
-            return {
-                'job_id': job_id,
-                'type': 'batch',
-                'template_id': template_id,
-                'product_ids': product_ids,
-                'total': len(product_ids)
-            }
     
     @staticmethod
-    def get_job_status(job_id: str) -> Dict[str, Any]:
+    def get_job_status(user: User, job_id: str) -> Dict[str, Any]:
         """
         Get job status
         
         Args:
+            user: Current user
             job_id: Job ID
             
         Returns:
-            dict: Job status information
+            dict: Job status information (not_found for other users' jobs)
+        """
+        return QueueManager.get_job_status(job_id, user_id=user.id)
+    
+    @staticmethod
+    def cancel_job(user: User, job_id: str) -> Dict[str, Any]:
+        """
+        Cancel a queued or running generation job
+        
+        Chunks that have not started are dequeued; running chunks stop
+        before their next poster. Posters already saved are kept (and
+        were already counted against the quota).
+        
+        Args:
+            user: Current user
+            job_id: Job ID (single job or batch)
+            
+        Returns:
+            dict: Job status after the cancel request
+            
+        Raises:
+            ValueError: If the job is not found, not the user's, or done
         """
-        return QueueManager.get_job_status(job_id)
+        job = PosterGenerationService._get_user_job(user, job_id)
+        
+        if job.get_status(refresh=False) in ('finished', 'failed', 'canceled', 'stopped'):
+            raise ValueError('Job has already finished')
+        
+        cancel = request_cancel(
+            QueueManager.get_redis_connection(),
+            job,
+            ttl=current_app.config['BATCH_CHECKPOINT_TTL']
+        )
+        
+        status = QueueManager.get_job_status(job_id)
+        status['cancel'] = cancel
+        return status
+    
+    @staticmethod
+    def get_jobs_status(user: User, job_ids: List[str]) -> Dict[str, Any]:
+        """
+        Get compact status for several jobs at once
+        
+        Args:
+            user: Current user
+            job_ids: Job IDs
+            
+        Returns:
+            dict: job_id -> status (with progress for batches); jobs of
+                other users read as not_found
+            
+        Raises:
+            ValueError: If no IDs or too many are given
+        """
+        job_ids = list(dict.fromkeys(job_id for job_id in job_ids if job_id))
+        limit = current_app.config['JOB_STATUS_BATCH_MAX']
+        
+        if not job_ids:
+            raise ValueError('At least one job ID is required')
+        
+        if len(job_ids) > limit:
+            raise ValueError(f'At most {limit} job IDs can be requested at once')
+        
+        return QueueManager.get_jobs_status(job_ids, user_id=user.id)
+    
+    @staticmethod
+    def create_stream_token(user: User, job_id: str) -> Dict[str, Any]:
+        """
+        Issue a single-use token for streaming a job's status
+        
+        Args:
+            user: Current user
+            job_id: Job ID
+            
+        Returns:
+            dict: Token and seconds until it expires
+            
+        Raises:
+            ValueError: If the job is not found or not the user's
+        """
+        PosterGenerationService._get_user_job(user, job_id)
+        
+        return {
+            'token': JobStreamService.issue_token(user.id, job_id),
+            'expires_in': current_app.config['JOB_STREAM_TOKEN_TTL'],
+        }
+    
+    @staticmethod
+    def stream_job_status(user: User, job_id: str):
+        """
+        Yield job status on every change until the job is final
+        
+        The stream takes one of the user's stream slots (see
+        JobStreamService). The caller gives it back with close_stream
+        once the response is closed, which the server does even when the
+        client went away before the first event was sent.
+        
+        Args:
+            user: Current user
+            job_id: Job ID
+            
+        Returns:
+            tuple: (generator of job status, or None on a quiet heartbeat;
+                stream slot ID)
+            
+        Raises:
+            ValueError: If the job is not found or not the user's, or too
+                many streams are open
+        """
+        PosterGenerationService._get_user_job(user, job_id)
+        slot = JobStreamService.open_stream(user.id)
+        
+        statuses = watch_job(
+            job_id,
+            heartbeat=current_app.config['JOB_STREAM_HEARTBEAT'],
+            max_seconds=current_app.config['JOB_STREAM_MAX_SECONDS']
+        )
+        
+        return statuses, slot
+    
+    @staticmethod
+    def _get_user_job(user: User, job_id: str):
+        """
+        Fetch a job the user queued
+        
+        Raises:
+            ValueError: If the job is not found or not the user's
+        """
+        job = QueueManager.get_job(job_id)
+        
+        if not job or job.meta.get('user_id') != user.id:
+            raise ValueError('Job not found')
+        
+        return job
     
     @staticmethod
     def get_user_posters(
@@ -219,6 +436,27 @@ class PosterGenerationService:
         db.session.delete(poster)
         db.session.commit()
     
+    @staticmethod
+    def _select_queue(user: User, product_count: int) -> str:
+        """
+        Pick the generation lane for a request
+        
+        Args:
+            user: Current user
+            product_count: Number of posters requested
+            
+        Returns:
+            str: Queue name
+        """
+        if not current_app.config['LANE_ROUTING']:
+            return LEGACY
+        
+        return select_lane(
+            user,
+            product_count,
+            interactive_max=current_app.config['INTERACTIVE_MAX_PRODUCTS']
+        )
+    
     @staticmethod
     def _check_generation_limit(user: User, count: int) -> int:
         """
@@ -229,18 +467,10 @@ class PosterGenerationService:
             count: Number of posters to generate
             
         Returns:
-            int: Remaining generations available
+            int: Remaining generations available (posters reserved by
+                queued jobs are not available)
         """
-        max_generations = user.plan.monthly_generations
-        
-        # Unlimited
-        if max_generations == -1:
-            return float('inf')
-        
-        current_usage = user.monthly_generations
-        remaining = max_generations - current_usage
-        
-        return max(0, remaining)
+        return QuotaLedger(QueueManager.get_redis_connection()).remaining(user)
     
     @staticmethod
     def get_generation_stats(user: User) -> Dict[str, Any]:
@@ -253,10 +483,14 @@ class PosterGenerationService:
         Returns:
             dict: Generation statistics
         """
+        usage = QuotaLedger(QueueManager.get_redis_connection()).usage(user)
+        limit = user.plan.monthly_generations
+        
         return {
-            'used': user.monthly_generations,
-            'limit': user.plan.monthly_generations,
-            'remaining': PosterGenerationService._check_generation_limit(user, 0),
+            'used': usage['used'],
+            'reserved': usage['reserved'],
+            'limit': limit,
+            'remaining': float('inf') if limit == -1 else max(0, limit - usage['used'] - usage['reserved']),
             'unlimited': user.plan.monthly_generations == -1,
             'total_posters': Poster.query.filter_by(user_id=user.id).count(),
             'successful': Poster.query.filter_by(user_id=user.id, status='generated').count(),
@@ -0,0 +1,84 @@
+from flask import current_app
+from app.workers.queue_manager import QueueManager
+from typing import List, Optional, Tuple
+import hashlib
+import json
+import uuid
+
+
+class IdempotencyService:
+    """
+    Deduplicates generation requests
+
+    A request claims its job ID in Redis (SET NX) before anything is
+    enqueued, so a retry or double-click that arrives while the first
+    request is still in flight gets the same job ID back. With an
+    Idempotency-Key header the claim lasts IDEMPOTENCY_KEY_TTL seconds;
+    otherwise identical requests are folded together for
+    GENERATION_DEDUP_WINDOW seconds.
+    """
+
+    KEY_PREFIX = 'postraft:idempotency'
+
+    @staticmethod
+    def fingerprint(user_id: int, template_id: int, product_ids: List[int],
+                    campaign_id: Optional[int] = None) -> str:
+        """Stable hash of what a generation request would render"""
+        raw = json.dumps(
+            [user_id, int(template_id), sorted(int(pid) for pid in product_ids),
+             int(campaign_id) if campaign_id else None],
+            separators=(',', ':')
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def claim(user_id: int, fingerprint: str,
+              idempotency_key: Optional[str] = None) -> Tuple[Optional[str], str, bool]:
+        """
+        Claim a job ID for a request, or find the one already claimed
+
+        Args:
+            user_id: Requesting user
+            fingerprint: Request fingerprint
+            idempotency_key: Client-supplied Idempotency-Key, if any
+
+        Returns:
+            tuple: (claim key or None, job ID, whether the job already exists)
+
+        Raises:
+            ValueError: If the key was used for a different request
+        """
+        config = current_app.config
+        job_id = str(uuid.uuid4())
+
+        if idempotency_key:
+            key = f'{IdempotencyService.KEY_PREFIX}:{user_id}:key:{idempotency_key}'
+            ttl = config['IDEMPOTENCY_KEY_TTL']
+        else:
+            ttl = config['GENERATION_DEDUP_WINDOW']
+            if ttl <= 0:
+                return None, job_id, False
+            key = f'{IdempotencyService.KEY_PREFIX}:{user_id}:req:{fingerprint}'
+
+        redis_conn = QueueManager.get_redis_connection()
+
+        if redis_conn.set(key, f'{job_id}|{fingerprint}', nx=True, ex=ttl):
+            return key, job_id, False
+
+        existing = redis_conn.get(key)
+        if existing is None:
+            # Expired between SET and GET; take it over
+            redis_conn.set(key, f'{job_id}|{fingerprint}', ex=ttl)
+            return key, job_id, False
+
+        existing_job_id, existing_fingerprint = existing.decode().split('|', 1)
+        if existing_fingerprint != fingerprint:
+            raise ValueError('Idempotency-Key was already used for a different request')
+
+        return key, existing_job_id, True
+
+    @staticmethod
+    def forget(key: Optional[str]) -> None:
+        """Drop a claim whose request failed, so a retry can enqueue"""
+        if key:
+            QueueManager.get_redis_connection().delete(key)
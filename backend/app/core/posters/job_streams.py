@@ -0,0 +1,126 @@
+from flask import current_app
+from app.workers.queue_manager import QueueManager
+from typing import Optional
+import json
+import secrets
+import time
+import uuid
+
+
+class JobStreamService:
+    """
+    Access tokens and connection limits for job status streams
+
+    EventSource cannot send an Authorization header, and a JWT in the
+    query string ends up in access logs. Clients instead trade their JWT
+    for a stream token (POST /api/posters/job/<job_id>/stream-token):
+    random, bound to one user and job, valid for JOB_STREAM_TOKEN_TTL
+    seconds and usable once, so a logged URL is worthless.
+
+    Every open stream holds a server worker (or thread) and a Redis
+    pub/sub connection, so open streams are capped per user and in
+    total; clients over the cap fall back to polling.
+    """
+
+    TOKEN_PREFIX = 'postraft:stream-token'
+    OPEN_KEY = 'postraft:streams:open'
+
+    @staticmethod
+    def issue_token(user_id: int, job_id: str) -> str:
+        """
+        Create a single-use stream token
+
+        Args:
+            user_id: Owner of the job (already checked)
+            job_id: Job the token may stream
+
+        Returns:
+            str: Token
+        """
+        token = secrets.token_urlsafe(32)
+
+        QueueManager.get_redis_connection().set(
+            f'{JobStreamService.TOKEN_PREFIX}:{token}',
+            json.dumps({'user_id': user_id, 'job_id': job_id}),
+            ex=current_app.config['JOB_STREAM_TOKEN_TTL']
+        )
+
+        return token
+
+    @staticmethod
+    def redeem_token(token: str, job_id: str) -> Optional[int]:
+        """
+        Use up a stream token
+
+        Args:
+            token: Token from the stream URL
+            job_id: Job the stream is for
+
+        Returns:
+            int: User ID, or None if the token is unknown, expired, used
+                or issued for another job
+        """
+        key = f'{JobStreamService.TOKEN_PREFIX}:{token}'
+
+        with QueueManager.get_redis_connection().pipeline() as pipe:
+            pipe.get(key)
+            pipe.delete(key)
+            raw = pipe.execute()[0]
+
+        if raw is None:
+            return None
+
+        claim = json.loads(raw)
+        if claim['job_id'] != job_id:
+            return None
+
+        return claim['user_id']
+
+    @staticmethod
+    def open_stream(user_id: int) -> str:
+        """
+        Take a stream slot
+
+        Slots of streams that never closed (killed server process) lapse
+        after JOB_STREAM_MAX_SECONDS.
+
+        Returns:
+            str: Slot ID, to pass to close_stream
+
+        Raises:
+            ValueError: If the user or the server has too many open streams
+        """
+        config = current_app.config
+        redis_conn = QueueManager.get_redis_connection()
+        user_key = f'{JobStreamService.OPEN_KEY}:{user_id}'
+        slot_id = f'{user_id}:{uuid.uuid4().hex}'
+        now = time.time()
+        lapsed = now - config['JOB_STREAM_MAX_SECONDS'] - 60
+
+        with redis_conn.pipeline() as pipe:
+            for key, member in ((JobStreamService.OPEN_KEY, slot_id), (user_key, slot_id)):
+                pipe.zremrangebyscore(key, 0, lapsed)
+                pipe.zadd(key, {member: now})
+                pipe.zcard(key)
+                pipe.expire(key, config['JOB_STREAM_MAX_SECONDS'] + 60)
+            results = pipe.execute()
+
+        total, mine = results[2], results[6]
+        per_user = config['JOB_STREAM_MAX_PER_USER']
+        overall = config['JOB_STREAM_MAX_OPEN']
+
+        if (per_user and mine > per_user) or (overall and total > overall):
+            JobStreamService.close_stream(slot_id)
+            raise ValueError('Too many open status streams; poll the job status instead')
+
+        return slot_id
+
+    @staticmethod
+    def close_stream(slot_id: str) -> None:
+        """Give back a stream slot"""
+        user_id = slot_id.split(':', 1)[0]
+
+        with QueueManager.get_redis_connection().pipeline() as pipe:
+            pipe.zrem(JobStreamService.OPEN_KEY, slot_id)
+            pipe.zrem(f'{JobStreamService.OPEN_KEY}:{user_id}', slot_id)
+            pipe.execute()
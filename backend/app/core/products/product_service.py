@@ -1,5 +1,6 @@
 from app.extensions import db
 from app.models import Product, User
+from app.core.posters.change_tracking import ChangeTracker, changed_columns, changed_since, tracked_values
 from typing import List, Optional, Dict, Any
 from sqlalchemy import or_
 
@@ -157,6 +158,8 @@ class ProductService:
             ValueError: If validation fails or unauthorized
         """
         product = ProductService.get_product(product_id, user)
+        # Before the SKU check, whose query flushes the edits made so far
+        before = tracked_values(product)
         
         # Update fields
         if 'name' in data and data['name']:
@@ -189,8 +192,11 @@ class ProductService:
         if 'image_url' in data:
             product.image_url = data['image_url']
         
+        changed = changed_since(product, before)
         db.session.commit()
         
+        ProductService._track_change(product, changed)
+        
         return product
     
     @staticmethod
@@ -243,6 +249,18 @@ class ProductService:
         """
         product = ProductService.get_product(product_id, user)
         product.image_url = image_url
+        
+        changed = changed_columns(product)
         db.session.commit()
         
+        ProductService._track_change(product, changed)
+        
         return product
+    
+    @staticmethod
+    def _track_change(product: Product, changed: set) -> None:
+        """Queue re-renders of the product's posters (never fails the edit)"""
+        try:
+            ChangeTracker.product_changed(product, changed)
+        except Exception as e:
+            print(f"⚠️ Could not record change to product {product.id}: {e}")
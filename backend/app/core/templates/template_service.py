@@ -1,5 +1,6 @@
 from app.extensions import db
 from app.models import Template, User
+from app.core.posters.change_tracking import ChangeTracker
 from typing import List, Optional, Dict, Any
 
 class TemplateService:
@@ -130,6 +131,8 @@ class TemplateService:
         if template.is_system:
             raise ValueError('Cannot edit system templates')
         
+        version = template.render_version
+        
         # Update fields
         if 'name' in data and data['name']:
             template.name = data['name'].strip()
@@ -153,6 +156,13 @@ class TemplateService:
         
         db.session.commit()
         
+        # Re-render its posters only if what they show changed
+        if template.render_version != version:
+            try:
+                ChangeTracker.template_changed(template)
+            except Exception as e:
+                print(f"⚠️ Could not record change to template {template.id}: {e}")
+        
         return template
     
     @staticmethod
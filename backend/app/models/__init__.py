@@ -5,6 +5,7 @@ from app.models.template import Template
 from app.models.campaign import Campaign
 from app.models.poster import Poster
 from app.models.password_reset import PasswordResetToken
+from app.models.job_result import JobResult
 
 __all__ = [
     'User',
@@ -14,4 +15,5 @@ __all__ = [
     'Campaign',
     'Poster',
     'PasswordResetToken',
+    'JobResult',
 ]
@@ -1,4 +1,6 @@
 from app.extensions import db
+from app.core.campaigns.rules import CampaignRules
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 class Campaign(db.Model):
@@ -29,6 +31,12 @@ class Campaign(db.Model):
     # Relationships
     posters = db.relationship('Poster', backref='campaign', lazy='dynamic', cascade='all, delete-orphan')
     
+    @validates('rules')
+    def validate_rules(self, key, rules):
+        """Refuse rules the renderer cannot apply (raises ValueError)"""
+        CampaignRules(rules)
+        return rules
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class JobResult(db.Model):
+    """Per-poster results of a batch job, kept out of Redis"""
+    __tablename__ = 'job_results'
+
+    job_id = db.Column(db.String(100), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    # Set on the rows of a chunked batch's chunks until they are merged
+    batch_id = db.Column(db.String(100), index=True)
+
+    # zlib-compressed JSON: {'results': [...], 'errors': [...], 'cancelled': [...]}
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<JobResult {self.job_id}>'
@@ -15,10 +15,13 @@ class Poster(db.Model):
     
     # Metadata
     format = db.Column(db.String(50))  # 'square', 'story', 'a4'
-    status = db.Column(db.String(20), default='generated')  # 'generating', 'generated', 'failed'
+    status = db.Column(db.String(20), default='generated')  # 'generating', 'generated', 'failed', 'stale'
     
-    # Job tracking
-    job_id = db.Column(db.String(100), unique=True)
+    # Template.render_version this poster was drawn from
+    template_version = db.Column(db.String(16))
+    
+    # Job tracking (the job clients poll; shared by every poster of a batch)
+    job_id = db.Column(db.String(100), index=True)
     error_message = db.Column(db.Text)
     
     # Timestamps
@@ -35,6 +38,7 @@ class Poster(db.Model):
             'image_url': self.image_url,
             'format': self.format,
             'status': self.status,
+            'template_version': self.template_version,
             'job_id': self.job_id,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat(),
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Campaign product resolution (see CampaignService.product_query)
+        db.Index('ix_products_user_id_category', 'user_id', 'category'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
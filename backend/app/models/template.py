@@ -1,5 +1,7 @@
 from app.extensions import db
 from datetime import datetime
+import hashlib
+import json
 
 class Template(db.Model):
     __tablename__ = 'templates'
@@ -29,6 +31,21 @@ class Template(db.Model):
     campaigns = db.relationship('Campaign', backref='template', lazy='dynamic')
     posters = db.relationship('Poster', backref='template', lazy='dynamic')
     
+    @property
+    def cache_key(self):
+        """Key identifying this revision of the template for render caches"""
+        version = self.updated_at.isoformat() if self.updated_at else '0'
+        return f'{self.id}:{version}'
+
+    @property
+    def render_version(self):
+        """Hash of what rendering reads; unchanged by e.g. a rename"""
+        raw = json.dumps(
+            [self.json_definition, self.background_url, self.format],
+            sort_keys=True, separators=(',', ':'), default=str
+        )
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
     def to_dict(self):
         """Convert to dictionary"""
         return {
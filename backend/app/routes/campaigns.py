@@ -0,0 +1,78 @@
+from flask import Blueprint, request
+from app.core.campaigns.campaign_service import CampaignService
+from app.utils.decorators import auth_required, plan_limit
+from app.utils.responses import success_response, error_response, created_response
+
+bp = Blueprint('campaigns', __name__, url_prefix='/api/campaigns')
+
+@bp.route('/<int:campaign_id>/products', methods=['GET'])
+@auth_required
+def preview_campaign_products(current_user, campaign_id):
+    """
+    Preview the products a campaign's rules select
+    
+    Query params:
+        - limit: Products to return (default: 20, max: 100)
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "campaign_id": 1,
+                "total": 1240,
+                "products": [
+                    {"id": 1, "name": "...", "price": 10.0, "sale_price": 8.0, ...}
+                ]
+            }
+        }
+    """
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        
+        preview = CampaignService.preview(current_user, campaign_id, limit=limit)
+        return success_response(preview)
+        
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response('Failed to resolve campaign products', 500)
+
+@bp.route('/<int:campaign_id>/generate', methods=['POST'])
+@auth_required
+@plan_limit('generation')
+def generate_campaign(current_user, campaign_id):
+    """
+    Generate posters for every product the campaign's rules select
+    
+    Headers:
+        Idempotency-Key: optional; retries with the same key return the
+            original job instead of queuing a new one
+    
+    Response:
+        {
+            "success": true,
+            "message": "Campaign posters queued for generation",
+            "data": {
+                "job_id": "...",
+                "type": "batch",
+                "total": 1240
+            }
+        }
+    """
+    try:
+        idempotency_key = request.headers.get('Idempotency-Key')
+        
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 255:
+            return error_response('Idempotency-Key must be 1-255 characters', 400)
+        
+        result = CampaignService.generate(current_user, campaign_id, idempotency_key=idempotency_key)
+        
+        if result['deduplicated']:
+            return success_response(result, 'Generation already queued')
+        
+        return created_response(result, 'Campaign posters queued for generation')
+        
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response('Failed to queue campaign generation', 500)
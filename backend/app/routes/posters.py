@@ -1,8 +1,10 @@
-from flask import Blueprint, request, send_file
+from flask import Blueprint, Response, request, send_file, stream_with_context
 from app.core.posters.generation_service import PosterGenerationService
-from app.utils.decorators import auth_required, plan_limit
+from app.core.posters.job_streams import JobStreamService
+from app.utils.decorators import auth_required, plan_limit, stream_auth_required
 from app.utils.responses import success_response, error_response, created_response, no_content_response
 from io import BytesIO
+import json
 import zipfile
 import requests
 
@@ -22,6 +24,10 @@ def generate_posters(current_user):
             "campaign_id": 1  // optional
         }
     
+    Headers:
+        Idempotency-Key: optional; retries with the same key return the
+            original job instead of queuing a new one
+    
     Response:
         {
             "success": true,
@@ -42,6 +48,10 @@ def generate_posters(current_user):
         template_id = data.get('template_id')
         product_ids = data.get('product_ids', [])
         campaign_id = data.get('campaign_id')
+        idempotency_key = request.headers.get('Idempotency-Key')
+        
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 255:
+            return error_response('Idempotency-Key must be 1-255 characters', 400)
         
         if not template_id:
             return error_response('template_id is required', 400)
@@ -54,9 +64,13 @@ def generate_posters(current_user):
             user=current_user,
             template_id=template_id,
             product_ids=product_ids,
-            campaign_id=campaign_id
+            campaign_id=campaign_id,
+            idempotency_key=idempotency_key
         )
         
+        if result['deduplicated']:
+            return success_response(result, 'Generation already queued')
+        
         return created_response(
             result,
             f'{"Poster" if result["total"] == 1 else "Posters"} queued for generation'
@@ -84,12 +98,132 @@ def get_job_status(current_user, job_id):
         }
     """
     try:
-        status = PosterGenerationService.get_job_status(job_id)
+        status = PosterGenerationService.get_job_status(current_user, job_id)
         return success_response(status)
         
     except Exception as e:
         return error_response('Failed to fetch job status', 500)
 
+@bp.route('/job/<job_id>/cancel', methods=['POST'])
+@auth_required
+def cancel_job(current_user, job_id):
+    """
+    Cancel a generation job
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "status": "cancelling",
+                "cancel": {"dequeued": 28, "running": 2}
+            }
+        }
+    """
+    try:
+        status = PosterGenerationService.cancel_job(current_user, job_id)
+        return success_response(status, 'Generation cancelled')
+        
+    except ValueError as e:
+        return error_response(str(e), 404 if str(e) == 'Job not found' else 400)
+    except Exception as e:
+        return error_response('Failed to cancel job', 500)
+
+@bp.route('/jobs/status', methods=['GET'])
+@auth_required
+def get_jobs_status(current_user):
+    """
+    Get status of several jobs in one request
+    
+    Query params:
+        - ids: Comma-separated job IDs (up to JOB_STATUS_BATCH_MAX)
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "<job_id>": {"status": "processing", "progress": {...}},
+                "<job_id>": {"status": "completed"}
+            }
+        }
+    """
+    try:
+        job_ids = request.args.get('ids', '').split(',')
+        statuses = PosterGenerationService.get_jobs_status(current_user, job_ids)
+        return success_response(statuses)
+        
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response('Failed to fetch job status', 500)
+
+@bp.route('/job/<job_id>/stream-token', methods=['POST'])
+@auth_required
+def create_stream_token(current_user, job_id):
+    """
+    Get a single-use token for GET /job/<job_id>/events
+    
+    Response:
+        {
+            "success": true,
+            "data": {"token": "...", "expires_in": 60}
+        }
+    """
+    try:
+        token = PosterGenerationService.create_stream_token(current_user, job_id)
+        return success_response(token)
+        
+    except ValueError as e:
+        return error_response(str(e), 404)
+    except Exception as e:
+        return error_response('Failed to create stream token', 500)
+
+@bp.route('/job/<job_id>/events', methods=['GET'])
+@stream_auth_required
+def stream_job_status(current_user, job_id):
+    """
+    Stream job status as Server-Sent Events
+    
+    Sends a 'status' event (same data as GET /job/<job_id>) whenever the
+    job's status or progress changes, and closes once it is completed or
+    failed. EventSource clients authenticate with ?token=<token> from
+    POST /job/<job_id>/stream-token (new token per connection).
+    
+    Every open stream holds a server worker for up to
+    JOB_STREAM_MAX_SECONDS; when the user or the server has too many
+    open (JOB_STREAM_MAX_PER_USER, JOB_STREAM_MAX_OPEN) the request gets
+    429 and the client should poll GET /job/<job_id> instead.
+    
+    Events:
+        event: status
+        data: {"status": "processing", "progress": {...}, ...}
+    """
+    try:
+        statuses, slot = PosterGenerationService.stream_job_status(current_user, job_id)
+    except ValueError as e:
+        return error_response(str(e), 404 if str(e) == 'Job not found' else 429)
+    
+    def events():
+        for status in statuses:
+            if status is None:
+                # Keep proxies from closing a quiet connection
+                yield ': keepalive\n\n'
+            else:
+                yield f'event: status\ndata: {json.dumps(status, default=str)}\n\n'
+    
+    response = Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+    
+    # Runs however the response ends, even if it never started streaming
+    response.call_on_close(lambda: JobStreamService.close_stream(slot))
+    
+    return response
+
 @bp.route('', methods=['GET'])
 @auth_required
 def get_posters(current_user):
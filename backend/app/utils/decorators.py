@@ -3,6 +3,7 @@ from flask import jsonify, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.core.auth.authentication import AuthenticationService
 from app.core.auth.authorization import AuthorizationService
+from app.core.posters.job_streams import JobStreamService
 
 
 def auth_required(f):
@@ -29,6 +30,37 @@ def auth_required(f):
     return decorated
 
 
+def stream_auth_required(f):
+    """
+    auth_required for EventSource endpoints on /job/<job_id>
+
+    Browsers cannot set headers on an EventSource, so these routes also
+    accept ?token=<stream token> (see JobStreamService): single-use, short
+    lived and only valid for the job in the URL. A JWT is only accepted
+    in the Authorization header, never in the URL, where it would be
+    written to access logs.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            token = request.args.get('token')
+
+            if token:
+                user_id = JobStreamService.redeem_token(token, kwargs.get('job_id'))
+                if user_id is None:
+                    raise ValueError('Invalid or expired stream token')
+            else:
+                verify_jwt_in_request()
+                user_id = int(get_jwt_identity())
+
+            current_user = AuthenticationService.get_current_user(user_id)
+
+            return f(current_user=current_user, *args, **kwargs)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 401
+    return decorated
+
+
 def plan_limit(resource_type: str):
     """
     Decorator to check plan limits before executing action
@@ -1,4 +1,8 @@
+from flask import current_app
+from app.workers.fair import FAIR_LANES, FairScheduler
+from app.workers.lanes import GENERATION_LANES, LEGACY, with_affinity_queues
 from app.workers.queue_manager import QueueManager
+from datetime import datetime
 
 
 def get_queue_info(queue_name='poster-generation'):
@@ -10,21 +14,39 @@ def get_queue_info(queue_name='poster-generation'):
     """
     queue = QueueManager.get_queue(queue_name)
 
+    # Fair lanes hold chunks back from the queue until a slot frees up
+    held = FairScheduler(queue.connection, queue_name).pending_count() if queue_name in FAIR_LANES else 0
+
     return {
         'name': queue_name,
         'count': len(queue),  # Jobs waiting
+        'held_count': held,  # Chunks waiting in front of a fair lane
+        'oldest_age': _oldest_job_age(queue),  # Seconds the next job has waited
         'failed_count': queue.failed_job_registry.count,
         'finished_count': queue.finished_job_registry.count,
         'started_count': queue.started_job_registry.count,
     }
 
 
+def _oldest_job_age(queue) -> float:
+    """Seconds since the job at the head of the queue was enqueued"""
+    job_ids = queue.get_job_ids(0, 1)
+    job = queue.fetch_job(job_ids[0]) if job_ids else None
+
+    if job is None or job.enqueued_at is None:
+        return 0.0
+
+    # RQ stores naive UTC timestamps
+    waited = datetime.utcnow() - job.enqueued_at.replace(tzinfo=None)
+    return max(0.0, waited.total_seconds())
+
+
 def get_all_queues_info():
     """Get info for all queues"""
-    return {
-        'poster-generation': get_queue_info('poster-generation'),
-        'default': get_queue_info('default'),
-    }
+    queue_names = [*GENERATION_LANES, LEGACY, 'poster-results', 'default']
+    if current_app.config['AFFINITY_ROUTING']:
+        queue_names = with_affinity_queues(queue_names, current_app.config['AFFINITY_SLOTS'])
+    return {name: get_queue_info(name) for name in queue_names}
 
 
 def clear_failed_jobs(queue_name='poster-generation'):
@@ -0,0 +1,234 @@
+from rq import Worker
+from app.utils.job_monitor import get_queue_info
+from app.workers.persistent import fork_worker
+from app.workers.queue_manager import QueueManager
+import math
+import os
+import signal
+import socket
+import time
+
+
+def queue_demand(queue_names: list) -> dict:
+    """
+    Work waiting on and running from a set of queues
+
+    Returns:
+        dict: waiting (queued plus fair-share held), running, and
+            oldest_age (longest wait of a queue's next job, in seconds)
+    """
+    infos = [get_queue_info(name) for name in queue_names]
+
+    return {
+        'waiting': sum(info['count'] + info['held_count'] for info in infos),
+        'running': sum(info['started_count'] for info in infos),
+        'oldest_age': max((info['oldest_age'] for info in infos), default=0.0),
+    }
+
+
+class Autoscaler:
+    """
+    Decides how many worker processes a host should run
+
+    Scales up as soon as more than `jobs_per_worker` jobs wait per worker
+    or the next job has waited `max_queue_age` seconds, by as many
+    workers as the backlog calls for. Scales down one worker at a time,
+    and only once demand has stayed under half of both thresholds (with
+    a worker to spare) for `scale_down_delay` seconds, so a lull between
+    batches does not retire workers needed again a minute later. No
+    change follows another within `cooldown` seconds.
+    """
+
+    def __init__(self, min_workers: int, max_workers: int, jobs_per_worker: int = 10,
+                 max_queue_age: float = 60, scale_down_delay: float = 120, cooldown: float = 30):
+        self.min_workers = max(0, min_workers)
+        self.max_workers = max(1, self.min_workers, max_workers)
+        self.jobs_per_worker = max(1, jobs_per_worker)
+        self.max_queue_age = max_queue_age
+        self.scale_down_delay = scale_down_delay
+        self.cooldown = cooldown
+
+        self._quiet_since = None
+        self._changed_at = None
+
+    def desired(self, current: int, demand: dict, now: float = None) -> int:
+        """
+        Worker count to run next
+
+        Args:
+            current: Workers wanted so far
+            demand: Queue demand (see queue_demand)
+            now: Current time (default: time.time())
+
+        Returns:
+            int: Worker count, within [min_workers, max_workers]
+        """
+        now = time.time() if now is None else now
+        bounded = min(self.max_workers, max(self.min_workers, current))
+
+        if bounded != current:
+            return self._change(bounded, now)
+
+        waiting = demand['waiting']
+        age = demand['oldest_age']
+
+        behind = waiting > current * self.jobs_per_worker or (waiting and age >= self.max_queue_age)
+        quiet = (
+            waiting <= (current - 1) * self.jobs_per_worker / 2
+            and age < self.max_queue_age / 2
+            and demand['running'] < current
+        )
+
+        if not quiet:
+            self._quiet_since = None
+        elif self._quiet_since is None:
+            self._quiet_since = now
+
+        if self._changed_at is not None and now - self._changed_at < self.cooldown:
+            return current
+
+        if behind and current < self.max_workers:
+            target = max(current + 1, math.ceil(waiting / self.jobs_per_worker))
+            return self._change(min(self.max_workers, target), now)
+
+        if quiet and current > self.min_workers and now - self._quiet_since >= self.scale_down_delay:
+            # Each further step waits out a full delay again
+            self._quiet_since = now
+            return self._change(current - 1, now)
+
+        return current
+
+    def _change(self, target: int, now: float) -> int:
+        self._changed_at = now
+        return target
+
+
+def _idle_worker_pids(connection) -> set:
+    """PIDs of this host's RQ workers that are not running a job"""
+    hostname = socket.gethostname()
+
+    return {
+        worker.pid
+        for worker in Worker.all(connection=connection)
+        if worker.hostname == hostname and worker.get_state() == 'idle'
+    }
+
+
+def run_autoscaled(app, queue_names, scaler: Autoscaler, interval: float = 5,
+                   max_jobs: int = 500, max_memory_mb: int = 1024, lane_weights=None):
+    """
+    Run a pool of persistent workers sized to queue demand
+
+    Every `interval` seconds the pool is resized to what `scaler` asks
+    for. Retired workers get SIGTERM, RQ's warm shutdown: idle ones are
+    picked first and a busy one finishes its current job before exiting,
+    so scaling down never interrupts a render. Children that exit on
+    their own (job or memory limit) are replaced while still wanted.
+
+    Args:
+        app: Flask app (already warmed up)
+        queue_names: Queues to listen on and watch
+        scaler: Autoscaler deciding the pool size
+        interval: Seconds between demand checks
+        max_jobs: Jobs per child before recycling (0 = unlimited)
+        max_memory_mb: RSS per child before recycling (0 = unlimited)
+        lane_weights: Optional queue weights (see app.workers.lanes)
+    """
+    children = {}
+    indexes = {}
+    draining = set()
+    stopping = False
+    target = scaler.min_workers
+    spawn_after = 0.0
+    next_check = 0.0
+
+    def spawn():
+        # Lowest free pool position, so affinity slots are refilled first
+        index = min(set(range(len(children) + 1)) - set(indexes.values()))
+        pid = fork_worker(app, queue_names, max_jobs, max_memory_mb, lane_weights, index)
+        children[pid] = time.time()
+        indexes[pid] = index
+
+    def retire(count):
+        with app.app_context():
+            idle = _idle_worker_pids(QueueManager.get_redis_connection())
+
+        active = [pid for pid in children if pid not in draining]
+        # Idle first, then the highest position (the first refilled on the way up)
+        active.sort(key=lambda pid: (pid not in idle, -indexes[pid]))
+
+        for pid in active[:count]:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                draining.add(pid)
+            except ProcessLookupError:
+                pass
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Warm shutdown: each child finishes its current job, then exits
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    while True:
+        # Reap exited children
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                children.clear()
+                indexes.clear()
+                break
+            if pid == 0:
+                break
+
+            started = children.pop(pid, None)
+            indexes.pop(pid, None)
+            if pid in draining:
+                draining.discard(pid)
+                print(f"📉 Worker {pid} drained and stopped")
+            elif started is not None and not stopping:
+                print(f"♻️  Worker {pid} exited, starting a replacement")
+                # Back off if children die straight away (e.g. Redis unreachable)
+                if time.time() - started < 1:
+                    spawn_after = time.time() + 1
+
+        if stopping:
+            if not children:
+                return
+            time.sleep(0.2)
+            continue
+
+        now = time.time()
+        if now >= next_check:
+            next_check = now + interval
+            try:
+                with app.app_context():
+                    demand = queue_demand(queue_names)
+                wanted = scaler.desired(target, demand, now)
+            except Exception as e:
+                print(f"⚠️  Could not read queue demand: {e}")
+            else:
+                if wanted != target:
+                    print(f"{'📈' if wanted > target else '📉'} Scaling workers {target} -> {wanted} "
+                          f"({demand['waiting']} waiting, oldest {demand['oldest_age']:.0f}s)")
+                target = wanted
+
+        active = len(children) - len(draining)
+        if active < target and now >= spawn_after:
+            for _ in range(target - active):
+                spawn()
+        elif active > target:
+            try:
+                retire(active - target)
+            except Exception as e:
+                print(f"⚠️  Could not retire workers: {e}")
+
+        time.sleep(0.5)
@@ -1,10 +1,27 @@
+from flask import current_app
+from rq import Retry
+from rq.job import Dependency
+from app.extensions import db
+from app.models import User
+from app.workers.fair import FAIR_LANES, FairScheduler, fair_callbacks, tenant_cap
+from app.workers.lanes import affinity_lane, interactive_lane
+from app.workers.payloads import build_render_payload, pack_payload
 from app.workers.queue_manager import QueueManager
-from app.workers.render_job import generate_poster, generate_batch
+from app.workers.quota import QuotaLedger
+from app.workers.render_job import generate_poster, generate_batch, collect_batch_results, render_payload
+import uuid
 
-def enqueue_single_poster(template_id: int, product_id: int, user_id: int, campaign_id: int = None):
+def enqueue_single_poster(template_id: int, product_id: int, user_id: int, campaign_id: int = None,
+                          queue_name: str = 'poster-generation', job_id: str = None,
+                          quota_period: str = None):
     """
     Enqueue a single poster generation job
     
+    Args:
+        queue_name: Generation lane (see app.workers.lanes)
+        job_id: Optional pre-assigned job ID
+        quota_period: Period of the quota reserved under job_id, if any
+    
     Returns:
         str: Job ID
     """
@@ -14,28 +31,268 @@ def enqueue_single_poster(template_id: int, product_id: int, user_id: int, campa
         product_id,
         user_id,
         campaign_id,
-        queue_name='poster-generation',
-        timeout=300  # 5 minutes
+        queue_name=_routed_queue(queue_name, template_id, user_id),
+        timeout=300,  # 5 minutes
+        job_id=job_id,
+        meta={'user_id': user_id, 'quota': quota_period}
     )
     
     return job.id
 
 
-def enqueue_batch_posters(template_id: int, product_ids: list, user_id: int, campaign_id: int = None):
+def enqueue_batch_posters(template_id: int, product_ids: list, user_id: int, campaign_id: int = None,
+                          queue_name: str = 'poster-generation', job_id: str = None,
+                          quota_period: str = None):
     """
     Enqueue a batch poster generation job
-    
+
+    Large batches are split into chunk jobs of BATCH_CHUNK_SIZE products
+    so idle workers can share the load and a timeout only loses one chunk.
+    A parent job that depends on every chunk merges their results; its id
+    is what callers poll.
+
+    Args:
+        queue_name: Generation lane (see app.workers.lanes)
+        job_id: Optional pre-assigned ID of the job callers poll
+        quota_period: Period of the quota reserved under job_id, if any
+
     Returns:
         str: Job ID
     """
-    job = QueueManager.enqueue_job(
-        generate_batch,
-        template_id,
-        product_ids,
+    batch_id = job_id or str(uuid.uuid4())
+    chunk_size = current_app.config['BATCH_CHUNK_SIZE']
+
+    if len(product_ids) <= chunk_size:
+        job = _enqueue_chunks(
+            [(generate_batch, (template_id, product_ids, user_id, campaign_id), product_ids)],
+            user_id,
+            queue_name,
+            batch_id,
+            timeout=1800,  # 30 minutes for batch
+            quota_period=quota_period,
+            template_id=template_id
+        )[0]
+
+        return job.id
+
+    chunks = [
+        product_ids[i:i + chunk_size]
+        for i in range(0, len(product_ids), chunk_size)
+    ]
+
+    child_jobs = _enqueue_chunks(
+        [
+            (generate_batch, (template_id, chunk, user_id, campaign_id), chunk)
+            for chunk in chunks
+        ],
         user_id,
-        campaign_id,
-        queue_name='poster-generation',
-        timeout=1800  # 30 minutes for batch
+        queue_name,
+        batch_id,
+        timeout=current_app.config['BATCH_CHUNK_TIMEOUT'],
+        quota_period=quota_period,
+        template_id=template_id
     )
-    
-    return job.id
+
+    return _enqueue_collector(child_jobs, len(product_ids), batch_id, user_id, queue_name)
+
+
+def enqueue_payload_posters(template, products: list, user_id: int, campaign=None,
+                            queue_name: str = 'poster-generation', job_id: str = None,
+                            quota_period: str = None):
+    """
+    Enqueue self-contained render jobs (SELF_CONTAINED_JOBS mode)
+
+    The template definition and product data are snapshotted into each
+    job's payload, so render workers need no database access; their
+    results are written by a separate ingest job.
+
+    Args:
+        template: Template
+        products: Products, in render order
+        user_id: User ID
+        campaign: Optional campaign
+        queue_name: Generation lane (see app.workers.lanes)
+        job_id: Optional pre-assigned ID of the job callers poll
+        quota_period: Period of the quota reserved under job_id, if any
+
+    Returns:
+        str: Job ID
+    """
+    batch_id = job_id or str(uuid.uuid4())
+    chunk_size = current_app.config['BATCH_CHUNK_SIZE']
+    chunks = [
+        products[i:i + chunk_size]
+        for i in range(0, len(products), chunk_size)
+    ]
+
+    child_jobs = _enqueue_chunks(
+        [
+            (
+                render_payload,
+                (pack_payload(build_render_payload(template, chunk, user_id, campaign)),),
+                [product.id for product in chunk]
+            )
+            for chunk in chunks
+        ],
+        user_id,
+        queue_name,
+        batch_id,
+        timeout=current_app.config['BATCH_CHUNK_TIMEOUT'],
+        quota_period=quota_period,
+        template_id=template.id
+    )
+
+    if len(child_jobs) == 1:
+        return child_jobs[0].id
+
+    return _enqueue_collector(child_jobs, len(products), batch_id, user_id, queue_name)
+
+
+def _routed_queue(queue_name: str, template_id: int, user_id: int) -> str:
+    """The worker-specific queue of a lane for a template (AFFINITY_ROUTING), or the lane"""
+    config = current_app.config
+
+    if not config['AFFINITY_ROUTING'] or template_id is None:
+        return queue_name
+
+    return affinity_lane(queue_name, template_id, user_id, config['AFFINITY_SLOTS'])
+
+
+def _enqueue_chunks(calls: list, user_id: int, queue_name: str, batch_id: str, timeout: int,
+                    quota_period: str = None, template_id: int = None) -> list:
+    """
+    Enqueue batch chunk jobs
+
+    Every chunk records `batch_id` (the ID callers poll) in its meta so
+    its posters can be linked to it. A lone chunk is itself that job and
+    takes `batch_id` as its ID.
+
+    Quota reserved under `batch_id` is split between the chunks before
+    any of them can start, so each settles its own share.
+
+    Chunks of a chunked batch are kept (no result or failure TTL) until
+    the collector has merged them and deletes them, however long the
+    batch waits behind its fair-share cap.
+
+    On the bulk lanes (with FAIR_SCHEDULING on) the jobs are handed to the
+    tenant's fair-share queue instead, which feeds them to the lane as
+    slots free up. Elsewhere, with AFFINITY_ROUTING on, they go to the
+    template's affinity queue of the lane.
+
+    Args:
+        calls: (func, args, product_ids) per chunk
+        user_id: Owner
+        queue_name: Generation lane
+        batch_id: ID of the job callers poll
+        timeout: Job timeout in seconds
+        quota_period: Period of the quota reserved under batch_id, if any
+        template_id: Template rendered (for affinity routing)
+
+    Returns:
+        list: Jobs, in chunk order
+    """
+    config = current_app.config
+    chunk_ids = [batch_id] if len(calls) == 1 else [str(uuid.uuid4()) for _ in calls]
+
+    if quota_period and len(calls) > 1:
+        QuotaLedger(QueueManager.get_redis_connection()).split(
+            user_id,
+            quota_period,
+            batch_id,
+            {chunk_id: len(product_ids) for chunk_id, (_, _, product_ids) in zip(chunk_ids, calls)}
+        )
+
+    # Chunks resume from their checkpoint, so retrying is cheap
+    retry = Retry(max=config['BATCH_MAX_RETRIES']) if config['BATCH_MAX_RETRIES'] else None
+
+    # A lone chunk is the batch itself and expires like any other job
+    ttls = {'result_ttl': -1, 'failure_ttl': -1} if len(calls) > 1 else {}
+
+    if not (config['FAIR_SCHEDULING'] and queue_name in FAIR_LANES):
+        return [
+            QueueManager.enqueue_job(
+                func,
+                *args,
+                queue_name=_routed_queue(queue_name, template_id, user_id),
+                timeout=timeout,
+                job_id=chunk_id,
+                retry=retry,
+                meta={
+                    'product_ids': product_ids,
+                    'batch_id': batch_id,
+                    'user_id': user_id,
+                    'quota': quota_period,
+                },
+                **ttls
+            )
+            for chunk_id, (func, args, product_ids) in zip(chunk_ids, calls)
+        ]
+
+    jobs = [
+        QueueManager.create_job(
+            func,
+            *args,
+            queue_name=queue_name,
+            timeout=timeout,
+            job_id=chunk_id,
+            retry=retry,
+            meta={
+                'product_ids': product_ids,
+                'batch_id': batch_id,
+                'user_id': user_id,
+                'quota': quota_period,
+                'fair': {'lane': queue_name, 'user_id': user_id},
+            },
+            **ttls,
+            **fair_callbacks()
+        )
+        for chunk_id, (func, args, product_ids) in zip(chunk_ids, calls)
+    ]
+
+    # Identity-map hit: the service has already loaded this user
+    user = db.session.get(User, user_id)
+
+    scheduler = FairScheduler(QueueManager.get_redis_connection(), queue_name)
+    scheduler.configure(
+        depth=config['FAIR_LANE_DEPTH'],
+        quantum=config['FAIR_QUANTUM'] or config['BATCH_CHUNK_SIZE']
+    )
+    scheduler.submit(
+        user_id,
+        jobs,
+        costs=[len(product_ids) for _, _, product_ids in calls],
+        cap=tenant_cap(user.plan if user else None, config['FAIR_TENANT_CONCURRENCY'])
+    )
+
+    return jobs
+
+
+def _enqueue_collector(child_jobs: list, total: int, batch_id: str, user_id: int,
+                       queue_name: str = 'poster-generation') -> str:
+    """
+    Enqueue the parent job that merges a chunked batch
+
+    It runs once every chunk has finished or failed; its id is what
+    callers poll. The merge is quick, so it goes to the interactive lane
+    of the batch's tier rather than behind other bulk work.
+
+    Returns:
+        str: Parent job ID
+    """
+    parent = QueueManager.enqueue_job(
+        collect_batch_results,
+        [job.id for job in child_jobs],
+        queue_name=interactive_lane(queue_name),
+        timeout=300,
+        job_id=batch_id,
+        depends_on=Dependency(jobs=child_jobs, allow_failure=True),
+        meta={
+            'children': [job.id for job in child_jobs],
+            # Lets the merge account for chunks whose job has expired
+            'chunk_product_ids': [job.meta['product_ids'] for job in child_jobs],
+            'total': total,
+            'user_id': user_id,
+        }
+    )
+
+    return parent.id
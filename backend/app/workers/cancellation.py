@@ -0,0 +1,164 @@
+from rq import Queue
+from rq.job import Job, JobStatus
+from rq.registry import FailedJobRegistry
+from rq.utils import utcnow
+from app.workers.events import publish_job_event
+from app.workers.quota import release_job_hold
+from app.workers.serialization import JobSerializer
+import time
+
+# Take a job off its lane queue, or out of its tenant's fair-share pending
+# list, and mark it failed; all or nothing, so no worker or fair dispatcher
+# can pick it up in between. Returns 0 if the job was no longer waiting.
+# KEYS: job hash, lane queue, [fair pending list]; ARGV: job id
+_CLAIM = """
+local taken = redis.call('LREM', KEYS[2], 1, ARGV[1]) > 0
+if not taken and KEYS[3] then
+    local prefix = ARGV[1] .. ':'
+    for _, entry in ipairs(redis.call('LRANGE', KEYS[3], 0, -1)) do
+        if string.sub(entry, 1, #prefix) == prefix then
+            taken = redis.call('LREM', KEYS[3], 1, entry) > 0
+            break
+        end
+    end
+end
+if not taken then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'failed')
+return 1
+"""
+
+
+def cancel_key(job_id: str) -> str:
+    """Redis key of a job's cancellation flag"""
+    return f'postraft:cancel:{job_id}'
+
+
+def is_cancel_requested(connection, job_id: str) -> bool:
+    return bool(job_id) and bool(connection.exists(cancel_key(job_id)))
+
+
+def request_cancel(connection, job, ttl: int = 86400) -> dict:
+    """
+    Cancel a generation job and, for a chunked batch, all of its chunks
+
+    Raises the cancellation flag (checked between items by running chunks,
+    see CancelWatch) and takes chunks that have not started off their
+    queue, or out of the fair-share queue, without running them.
+
+    A dequeued chunk is marked failed (with meta 'cancelled') rather than
+    RQ-cancelled: the batch's collector depends on its chunks with
+    allow_failure, and RQ never releases a dependent of a cancelled job.
+
+    Args:
+        connection: Redis connection
+        job: Job callers poll (single job or batch parent)
+        ttl: Seconds to keep the flag
+
+    Returns:
+        dict: Numbers of chunks dequeued and still running
+    """
+    connection.set(cancel_key(job.id), 1, ex=ttl)
+
+    job.meta['cancelled'] = True
+    job.save_meta()
+
+    child_ids = job.meta.get('children') or [job.id]
+    children = Job.fetch_many(child_ids, connection=connection, serializer=JobSerializer)
+
+    dequeued = 0
+    running = 0
+    for child in children:
+        if child is None:
+            continue
+
+        status = child.get_status(refresh=False)
+        if status == JobStatus.QUEUED and _dequeue(connection, child):
+            dequeued += 1
+        elif status == JobStatus.QUEUED:
+            # A worker or the fair dispatcher took it first; CancelWatch stops it
+            running += 1
+        elif status in (JobStatus.STARTED, JobStatus.SCHEDULED):
+            running += 1
+
+    publish_job_event(connection, job.id, 'cancelled')
+
+    return {'dequeued': dequeued, 'running': running}
+
+
+def _dequeue(connection, job) -> bool:
+    """
+    Take a chunk that has not started off its queue, as failed
+
+    Returns:
+        bool: False if the chunk was taken by a worker (or the fair
+            dispatcher) since its status was read
+    """
+    queue = Queue(job.origin, connection=connection, serializer=JobSerializer)
+    fair = job.meta.get('fair')
+
+    keys = [job.key, queue.key]
+    if fair:
+        from app.workers.fair import FairScheduler
+        keys.append(FairScheduler(connection, fair['lane'])._key('pending', fair['user_id']))
+
+    if not connection.register_script(_CLAIM)(keys=keys, args=[job.id]):
+        return False
+
+    job.meta['cancelled'] = True
+    job._exc_info = 'Cancelled by user'
+    job.ended_at = utcnow()
+
+    with connection.pipeline() as pipe:
+        job.set_status(JobStatus.FAILED, pipeline=pipe)
+        job.save(pipeline=pipe)
+        FailedJobRegistry(job.origin, connection=connection, serializer=JobSerializer).add(
+            job, ttl=job.failure_ttl, pipeline=pipe)
+        pipe.execute()
+
+    # Let the batch collector run once its other chunks are done
+    queue.enqueue_dependents(job)
+
+    release_job_hold(job)
+
+    if fair:
+        FairScheduler(connection, fair['lane']).release(job.id, fair['user_id'])
+
+    return True
+
+
+class CancelWatch:
+    """
+    Cheap, throttled check of a running job's cancellation flag
+
+    Once the flag is seen, the running job's own meta is marked cancelled
+    too, so its next progress write (which saves the whole meta) keeps it.
+
+    Usage:
+        should_stop = CancelWatch(job, batch_id)
+        for item in items:
+            if should_stop():
+                break
+    """
+
+    def __init__(self, job, job_id: str, min_interval: float = 0.5):
+        self.job = job
+        self.connection = job.connection if job is not None else None
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._checked_at = 0.0
+        self._cancelled = False
+
+    def __call__(self) -> bool:
+        if self._cancelled or self.connection is None:
+            return self._cancelled
+
+        now = time.time()
+        if now - self._checked_at >= self.min_interval:
+            self._checked_at = now
+            self._cancelled = is_cancel_requested(self.connection, self.job_id)
+            if self._cancelled:
+                self.job.meta['cancelled'] = True
+
+        return self._cancelled
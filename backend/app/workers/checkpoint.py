@@ -0,0 +1,78 @@
+from app.extensions import db
+from app.models import Poster
+import json
+
+
+def saved_posters(job_id: str, product_ids: list) -> dict:
+    """
+    Posters a batch job already committed (its checkpoint)
+
+    BatchPersister commits posters with their job_id, so the committed
+    rows are an exact record of what an earlier, interrupted run of the
+    job finished. Their usage is charged to the Redis ledger only after
+    that commit, so a run that died in between may not have paid for all
+    of them: see quota.commit_resumed_usage.
+
+    Args:
+        job_id: Job ID stored on the posters (see tracking_job_id)
+        product_ids: Products of this job
+
+    Returns:
+        dict: product_id -> (poster_id, image_url)
+    """
+    if not job_id:
+        return {}
+
+    rows = db.session.query(Poster.id, Poster.product_id, Poster.image_url).filter(
+        Poster.job_id == job_id,
+        Poster.status == 'generated',
+        Poster.product_id.in_(product_ids)
+    ).all()
+
+    return {row.product_id: (row.id, row.image_url) for row in rows}
+
+
+class PayloadCheckpoint:
+    """
+    Uploads finished by a payload render job, kept in Redis
+
+    Payload jobs do not write to the database until their ingest job, so
+    completed uploads are recorded here; a retry of the job reuses them
+    instead of rendering and uploading again.
+    """
+
+    def __init__(self, job, ttl: int = 86400):
+        self.job = job
+        self.ttl = ttl
+        self.key = f'postraft:checkpoint:{job.id}' if job is not None else None
+
+    def load(self) -> dict:
+        """
+        Returns:
+            dict: product_id -> (image_url, product_name)
+        """
+        if self.key is None:
+            return {}
+
+        raw = self.job.connection.hgetall(self.key)
+        return {
+            int(product_id): tuple(json.loads(value))
+            for product_id, value in raw.items()
+        }
+
+    def record(self, product_id: int, image_url: str, product_name: str = None) -> None:
+        if self.key is None:
+            return
+
+        try:
+            with self.job.connection.pipeline() as pipe:
+                pipe.hset(self.key, product_id, json.dumps([image_url, product_name]))
+                pipe.expire(self.key, self.ttl)
+                pipe.execute()
+        except Exception as e:
+            # Only costs a re-render if the job is retried
+            print(f"⚠️  Could not checkpoint product {product_id}: {e}")
+
+    def clear(self) -> None:
+        if self.key is not None:
+            self.job.connection.delete(self.key)
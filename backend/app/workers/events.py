@@ -0,0 +1,101 @@
+from app.workers.queue_manager import QueueManager
+import json
+import time
+
+# Statuses after which a job's status no longer changes
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled', 'not_found')
+
+
+def job_channel(job_id: str) -> str:
+    """Pub/sub channel for a job's status events"""
+    return f'postraft:job-events:{job_id}'
+
+
+def event_job_id(job) -> str:
+    """ID whose watchers care about a job (the batch parent for chunks)"""
+    return job.meta.get('batch_id', job.id)
+
+
+def publish_job_event(connection, job_id: str, event: str, pipeline=None) -> None:
+    """
+    Tell anyone watching job_id that its status changed
+
+    Events carry no status themselves; watchers re-read it (see
+    watch_job), so a missed or coalesced event loses nothing.
+    """
+    message = json.dumps({'job_id': job_id, 'event': event})
+    (pipeline or connection).publish(job_channel(job_id), message)
+
+
+class JobEventsMixin:
+    """
+    Worker mixin that publishes an event once a job has finished or failed
+
+    RQ records the outcome after the job function (and its callbacks)
+    return, so this is the first point at which a watcher re-reading the
+    status sees the final result.
+    """
+
+    def handle_job_success(self, job, queue, *args, **kwargs):
+        super().handle_job_success(job, queue, *args, **kwargs)
+        self._publish_outcome(job, 'finished')
+
+    def handle_job_failure(self, job, queue, *args, **kwargs):
+        super().handle_job_failure(job, queue, *args, **kwargs)
+        self._publish_outcome(job, 'failed')
+
+    def _publish_outcome(self, job, event):
+        try:
+            with self.connection.pipeline() as pipe:
+                publish_job_event(self.connection, job.id, event, pipeline=pipe)
+                # A chunk finishing moves its batch's combined progress
+                if event_job_id(job) != job.id:
+                    publish_job_event(self.connection, event_job_id(job), event, pipeline=pipe)
+                pipe.execute()
+        except Exception as e:
+            self.log.warning('Could not publish job event for %s: %s', job.id, e)
+
+
+def watch_job(job_id: str, heartbeat: float = 15.0, max_seconds: float = 600.0):
+    """
+    Yield a job's status whenever it changes, until it is final
+
+    The status is re-read when an event arrives on the job's channel
+    (bursts are coalesced into one read) and at least every `heartbeat`
+    seconds as a safety net. None is yielded on quiet heartbeats so the
+    caller can keep its connection alive.
+
+    Args:
+        job_id: Job to watch
+        heartbeat: Seconds between forced status reads
+        max_seconds: Stop after this long (clients reconnect)
+
+    Yields:
+        dict or None: Job status (same shape as QueueManager.get_job_status)
+    """
+    pubsub = QueueManager.get_redis_connection().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(job_channel(job_id))
+
+    try:
+        deadline = time.time() + max_seconds
+        last = None
+
+        while True:
+            status = QueueManager.get_job_status(job_id)
+
+            if status != last:
+                last = status
+                yield status
+            else:
+                yield None
+
+            if status['status'] in TERMINAL_STATUSES or time.time() >= deadline:
+                return
+
+            message = pubsub.get_message(timeout=min(heartbeat, max(0.0, deadline - time.time())))
+
+            # Drain the rest of a burst; one read covers them all
+            while message is not None:
+                message = pubsub.get_message(timeout=0)
+    finally:
+        pubsub.close()
@@ -0,0 +1,263 @@
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Callback, Job, JobStatus
+from app.workers.lanes import BULK, BULK_PRIORITY
+from app.workers.serialization import JobSerializer
+
+# Lanes whose chunks go through the fair scheduler
+FAIR_LANES = (BULK_PRIORITY, BULK)
+
+# Job states that no longer hold a concurrency slot
+_DONE = {JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED}
+
+
+def tenant_cap(plan, default: int) -> int:
+    """
+    Chunks one tenant may have queued or running in a lane at once
+
+    A plan can set its own cap with the 'max_concurrent_chunks' feature.
+    """
+    features = (plan.features if plan is not None else None) or {}
+    return max(1, int(features.get('max_concurrent_chunks', default)))
+
+
+class FairScheduler:
+    """
+    Deficit round-robin dispatcher in front of an RQ lane
+
+    Chunks are held in a per-tenant list in Redis instead of going straight
+    onto the lane. dispatch() keeps at most `depth` jobs waiting on the
+    lane and picks which tenant supplies the next one by deficit
+    round-robin over active tenants, with the cost of a chunk being its
+    number of products. A tenant never has more than its cap of chunks
+    queued or running, so a 5,000-product catalog render holds a few
+    slots while a 10-product batch from someone else starts within a
+    chunk or two.
+
+    dispatch() runs after every submit and whenever a chunk finishes (via
+    job callbacks). Workers also call it during maintenance so slots held
+    by jobs whose worker died are eventually reclaimed.
+
+    Redis keys (prefix postraft:fair:<lane>):
+        ring              List of tenants with pending chunks, next first
+        pending:<user>    Pending chunks as '<job id>:<cost>'
+        running:<user>    Set of dispatched job ids
+        deficit           Hash of tenant -> unspent credit
+        cap               Hash of tenant -> concurrency cap
+        settings          Hash with 'depth' and 'quantum'
+    """
+
+    def __init__(self, connection, lane: str):
+        self.connection = connection
+        self.lane = lane
+        self.prefix = f'postraft:fair:{lane}'
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix, *[str(part) for part in parts]))
+
+    def configure(self, depth: int, quantum: int) -> None:
+        """Store dispatch settings (read by every process that dispatches)"""
+        self.connection.hset(self._key('settings'), mapping={
+            'depth': max(1, depth),
+            'quantum': max(1, quantum),
+        })
+
+    def _settings(self):
+        raw = self.connection.hgetall(self._key('settings'))
+        depth = int(raw.get(b'depth', 4))
+        quantum = int(raw.get(b'quantum', 25))
+        return depth, quantum
+
+    def submit(self, user_id: int, jobs: list, costs: list, cap: int) -> None:
+        """
+        Hold saved (not enqueued) jobs for a tenant and dispatch what fits
+
+        Args:
+            user_id: Tenant
+            jobs: Jobs created with QueueManager.create_job
+            costs: Products per job
+            cap: Tenant's concurrency cap
+        """
+        with self.connection.pipeline() as pipe:
+            pipe.rpush(self._key('pending', user_id),
+                       *[f'{job.id}:{cost}' for job, cost in zip(jobs, costs)])
+            pipe.hset(self._key('cap'), user_id, cap)
+            # Join the ring once; dispatch drops tenants with nothing pending
+            pipe.lrem(self._key('ring'), 0, user_id)
+            pipe.rpush(self._key('ring'), user_id)
+            pipe.execute()
+
+        self.dispatch()
+
+    def pending_count(self) -> int:
+        """Chunks held back from the lane, across all tenants"""
+        tenants = self.connection.lrange(self._key('ring'), 0, -1)
+        if not tenants:
+            return 0
+
+        with self.connection.pipeline(transaction=False) as pipe:
+            for user_id in tenants:
+                pipe.llen(self._key('pending', user_id.decode()))
+            return sum(pipe.execute())
+
+    def release(self, job_id: str, user_id: int) -> None:
+        """Free a tenant's slot once its chunk is done, then refill the lane"""
+        self.connection.srem(self._key('running', user_id), job_id)
+        self.dispatch()
+
+    def dispatch(self) -> int:
+        """
+        Move pending chunks onto the lane, fairly, while it has room
+
+        Returns:
+            int: Number of jobs enqueued
+        """
+        lock = self.connection.lock(self._key('lock'), timeout=30, blocking_timeout=5)
+        if not lock.acquire():
+            return 0
+
+        try:
+            return self._dispatch()
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                pass
+
+    def _dispatch(self) -> int:
+        depth, quantum = self._settings()
+        queue = Queue(self.lane, connection=self.connection, serializer=JobSerializer)
+
+        room = depth - queue.count
+        dispatched = 0
+        idle_visits = 0
+
+        while room > 0:
+            tenants = self.connection.llen(self._key('ring'))
+            if tenants == 0 or idle_visits >= tenants:
+                break
+
+            user_id = self.connection.lpop(self._key('ring')).decode()
+            pending_key = self._key('pending', user_id)
+
+            if self.connection.llen(pending_key) == 0:
+                self._retire(user_id)
+                continue
+
+            cap = int(self.connection.hget(self._key('cap'), user_id) or 1)
+            running = self._running(user_id, at_cap=cap)
+
+            sent = 0
+            if running < cap:
+                deficit = float(self.connection.hget(self._key('deficit'), user_id) or 0)
+                deficit += quantum
+
+                while room > 0 and running < cap:
+                    head = self.connection.lindex(pending_key, 0)
+                    if head is None:
+                        break
+
+                    job_id, cost = head.decode().rsplit(':', 1)
+                    if int(cost) > deficit:
+                        break
+
+                    self.connection.lpop(pending_key)
+                    if not self._enqueue(queue, job_id, user_id):
+                        continue
+
+                    deficit -= int(cost)
+                    running += 1
+                    room -= 1
+                    sent += 1
+
+                if self.connection.llen(pending_key) == 0:
+                    self._retire(user_id)
+                    dispatched += sent
+                    idle_visits = 0
+                    continue
+
+                self.connection.hset(self._key('deficit'), user_id, deficit)
+
+            self.connection.rpush(self._key('ring'), user_id)
+            dispatched += sent
+            # Only tenants at their cap count as idle; one short on credit
+            # has more of it on its next turn
+            idle_visits = idle_visits + 1 if running >= cap and not sent else 0
+
+        return dispatched
+
+    def _running(self, user_id, at_cap: int) -> int:
+        """Tenant's slot count, pruning finished jobs when it looks full"""
+        running_key = self._key('running', user_id)
+        job_ids = [job_id.decode() for job_id in self.connection.smembers(running_key)]
+
+        if len(job_ids) < at_cap:
+            return len(job_ids)
+
+        # Callbacks never fire for jobs whose worker was killed
+        jobs = Job.fetch_many(job_ids, connection=self.connection, serializer=JobSerializer)
+        stale = [
+            job_id for job_id, job in zip(job_ids, jobs)
+            if job is None or job.get_status(refresh=False) in _DONE
+        ]
+        if stale:
+            self.connection.srem(running_key, *stale)
+
+        return len(job_ids) - len(stale)
+
+    def _enqueue(self, queue, job_id: str, user_id) -> bool:
+        try:
+            job = Job.fetch(job_id, connection=self.connection, serializer=JobSerializer)
+        except NoSuchJobError:
+            return False
+
+        if job.get_status(refresh=False) != JobStatus.QUEUED:
+            # Cancelled while waiting
+            return False
+
+        self.connection.sadd(self._key('running', user_id), job_id)
+        queue.enqueue_job(job)
+        return True
+
+    def _retire(self, user_id) -> None:
+        """Drop an idle tenant from the ring; DRR forgets unspent credit"""
+        with self.connection.pipeline() as pipe:
+            pipe.lrem(self._key('ring'), 0, user_id)
+            pipe.hdel(self._key('deficit'), user_id)
+            pipe.hdel(self._key('cap'), user_id)
+            pipe.execute()
+
+
+def fair_callbacks() -> dict:
+    """Job options that release the tenant's slot however the chunk ends"""
+    callback = Callback(release_chunk)
+    return {
+        'on_success': callback,
+        'on_failure': Callback(release_failed_chunk),
+        'on_stopped': callback,
+    }
+
+
+def release_failed_chunk(job, connection, *args, **kwargs):
+    """RQ failure callback; a chunk about to be retried keeps its slot"""
+    if job.retries_left:
+        return
+    release_chunk(job, connection)
+
+
+def release_chunk(job, connection, *args, **kwargs):
+    """RQ callback for fair-scheduled chunks"""
+    fair = job.meta.get('fair')
+    if not fair:
+        return
+
+    try:
+        FairScheduler(connection, fair['lane']).release(job.id, fair['user_id'])
+    except Exception as e:
+        # The maintenance sweep reclaims the slot if this fails
+        print(f"⚠️  Could not release fair-share slot for {job.id}: {e}")
+
+
+def dispatch_all(connection) -> int:
+    """Refill every fair lane (run periodically by workers)"""
+    return sum(FairScheduler(connection, lane).dispatch() for lane in FAIR_LANES)
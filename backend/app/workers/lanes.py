@@ -0,0 +1,272 @@
+from rq import Worker
+from app.workers.events import JobEventsMixin
+import hashlib
+import math
+import random
+import time
+
+# Generation lanes, by plan tier and job size
+INTERACTIVE_PRIORITY = 'poster-interactive-priority'
+INTERACTIVE = 'poster-interactive'
+BULK_PRIORITY = 'poster-bulk-priority'
+BULK = 'poster-bulk'
+
+# Pre-lane queue; still consumed so jobs enqueued before an upgrade drain
+LEGACY = 'poster-generation'
+
+GENERATION_LANES = [INTERACTIVE_PRIORITY, INTERACTIVE, BULK_PRIORITY, BULK]
+
+# Affinity queues are named '<lane>@<slot>'
+AFFINITY_SEPARATOR = '@'
+
+
+def is_priority_plan(plan) -> bool:
+    """
+    Whether a plan's jobs go to the priority lanes
+
+    A plan can opt in or out explicitly with the 'priority_generation'
+    feature; otherwise every paid plan is priority.
+    """
+    if plan is None:
+        return False
+
+    features = plan.features or {}
+    if 'priority_generation' in features:
+        return bool(features['priority_generation'])
+
+    return (plan.price or 0) > 0
+
+
+def select_lane(user, product_count: int, interactive_max: int = 1) -> str:
+    """
+    Pick the queue for a generation request
+
+    Args:
+        user: Requesting user
+        product_count: Number of posters requested
+        interactive_max: Largest request that counts as interactive
+
+    Returns:
+        str: Queue name
+    """
+    priority = is_priority_plan(user.plan)
+
+    if product_count <= interactive_max:
+        return INTERACTIVE_PRIORITY if priority else INTERACTIVE
+
+    return BULK_PRIORITY if priority else BULK
+
+
+def interactive_lane(lane: str) -> str:
+    """Interactive lane of the same tier (for short follow-up jobs)"""
+    if lane in (INTERACTIVE_PRIORITY, BULK_PRIORITY):
+        return INTERACTIVE_PRIORITY
+    if lane in (INTERACTIVE, BULK):
+        return INTERACTIVE
+    return lane
+
+
+def affinity_slot(key: str, slots: int) -> int:
+    """
+    Slot a routing key belongs to, by rendezvous hashing
+
+    Stable across processes, and changing the slot count only moves the
+    keys of the slots added or removed.
+    """
+    def score(slot):
+        return hashlib.blake2b(f'{key}:{slot}'.encode('utf-8'), digest_size=8).digest()
+
+    return max(range(slots), key=score)
+
+
+def affinity_lane(lane: str, template_id: int, user_id: int, slots: int) -> str:
+    """
+    Worker-specific queue of a lane for a template and its user
+
+    Jobs for the same template and user keep landing on the same
+    worker, whose caches already hold its compiled template, fonts,
+    background and the user's product images.
+
+    Args:
+        lane: Generation lane
+        template_id: Template rendered
+        user_id: Owner (their product images are the rest of the working set)
+        slots: Number of affinity slots (0 = no affinity)
+
+    Returns:
+        str: Queue name
+    """
+    if slots <= 0 or lane not in GENERATION_LANES:
+        return lane
+
+    return f'{lane}{AFFINITY_SEPARATOR}{affinity_slot(f"{template_id}:{user_id}", slots)}'
+
+
+def queue_slot(name: str):
+    """Affinity slot of a queue name, or None for a shared queue"""
+    lane, separator, slot = name.rpartition(AFFINITY_SEPARATOR)
+    if not separator or lane not in GENERATION_LANES or not slot.isdigit():
+        return None
+    return int(slot)
+
+
+def base_lane(name: str) -> str:
+    """Lane an affinity queue belongs to (the name itself otherwise)"""
+    if queue_slot(name) is None:
+        return name
+    return name.rpartition(AFFINITY_SEPARATOR)[0]
+
+
+def with_affinity_queues(queue_names: list, slots: int) -> list:
+    """Queue names plus every affinity queue of the generation lanes among them"""
+    names = []
+    for name in queue_names:
+        names.append(name)
+        if name in GENERATION_LANES:
+            names.extend(f'{name}{AFFINITY_SEPARATOR}{slot}' for slot in range(max(0, slots)))
+    return names
+
+
+def parse_lane_weights(value: str) -> dict:
+    """Parse 'queue:weight,queue:weight' into a dict"""
+    weights = {}
+    for entry in (value or '').split(','):
+        if ':' not in entry:
+            continue
+        name, weight = entry.rsplit(':', 1)
+        weights[name.strip()] = max(float(weight), 0.001)
+    return weights
+
+
+def weighted_order(queues: list, weights: dict) -> list:
+    """
+    Order queues by weighted random sampling without replacement
+
+    A queue with weight 8 comes first eight times as often as one with
+    weight 1, but every queue is still in the list, so a worker never idles
+    while any lane has work.
+    """
+    def sort_key(queue):
+        weight = weights.get(base_lane(queue.name), 1.0)
+        return random.random() ** (1.0 / weight)
+
+    return sorted(queues, key=sort_key, reverse=True)
+
+
+def affinity_order(queues: list, weights: dict, slot: int) -> list:
+    """
+    Order a worker's queues by lane, preferring its own affinity queue in each
+
+    Lanes come in weighted order (see weighted_order; listed order
+    without weights). Within a lane the worker's own affinity queue comes
+    first, then the lane's shared queue, then the other workers' affinity
+    queues of the lane in random order. RQ takes the first non-empty
+    queue, so affinity only decides between jobs of the same lane: a
+    waiting interactive job is taken, stolen if need be, before any bulk
+    job hashed to this worker.
+    """
+    by_lane = {}
+    for queue in queues:
+        by_lane.setdefault(base_lane(queue.name), []).append(queue)
+
+    # One queue stands for each lane in the weighted draw
+    heads = [members[0] for members in by_lane.values()]
+    if weights:
+        heads = weighted_order(heads, weights)
+
+    ordered = []
+    for head in heads:
+        members = by_lane[base_lane(head.name)]
+        others = [queue for queue in members if queue_slot(queue.name) not in (None, slot)]
+        random.shuffle(others)
+
+        ordered.extend(queue for queue in members if queue_slot(queue.name) == slot)
+        ordered.extend(queue for queue in members if queue_slot(queue.name) is None)
+        ordered.extend(others)
+
+    return ordered
+
+
+class WeightedLanesMixin:
+    """
+    Worker mixin that reorders its queues by lane weight before each dequeue
+
+    RQ dequeues from the first non-empty queue in order; reshuffling that
+    order with weights gives interactive lanes most of the capacity under
+    bulk load without starving bulk lanes.
+
+    A worker with an affinity_slot prefers its own affinity queue within
+    each lane (see affinity_lane and affinity_order). When idle it blocks
+    only on those and the shared queues, and takes another worker's job
+    once nothing of its own has arrived for steal_interval seconds (or
+    straight away if one is already waiting), so affinity never leaves a
+    job waiting on a busy worker while another sits idle. Its
+    maintenance pass also refills the fair-share bulk lanes (see
+    app.workers.fair) and schedules the periodic jobs (see
+    app.workers.periodic).
+    """
+
+    lane_weights = None
+    # Affinity slot this worker prefers (None = no preference)
+    affinity_slot = None
+    steal_interval = 2
+
+    def reorder_queues(self, reference_queue):
+        if self.affinity_slot is not None:
+            self._ordered_queues = affinity_order(self.queues, self.lane_weights, self.affinity_slot)
+            return
+
+        if not self.lane_weights:
+            return super().reorder_queues(reference_queue)
+
+        self._ordered_queues = weighted_order(self.queues, self.lane_weights)
+
+    def dequeue_job_and_maintain_ttl(self, timeout, max_idle_time=None):
+        if self.affinity_slot is None or timeout is None:
+            return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+
+        everything = affinity_order(self.queues, self.lane_weights, self.affinity_slot)
+        own = [queue for queue in everything if queue_slot(queue.name) in (None, self.affinity_slot)]
+        started = time.monotonic()
+
+        while True:
+            # Whatever is waiting now, lane by lane: own queue, shared, then stealing
+            self._ordered_queues = everything
+            result = super().dequeue_job_and_maintain_ttl(None)
+            if result is not None:
+                return result
+
+            wait = max(1, self.steal_interval)
+            if max_idle_time is not None:
+                left = max_idle_time - (time.monotonic() - started)
+                if left <= 0:
+                    return None
+                wait = min(wait, left)
+
+            # Only jobs for this worker (or shared ones) wake it up
+            self._ordered_queues = own
+            result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time=math.ceil(wait))
+            if result is not None:
+                return result
+
+    def run_maintenance_tasks(self):
+        super().run_maintenance_tasks()
+
+        # Reclaim fair-share slots whose completion callback never ran
+        from app.workers.fair import dispatch_all
+        try:
+            dispatch_all(self.connection)
+        except Exception as e:
+            self.log.warning('Fair-share dispatch failed: %s', e)
+
+        # Quota sync, campaign pre-rendering (one worker per interval)
+        from app.workers.periodic import schedule_periodic_jobs
+        from app.workers.render_job import get_app
+        try:
+            schedule_periodic_jobs(self.connection, get_app().config)
+        except Exception as e:
+            self.log.warning('Could not schedule periodic jobs: %s', e)
+
+
+class WeightedWorker(JobEventsMixin, WeightedLanesMixin, Worker):
+    """Forking RQ worker with weighted lane consumption and job events"""
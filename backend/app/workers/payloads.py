@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+import json
+import zlib
+
+PAYLOAD_VERSION = 1
+
+
+def build_render_payload(template, products: list, user_id: int, campaign=None) -> dict:
+    """
+    Snapshot everything a render worker needs into a plain dict
+
+    Args:
+        template: Template
+        products: Products, in render order
+        user_id: Owner
+        campaign: Optional campaign
+
+    Returns:
+        dict: Render payload
+    """
+    from app.workers.render_job import build_data_context, campaign_fields
+
+    derived = campaign_fields(campaign, products)
+
+    return {
+        'v': PAYLOAD_VERSION,
+        'user_id': user_id,
+        'campaign_id': campaign.id if campaign else None,
+        'template': snapshot_template(template),
+        'items': [
+            [product.id, product.name, build_data_context(product, campaign, fields)]
+            for product, fields in zip(products, derived)
+        ],
+    }
+
+
+def snapshot_template(template) -> dict:
+    """Plain copy of the template attributes rendering needs"""
+    return {
+        'id': template.id,
+        'name': template.name,
+        'format': template.format,
+        'json_definition': template.json_definition,
+        'background_url': template.background_url,
+        'cache_key': template.cache_key,
+        'render_version': getattr(template, 'render_version', None),
+    }
+
+
+def pack_payload(payload: dict) -> bytes:
+    """Serialize a payload to compressed JSON"""
+    raw = json.dumps(payload, separators=(',', ':'), default=str)
+    return zlib.compress(raw.encode('utf-8'), 6)
+
+
+def unpack_payload(blob: bytes) -> dict:
+    """Inverse of pack_payload"""
+    payload = json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    if payload.get('v') != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported payload version {payload.get('v')}")
+
+    return payload
+
+
+def template_from_payload(template: dict) -> SimpleNamespace:
+    """Template stand-in with the attributes the render helpers read"""
+    return SimpleNamespace(**template)
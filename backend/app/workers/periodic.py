@@ -0,0 +1,49 @@
+from rq import Queue
+from app.workers.prerender import prerender_campaigns
+from app.workers.quota import sync_quota_usage
+from app.workers.results import purge_job_results
+from app.workers.serialization import JobSerializer
+
+LOCK_PREFIX = 'postraft:periodic'
+
+# Fleet-wide jobs run from worker maintenance: (name, job function, interval config key)
+PERIODIC_JOBS = [
+    ('quota-sync', sync_quota_usage, 'QUOTA_SYNC_INTERVAL'),
+    ('campaign-prerender', prerender_campaigns, 'PRERENDER_INTERVAL'),
+    ('result-cleanup', purge_job_results, 'RESULT_CLEANUP_INTERVAL'),
+]
+
+
+def schedule_periodic(connection, name: str, func, interval: int, queue_name: str = 'default') -> bool:
+    """
+    Enqueue `func` at most once per `interval` seconds across all workers
+
+    Every worker calls this on its maintenance pass; a lock key that
+    expires after `interval` lets exactly one of them enqueue the job.
+
+    Returns:
+        bool: Whether the job was enqueued
+    """
+    if interval <= 0 or not connection.set(f'{LOCK_PREFIX}:{name}', 1, nx=True, ex=interval):
+        return False
+
+    Queue(queue_name, connection=connection, serializer=JobSerializer).enqueue(func, job_timeout=900)
+    return True
+
+
+def schedule_periodic_jobs(connection, config) -> list:
+    """
+    Enqueue the periodic jobs that are due
+
+    Args:
+        connection: Redis connection
+        config: App config (intervals; 0 disables a job)
+
+    Returns:
+        list: Names of the jobs enqueued
+    """
+    return [
+        name
+        for name, func, interval_key in PERIODIC_JOBS
+        if schedule_periodic(connection, name, func, config[interval_key])
+    ]
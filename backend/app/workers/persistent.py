@@ -0,0 +1,151 @@
+from redis import Redis
+from rq import Queue, SimpleWorker
+from app.workers.events import JobEventsMixin
+from app.workers.lanes import WeightedLanesMixin
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+import os
+import signal
+import time
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is reported in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PersistentWorker(JobEventsMixin, WeightedLanesMixin, SimpleWorker):
+    """
+    Non-forking RQ worker that keeps in-process caches between jobs
+
+    Jobs run in this process, so fonts, compiled templates, decoded images
+    and HTTP connection pools loaded by one job are still there for the
+    next. RQ still applies the job timeout (SIGALRM death penalty) and
+    records exceptions as job failures. The worker stops itself once its
+    RSS grows past max_memory_mb so a supervisor can replace it.
+    """
+
+    max_memory_mb = None
+
+    def execute_job(self, job, queue):
+        super().execute_job(job, queue)
+
+        if self.max_memory_mb and current_rss_mb() > self.max_memory_mb:
+            self.log.info('Worker %s: RSS above %s MB, recycling',
+                          self.key, self.max_memory_mb)
+            self._stop_requested = True
+
+
+def _run_child(app, queue_names, max_jobs, max_memory_mb, lane_weights=None, index=None):
+    """Work loop of one pool process (the index-th of its pool)"""
+    # Fresh connection: never share a socket with the parent
+    QueueManager.reset()
+    redis_conn = Redis.from_url(app.config['REDIS_URL'])
+    queues = [Queue(name, connection=redis_conn, serializer=JobSerializer) for name in queue_names]
+
+    worker = PersistentWorker(queues, connection=redis_conn, serializer=JobSerializer)
+    worker.max_memory_mb = max_memory_mb
+    worker.lane_weights = lane_weights
+
+    # Each pool position keeps its own share of templates warm
+    if app.config['AFFINITY_ROUTING'] and index is not None and app.config['AFFINITY_SLOTS'] > 0:
+        worker.affinity_slot = index % app.config['AFFINITY_SLOTS']
+        worker.steal_interval = app.config['AFFINITY_STEAL_INTERVAL']
+
+    worker.work(max_jobs=max_jobs or None, with_scheduler=True)
+
+
+def fork_worker(app, queue_names, max_jobs, max_memory_mb, lane_weights=None, index=None) -> int:
+    """
+    Fork a pool process running a PersistentWorker
+
+    A replacement takes the index (and so the affinity slot) of the
+    process it replaces.
+
+    Returns:
+        int: Child PID (in the parent; the child never returns)
+    """
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            _run_child(app, queue_names, max_jobs,
+                       max_memory_mb, lane_weights, index)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run_pool(app, queue_names, size=2, max_jobs=500, max_memory_mb=1024, lane_weights=None):
+    """
+    Run a pre-forked pool of long-lived workers
+
+    Each child is a PersistentWorker, so at most `size` jobs run at once.
+    Children exit after `max_jobs` jobs or once they pass `max_memory_mb`,
+    and the parent forks a replacement. Forking from the warmed-up parent
+    gives replacements the preloaded fonts and templates for free.
+
+    Args:
+        app: Flask app (already warmed up)
+        queue_names: Queues to listen on
+        size: Number of worker processes
+        max_jobs: Jobs per child before recycling (0 = unlimited)
+        max_memory_mb: RSS per child before recycling (0 = unlimited)
+        lane_weights: Optional queue weights (see app.workers.lanes)
+    """
+    children = {}
+    stopping = False
+
+    indexes = {}
+
+    def spawn(index):
+        pid = fork_worker(app, queue_names, max_jobs, max_memory_mb, lane_weights, index)
+        children[pid] = time.time()
+        indexes[pid] = index
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Warm shutdown: each child finishes its current job, then exits
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for index in range(size):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        started = children.pop(pid, None)
+        index = indexes.pop(pid, None)
+        if stopping or started is None:
+            continue
+
+        # Back off if children die straight away (e.g. Redis unreachable)
+        if time.time() - started < 1:
+            time.sleep(1)
+
+        print(f"♻️  Worker {pid} exited, starting a replacement")
+        spawn(index)
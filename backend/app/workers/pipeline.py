@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.workers.payloads import snapshot_template, template_from_payload
+import queue
+import threading
+
+# Marks the end of the render stage's output
+_DONE = object()
+
+
+class ProductNotFound(ValueError):
+    """Reported for items whose product no longer exists (nothing to render)"""
+
+
+def run_render_pipeline(app, renderer, template, items, on_result, upload_workers: int = 4, depth: int = 8,
+                        should_stop=None):
+    """
+    Render, upload and persist a batch as three overlapping stages
+
+    - render: one thread draws posters in order (the renderer and its
+      caches are not shared between threads)
+    - upload: `upload_workers` threads push rendered PNGs to storage
+    - persist: `on_result` runs on the calling thread, which owns the
+      database session, in product order
+
+    At most `depth` posters are rendered but not yet handed to on_result,
+    so a slow storage backend pauses rendering instead of piling up PNGs
+    in memory. With upload_workers=0 every item runs in sequence on the
+    calling thread. Once `should_stop` returns True, no further items are
+    rendered or reported (uploads already running are left to finish).
+
+    Args:
+        app: Flask app (upload threads need its context for storage config)
+        renderer: PosterRenderer
+        template: Template or template stand-in
+        items: (product_id, product_name, data) tuples; data None means
+            the product no longer exists. May be a lazy iterator: it is
+            consumed on the render thread, so it must not use the
+            database session
+        on_result: Called as on_result(product_id, product_name,
+            image_url, error) with exactly one of image_url/error set
+            (ProductNotFound for items without data)
+        upload_workers: Upload threads (0 = no pipelining)
+        depth: Max posters in flight between render and persist
+        should_stop: Optional callable checked before each item
+    """
+    from app.workers.render_job import render_poster, upload_poster
+
+    # Render thread must not lazy-load from the caller's session
+    template = template_from_payload(snapshot_template(template))
+
+    if upload_workers <= 0:
+        for product_id, product_name, data in items:
+            if should_stop and should_stop():
+                return
+
+            image_url = error = None
+            try:
+                if data is None:
+                    raise ProductNotFound(f"Product {product_id} not found")
+                image_bytes = render_poster(renderer, template, data)
+                image_url = upload_poster(image_bytes, template, product_id)
+            except Exception as e:
+                error = e
+            on_result(product_id, product_name, image_url, error)
+        return
+
+    in_flight = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def upload(image_bytes, product_id):
+        with app.app_context():
+            return upload_poster(image_bytes, template, product_id)
+
+    def hand_over(entry) -> bool:
+        # Blocks while the pipeline is full; gives up if the consumer quit
+        while not stop.is_set():
+            try:
+                in_flight.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def render_stage(uploads):
+        try:
+            for product_id, product_name, data in items:
+                if stop.is_set() or (should_stop and should_stop()):
+                    return
+
+                try:
+                    if data is None:
+                        raise ProductNotFound(f"Product {product_id} not found")
+                    image_bytes = render_poster(renderer, template, data)
+                except Exception as e:
+                    entry = (product_id, product_name, None, e)
+                else:
+                    future = uploads.submit(upload, image_bytes, product_id)
+                    entry = (product_id, product_name, future, None)
+
+                if not hand_over(entry):
+                    return
+        finally:
+            hand_over(_DONE)
+
+    renders = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render')
+    uploads = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix='upload')
+
+    try:
+        producer = renders.submit(render_stage, uploads)
+
+        while True:
+            entry = in_flight.get()
+            if entry is _DONE:
+                break
+            if should_stop and should_stop():
+                stop.set()
+                break
+
+            product_id, product_name, future, error = entry
+            image_url = None
+
+            if error is None:
+                try:
+                    image_url = future.result()
+                except Exception as e:
+                    error = e
+
+            on_result(product_id, product_name, image_url, error)
+
+        # Surface a crash of the render stage itself
+        producer.result()
+    finally:
+        stop.set()
+        renders.shutdown(wait=False, cancel_futures=True)
+        uploads.shutdown(wait=False, cancel_futures=True)
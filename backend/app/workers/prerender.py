@@ -0,0 +1,29 @@
+from datetime import datetime
+
+
+def prerender_campaigns():
+    """
+    Queue posters of campaigns starting soon (periodic background job)
+
+    Runs only inside the off-peak PRERENDER_HOURS window (UTC); the
+    renders themselves go to the owner's bulk lane, behind interactive
+    work. Plans opt in with the 'campaign_prerender' feature.
+
+    Returns:
+        dict: Summary (see CampaignPrerenderService.prerender_due)
+    """
+    from app.core.campaigns.prerender_service import CampaignPrerenderService
+    from app.workers.render_job import get_app
+
+    app = get_app()
+
+    with app.app_context():
+        if not CampaignPrerenderService.in_hours(app.config['PRERENDER_HOURS'], datetime.utcnow().hour):
+            return {'queued': [], 'skipped': 0, 'refused': [], 'off_peak': False}
+
+        summary = CampaignPrerenderService.prerender_due(app.config['PRERENDER_HORIZON_DAYS'])
+
+        print(f"📅 Campaign pre-render: {len(summary['queued'])} queued, "
+              f"{summary['skipped']} skipped, {len(summary['refused'])} refused")
+
+        return summary
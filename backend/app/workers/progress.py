@@ -0,0 +1,117 @@
+from rq import get_current_job
+from app.workers.events import event_job_id, publish_job_event
+import time
+
+
+class BatchProgress:
+    """
+    Publishes live batch progress into the running job's meta
+
+    Writes are throttled to one every `min_interval` seconds (plus a final
+    one) and sent as a single pipelined HSET, so a 500-item batch adds a
+    handful of Redis round trips rather than one per item. Each write also
+    publishes a 'progress' event for status streams (app.workers.events).
+
+    Usage:
+        progress = BatchProgress(total=len(product_ids))
+        for product_id in product_ids:
+            progress.start_item(product_id)
+            ...
+            progress.finish_item(success=True)
+        progress.flush(force=True)
+    """
+
+    def __init__(self, total: int, job=None, min_interval: float = 1.0, smoothing: float = 0.2):
+        self.job = job if job is not None else get_current_job()
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.current = None
+        self.min_interval = min_interval
+        self.smoothing = smoothing
+
+        # Exponential moving average of seconds per item
+        self.avg_duration = None
+
+        self._item_started = None
+        self._last_completed = time.time()
+        self._last_flush = 0.0
+
+    def start_item(self, item) -> None:
+        """Mark an item as the one being rendered"""
+        self.current = item
+        self._item_started = time.time()
+
+    def finish_item(self, success: bool = True) -> None:
+        """Record the outcome of the current item"""
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+        if self._item_started is not None:
+            duration = time.time() - self._item_started
+            if self.avg_duration is None:
+                self.avg_duration = duration
+            else:
+                self.avg_duration += self.smoothing * (duration - self.avg_duration)
+            self._item_started = None
+
+        self.flush()
+
+    def complete_item(self, item, success: bool = True) -> None:
+        """
+        Record an item finished by a pipeline (see app.workers.pipeline)
+
+        Items overlap in a pipeline, so the duration recorded is the time
+        since the previous completion, i.e. the pipeline's throughput,
+        which is what the ETA needs. `current` becomes the last item done.
+        """
+        now = time.time()
+        self._item_started = self._last_completed
+        self._last_completed = now
+        self.current = item
+        self.finish_item(success)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.completed - self.failed)
+
+    @property
+    def eta_seconds(self):
+        if self.avg_duration is None:
+            return None
+        return round(self.avg_duration * self.remaining, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'current': self.current,
+            'avg_duration': round(self.avg_duration, 3) if self.avg_duration is not None else None,
+            'eta_seconds': self.eta_seconds,
+        }
+
+    def flush(self, force: bool = False) -> None:
+        """Write progress to job meta (throttled unless forced)"""
+        if self.job is None:
+            return
+
+        now = time.time()
+        if not force and now - self._last_flush < self.min_interval:
+            return
+        self._last_flush = now
+
+        self.job.meta['progress'] = self.to_dict()
+
+        try:
+            with self.job.connection.pipeline() as pipe:
+                pipe.hset(self.job.key, 'meta',
+                          self.job.serializer.dumps(self.job.meta))
+                publish_job_event(self.job.connection, event_job_id(self.job),
+                                  'progress', pipeline=pipe)
+                pipe.execute()
+        except Exception as e:
+            # Progress is best effort; never fail the batch over it
+            print(f"⚠️  Could not publish progress: {e}")
@@ -1,6 +1,8 @@
 from redis import Redis
 from rq import Queue
 from flask import current_app
+from app.workers.results import attach_ingested, expand_result, ingest_job_ids
+from app.workers.serialization import JobSerializer
 
 
 class QueueManager:
@@ -18,6 +20,12 @@ class QueueManager:
             cls._redis_conn = Redis.from_url(redis_url)
         return cls._redis_conn
 
+    @classmethod
+    def reset(cls):
+        """Forget the cached connection and queues (in a forked child)"""
+        cls._redis_conn = None
+        cls._queues = {}
+
     @classmethod
     def get_queue(cls, queue_name='default'):
         """
@@ -31,7 +39,7 @@ class QueueManager:
         """
         if queue_name not in cls._queues:
             redis_conn = cls.get_redis_connection()
-            cls._queues[queue_name] = Queue(queue_name, connection=redis_conn)
+            cls._queues[queue_name] = Queue(queue_name, connection=redis_conn, serializer=JobSerializer)
 
         return cls._queues[queue_name]
 
@@ -51,10 +59,52 @@ class QueueManager:
             Job: RQ Job instance
         """
         queue = cls.get_queue(queue_name)
+        final_job_kwargs = cls._job_options(timeout, job_kwargs)
+
+        # Use enqueue_call to clearly separate function args from job options.
+        try:
+            job = queue.enqueue_call(
+                func=func, args=args, kwargs=None, **final_job_kwargs)
+        except TypeError:
+            # Fallback for older RQ versions that may not expose enqueue_call
+            job = queue.enqueue(func, *args, **final_job_kwargs)
+
+        return job
+
+    @classmethod
+    def create_job(cls, func, *args, queue_name='default', timeout=None, **job_kwargs):
+        """
+        Create and save a job without pushing it onto its queue
+
+        Used when something other than RQ decides when the job runs
+        (see app.workers.fair); push it later with Queue.enqueue_job.
+
+        Args:
+            func: Function to execute
+            *args: Function arguments
+            queue_name: Queue the job will run on
+            timeout: Job timeout in seconds
+            **job_kwargs: Additional job parameters (result_ttl, etc.)
 
+        Returns:
+            Job: RQ Job instance
+        """
+        queue = cls.get_queue(queue_name)
+        final_job_kwargs = cls._job_options(timeout, job_kwargs)
+
+        job = queue.create_job(func, args=args, **final_job_kwargs)
+        job.origin = queue.name
+        job.save()
+
+        return job
+
+    @staticmethod
+    def _job_options(timeout, job_kwargs):
+        """Merge job kwargs with the default TTLs and timeout"""
         defaults = {
             'timeout': 600,      # 10 minutes
-            'result_ttl': 3600,  # 1 hour
+            # As long as the job_results rows its summary points to
+            'result_ttl': current_app.config['JOB_RESULT_TTL'],
             'failure_ttl': 86400,  # 24 hours
         }
 
@@ -65,15 +115,7 @@ class QueueManager:
         if timeout is not None:
             final_job_kwargs['timeout'] = timeout
 
-        # Use enqueue_call to clearly separate function args from job options.
-        try:
-            job = queue.enqueue_call(
-                func=func, args=args, kwargs=None, **final_job_kwargs)
-        except TypeError:
-            # Fallback for older RQ versions that may not expose enqueue_call
-            job = queue.enqueue(func, *args, **final_job_kwargs)
-
-        return job
+        return final_job_kwargs
 
     @classmethod
     def get_job(cls, job_id, queue_name='default'):
@@ -91,50 +133,230 @@ class QueueManager:
         redis_conn = cls.get_redis_connection()
 
         try:
-            return Job.fetch(job_id, connection=redis_conn)
+            return Job.fetch(job_id, connection=redis_conn, serializer=JobSerializer)
         except:
             return None
 
     @classmethod
-    def get_job_status(cls, job_id):
+    def get_job_status(cls, job_id, user_id=None):
         """
         Get job status
 
         Args:
             job_id: Job ID
+            user_id: Only report the job if it is this user's
 
         Returns:
             dict: Job status info
         """
+        from rq.job import Job
+
         job = cls.get_job(job_id)
 
-        if not job:
+        if not job or (user_id is not None and job.meta.get('user_id') != user_id):
             return {
                 'status': 'not_found',
                 'message': 'Job not found'
             }
 
+        children = cls._pending_children(job)
+        if children:
+            children = Job.fetch_many(children, connection=cls.get_redis_connection(), serializer=JobSerializer)
+
+        return cls._format_status(job, children)
+
+    @classmethod
+    def get_jobs_status(cls, job_ids, user_id=None):
+        """
+        Get a compact status for several jobs
+
+        Jobs are loaded with one pipelined fetch_many, and the chunks of
+        every chunked batch among them with a second one.
+
+        Args:
+            job_ids: Job IDs
+            user_id: Only report jobs of this user (others read as not_found)
+
+        Returns:
+            dict: job_id -> status and progress; results are left out
+                (one extra round trip per job), use get_job_status for them
+        """
+        from rq.job import Job
+        redis_conn = cls.get_redis_connection()
+
+        jobs = [
+            job if job is not None and (user_id is None or job.meta.get('user_id') == user_id) else None
+            for job in Job.fetch_many(job_ids, connection=redis_conn, serializer=JobSerializer)
+        ]
+
+        child_ids = [
+            child_id
+            for job in jobs if job
+            for child_id in cls._pending_children(job)
+        ]
+        children_by_id = dict(zip(
+            child_ids, Job.fetch_many(child_ids, connection=redis_conn, serializer=JobSerializer))) if child_ids else {}
+
+        statuses = {}
+        for job_id, job in zip(job_ids, jobs):
+            if not job:
+                statuses[job_id] = {'status': 'not_found'}
+                continue
+
+            statuses[job_id] = cls._format_status(
+                job,
+                [children_by_id[child_id] for child_id in cls._pending_children(job)],
+                compact=True
+            )
+
+        return statuses
+
+    @staticmethod
+    def _pending_children(job):
+        """Chunk job IDs of a chunked batch that is still running"""
+        if job.get_status(refresh=False) in ('finished', 'failed'):
+            return []
+        return job.meta.get('children') or []
+
+    @classmethod
+    def _format_status(cls, job, children=None, compact=False):
+        """
+        Build the status dict of a fetched job (no further Redis reads
+        unless the full result is included)
+
+        Args:
+            job: RQ Job
+            children: Fetched chunk jobs, for a running chunked batch
+            compact: Leave out timestamps and the result, and cut the
+                error down to its last line
+        """
+        job_status = job.get_status(refresh=False)
+
         status_map = {
             'queued': 'pending',
+            'deferred': 'pending',  # chunked batch parent waiting on chunks
             'started': 'processing',
             'finished': 'completed',
             'failed': 'failed',
         }
 
-        result = {
-            'status': status_map.get(job.get_status(), 'unknown'),
-            'created_at': job.created_at.isoformat() if job.created_at else None,
-            'started_at': job.started_at.isoformat() if job.started_at else None,
-            'ended_at': job.ended_at.isoformat() if job.ended_at else None,
-        }
+        result = {'status': status_map.get(job_status, 'unknown')}
+
+        if not compact:
+            result.update({
+                'created_at': job.created_at.isoformat() if job.created_at else None,
+                'started_at': job.started_at.isoformat() if job.started_at else None,
+                'ended_at': job.ended_at.isoformat() if job.ended_at else None,
+            })
+
+        # Live batch progress (published by BatchProgress)
+        if 'progress' in job.meta and job_status != 'finished':
+            result['progress'] = job.meta['progress']
+
+        # Chunked batch: report combined progress of the chunk jobs
+        if children:
+            result.update(cls._summarize_chunks(children, job.meta.get('total')))
+
+        # Cancel requested (see app.workers.cancellation); chunks that were
+        # already rendering stop at their next item
+        if job.meta.get('cancelled'):
+            result['status'] = 'cancelled' if job_status in ('finished', 'failed') else 'cancelling'
 
-        # Add result if completed
-        if job.is_finished:
-            result['result'] = job.result
+        # Payload jobs: posters are only in the database once their ingest
+        # jobs have run, so the job is not complete before then
+        ingests = []
+        if job_status == 'finished':
+            ingests = cls._ingest_jobs(job)
+            ingest_states = [ingest.get_status(refresh=False) for ingest in ingests]
+
+            if any(state not in ('finished', 'failed') for state in ingest_states):
+                result['status'] = 'ingesting'
+                return result
+
+            if 'failed' in ingest_states:
+                result['status'] = 'failed'
+                result['error'] = 'Rendered posters could not be saved'
+
+        # Add result if completed (batch lists are stored outside Redis)
+        if job_status == 'finished' and not compact:
+            result['result'] = expand_result(job.id, job.result)
+            if ingests:
+                attach_ingested(result['result'], [
+                    ingest.result for ingest in ingests
+                    if ingest.get_status(refresh=False) == 'finished' and ingest.result
+                ])
 
         # Add error if failed
-        if job.is_failed:
-            result['error'] = str(
-                job.exc_info) if job.exc_info else 'Unknown error'
+        if job_status == 'failed':
+            error = str(job.exc_info) if job.exc_info else 'Unknown error'
+            if compact:
+                error = error.strip().splitlines()[-1]
+            result['error'] = error
 
         return result
+
+    @classmethod
+    def _ingest_jobs(cls, job):
+        """Ingest jobs of a finished payload job (expired ones left out)"""
+        from rq.job import Job
+
+        ids = ingest_job_ids(job.result)
+        if not ids:
+            return []
+
+        ingests = Job.fetch_many(ids, connection=cls.get_redis_connection(), serializer=JobSerializer)
+        return [ingest for ingest in ingests if ingest is not None]
+
+    @staticmethod
+    def _summarize_chunks(children, total=None):
+        """Combine fetched chunk jobs (None = expired) into batch status"""
+        statuses = [
+            child.get_status(refresh=False) if child else 'failed'
+            for child in children
+        ]
+
+        completed = statuses.count('finished')
+        failed = statuses.count('failed')
+        started = any(status != 'queued' for status in statuses)
+
+        # Combine per-chunk item progress
+        items_done = 0
+        items_failed = 0
+        current = []
+        durations = []
+        for child, status in zip(children, statuses):
+            progress = child.meta.get('progress') if child else None
+            if not progress:
+                continue
+            items_done += progress['completed']
+            items_failed += progress['failed']
+            if status == 'started' and progress.get('current') is not None:
+                current.append(progress['current'])
+            if progress.get('avg_duration') is not None:
+                durations.append(progress['avg_duration'])
+
+        total = total or sum(
+            len(child.meta.get('product_ids', [])) for child in children if child)
+        remaining = max(0, total - items_done - items_failed)
+        running = max(1, statuses.count('started'))
+
+        eta = None
+        if durations:
+            avg = sum(durations) / len(durations)
+            eta = round(avg * remaining / running, 1)
+
+        return {
+            'status': 'processing' if started else 'pending',
+            'chunks': {
+                'total': len(statuses),
+                'completed': completed,
+                'failed': failed,
+            },
+            'progress': {
+                'total': total,
+                'completed': items_done,
+                'failed': items_failed,
+                'current': current,
+                'eta_seconds': eta,
+            },
+        }
@@ -0,0 +1,466 @@
+from datetime import datetime
+from rq.job import Job, JobStatus
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+import time
+
+QUOTA_PREFIX = 'postraft:quota'
+
+# Sorted set of open holds ('<period>|<user>|<hold id>', scored by creation time)
+HOLDS_KEY = f'{QUOTA_PREFIX}:holds'
+# Set of '<period>|<user>' whose usage changed since the last sync
+DIRTY_KEY = f'{QUOTA_PREFIX}:dirty'
+
+# Usage hashes outlive their month long enough to be synced
+USAGE_TTL = 62 * 86400
+
+# Holds younger than this are never swept (their job may not be saved yet)
+HOLD_GRACE = 300
+
+# Posters charged by each job (postraft:quota:charged:<job id>), kept as
+# long as a failed job can be retried (its failure_ttl)
+CHARGED_PREFIX = f'{QUOTA_PREFIX}:charged'
+CHARGED_TTL = 86400
+
+# Job states after which a job will never use its hold
+_DONE = {JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED}
+
+# Seed 'used' from the database the first time a month's hash is touched
+_SEED = """
+if redis.call('HSETNX', KEYS[1], 'seeded', 1) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'used', ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {tonumber(redis.call('HGET', KEYS[1], 'used') or '0'),
+        tonumber(redis.call('HGET', KEYS[1], 'reserved') or '0')}
+"""
+
+_RESERVE = """
+if redis.call('HSETNX', KEYS[1], 'seeded', 1) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'used', ARGV[2])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+
+local used = tonumber(redis.call('HGET', KEYS[1], 'used') or '0')
+local reserved = tonumber(redis.call('HGET', KEYS[1], 'reserved') or '0')
+local limit = tonumber(ARGV[1])
+local count = tonumber(ARGV[7])
+local remaining = limit - used - reserved
+
+if limit >= 0 and count > remaining then
+    return {0, math.max(0, remaining)}
+end
+
+redis.call('HINCRBY', KEYS[1], 'hold:' .. ARGV[6], count)
+redis.call('HINCRBY', KEYS[1], 'reserved', count)
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[4] .. ARGV[6])
+
+if limit < 0 then
+    return {1, -1}
+end
+return {1, remaining - count}
+"""
+
+_SPLIT = """
+local from = 'hold:' .. ARGV[3]
+local held = tonumber(redis.call('HGET', KEYS[1], from) or '0')
+
+for i = 4, #ARGV, 2 do
+    local count = math.min(held, tonumber(ARGV[i + 1]))
+    if count > 0 then
+        redis.call('HINCRBY', KEYS[1], 'hold:' .. ARGV[i], count)
+        redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1] .. ARGV[i])
+        held = held - count
+    end
+end
+
+if held > 0 then
+    redis.call('HSET', KEYS[1], from, held)
+else
+    redis.call('HDEL', KEYS[1], from)
+    redis.call('ZREM', KEYS[2], ARGV[1] .. ARGV[3])
+end
+return held
+"""
+
+_COMMIT = """
+local count = tonumber(ARGV[1])
+
+if ARGV[2] ~= '' then
+    local field = 'hold:' .. ARGV[2]
+    local held = tonumber(redis.call('HGET', KEYS[1], field) or '0')
+    local take = math.min(count, held)
+    if take > 0 then
+        redis.call('HINCRBY', KEYS[1], 'reserved', -take)
+    end
+    if held - take > 0 then
+        redis.call('HSET', KEYS[1], field, held - take)
+    else
+        redis.call('HDEL', KEYS[1], field)
+        redis.call('ZREM', KEYS[2], ARGV[4] .. ARGV[2])
+    end
+end
+
+redis.call('HINCRBY', KEYS[1], 'used', count)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[5])
+
+if ARGV[6] ~= '' then
+    redis.call('INCRBY', KEYS[4], count)
+    redis.call('EXPIRE', KEYS[4], ARGV[6])
+end
+return count
+"""
+
+_RELEASE = """
+local field = 'hold:' .. ARGV[1]
+local held = tonumber(redis.call('HGET', KEYS[1], field) or '0')
+local count = held
+if ARGV[2] ~= '' then
+    count = math.min(held, tonumber(ARGV[2]))
+end
+
+if count > 0 then
+    redis.call('HINCRBY', KEYS[1], 'reserved', -count)
+end
+if held - count > 0 then
+    redis.call('HSET', KEYS[1], field, held - count)
+else
+    redis.call('HDEL', KEYS[1], field)
+    redis.call('ZREM', KEYS[2], ARGV[3] .. ARGV[1])
+end
+return count
+"""
+
+
+def current_period(now: datetime = None) -> str:
+    """Quota period (calendar month, UTC) as 'YYYY-MM'"""
+    return (now or datetime.utcnow()).strftime('%Y-%m')
+
+
+def period_start(period: str) -> datetime:
+    return datetime.strptime(period, '%Y-%m')
+
+
+def seed_usage(user, period: str) -> int:
+    """Usage recorded in the database for `period` (0 once the month rolled over)"""
+    if user.last_reset is None or user.last_reset < period_start(period):
+        return 0
+    return user.monthly_generations or 0
+
+
+class QuotaLedger:
+    """
+    Monthly generation quota, kept in Redis
+
+    Each user has one hash per month (postraft:quota:<YYYY-MM>:<user>)
+    with 'used', 'reserved' and one 'hold:<job id>' field per job that
+    has posters reserved. A request reserves its posters atomically before
+    anything is enqueued (so concurrent requests can never overshoot the
+    plan), and the jobs then commit what they saved and release the rest.
+    All updates are Lua scripts, so they are atomic and cost one round
+    trip each.
+
+    A new month is a new hash: there is no reset to run. The first time a
+    month's hash is used it is seeded from users.monthly_generations if
+    the database row belongs to that month (last_reset). The database is
+    brought up to date in bulk by sync_quota_usage.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._seed = connection.register_script(_SEED)
+        self._reserve = connection.register_script(_RESERVE)
+        self._split = connection.register_script(_SPLIT)
+        self._commit = connection.register_script(_COMMIT)
+        self._release = connection.register_script(_RELEASE)
+
+    @staticmethod
+    def usage_key(user_id: int, period: str) -> str:
+        return f'{QUOTA_PREFIX}:{period}:{user_id}'
+
+    @staticmethod
+    def charged_key(job_id: str) -> str:
+        return f'{CHARGED_PREFIX}:{job_id}'
+
+    @staticmethod
+    def _member(user_id: int, period: str) -> str:
+        return f'{period}|{user_id}'
+
+    def usage(self, user, period: str = None) -> dict:
+        """
+        Posters used and reserved by a user this month
+
+        Returns:
+            dict: 'used' and 'reserved'
+        """
+        period = period or current_period()
+        used, reserved = self._seed(
+            keys=[self.usage_key(user.id, period)],
+            args=[seed_usage(user, period), USAGE_TTL]
+        )
+        return {'used': int(used), 'reserved': int(reserved)}
+
+    def remaining(self, user, period: str = None):
+        """Posters the user can still request this month (inf if unlimited)"""
+        limit = user.plan.monthly_generations
+        if limit == -1:
+            return float('inf')
+
+        usage = self.usage(user, period)
+        return max(0, limit - usage['used'] - usage['reserved'])
+
+    def reserve(self, user, count: int, hold_id: str, period: str = None):
+        """
+        Reserve posters for a job if the plan allows them
+
+        Args:
+            user: Requesting user
+            count: Posters to reserve
+            hold_id: ID of the job that will use them
+            period: Quota period (default: current month)
+
+        Returns:
+            tuple: (reserved, posters left after the reservation,
+                or before it if it was refused; -1 if unlimited)
+        """
+        period = period or current_period()
+        ok, remaining = self._reserve(
+            keys=[self.usage_key(user.id, period), HOLDS_KEY],
+            args=[
+                user.plan.monthly_generations,
+                seed_usage(user, period),
+                USAGE_TTL,
+                f'{self._member(user.id, period)}|',
+                time.time(),
+                hold_id,
+                count,
+            ]
+        )
+        return bool(ok), int(remaining)
+
+    def split(self, user_id: int, period: str, hold_id: str, holds: dict) -> None:
+        """Move a job's hold onto its chunk jobs ({job id: posters})"""
+        args = [f'{self._member(user_id, period)}|', time.time(), hold_id]
+        for chunk_id, count in holds.items():
+            args.extend([chunk_id, count])
+
+        self._split(keys=[self.usage_key(user_id, period), HOLDS_KEY], args=args)
+
+    def commit(self, user_id: int, count: int, period: str = None, hold_id: str = None,
+               job_id: str = None) -> None:
+        """
+        Record posters as used, out of the job's hold if it has one
+
+        Args:
+            job_id: Job that saved the posters; its charged count is
+                raised in the same step (see charged)
+        """
+        if count <= 0:
+            return
+
+        period = period or current_period()
+        member = self._member(user_id, period)
+        self._commit(
+            keys=[self.usage_key(user_id, period), HOLDS_KEY, DIRTY_KEY, self.charged_key(job_id or '')],
+            args=[count, hold_id or '', USAGE_TTL, f'{member}|', member, CHARGED_TTL if job_id else '']
+        )
+
+    def charged(self, job_id: str) -> int:
+        """Posters a job has been charged for so far (over all its runs)"""
+        return int(self.connection.get(self.charged_key(job_id)) or 0)
+
+    def release(self, user_id: int, period: str, hold_id: str, count: int = None,
+                pipeline=None):
+        """
+        Give back a job's reserved posters
+
+        Args:
+            count: Posters to release (default: the whole hold)
+            pipeline: Optional pipeline to queue the call on
+
+        Returns:
+            int: Posters released (None when pipelined)
+        """
+        return self._release(
+            keys=[self.usage_key(user_id, period), HOLDS_KEY],
+            args=[hold_id, '' if count is None else count, f'{self._member(user_id, period)}|'],
+            client=pipeline
+        )
+
+    def release_stale(self, grace: int = HOLD_GRACE) -> int:
+        """
+        Release holds whose job ended without settling them
+
+        A job normally settles its own hold, but one whose worker died
+        or which failed for good never gets the chance. A hold is stale
+        once neither its job nor the job's ingest job (payload renders
+        hand their hold over to it) is waiting or running.
+
+        Returns:
+            int: Holds released
+        """
+        members = [
+            member.decode()
+            for member in self.connection.zrangebyscore(HOLDS_KEY, '-inf', time.time() - grace)
+        ]
+        if not members:
+            return 0
+
+        holds = [member.split('|', 2) for member in members]
+        hold_ids = [hold_id for _, _, hold_id in holds]
+        jobs = Job.fetch_many(
+            hold_ids + [f'{hold_id}-ingest' for hold_id in hold_ids],
+            connection=self.connection,
+            serializer=JobSerializer
+        )
+        alive = {
+            job.id.removesuffix('-ingest')
+            for job in jobs
+            if job is not None and job.get_status(refresh=False) not in _DONE
+        }
+
+        stale = [hold for hold in holds if hold[2] not in alive]
+        if stale:
+            with self.connection.pipeline() as pipe:
+                for period, user_id, hold_id in stale:
+                    self.release(int(user_id), period, hold_id, pipeline=pipe)
+                pipe.execute()
+
+        return len(stale)
+
+
+def job_hold(job):
+    """
+    Quota period and hold ID a job settles against
+
+    Returns:
+        tuple: (period, hold id), or (None, None) if the job reserved nothing
+    """
+    if job is None or not job.meta.get('quota'):
+        return None, None
+    return job.meta['quota'], job.meta.get('quota_hold', job.id)
+
+
+def commit_job_usage(user_id: int, count: int, job=None) -> None:
+    """Charge saved posters to the user, out of the running job's hold"""
+    period, hold_id = job_hold(job)
+    connection = job.connection if job is not None else QueueManager.get_redis_connection()
+
+    try:
+        QuotaLedger(connection).commit(
+            user_id, count, period=period, hold_id=hold_id, job_id=job.id if job is not None else None)
+    except Exception as e:
+        # The posters are saved; failing the job now would not undo that
+        print(f"⚠️  Could not record usage of {count} posters for user {user_id}: {e}")
+
+
+def commit_resumed_usage(user_id: int, saved: int, job=None) -> None:
+    """
+    Charge posters an earlier run of `job` saved but was not charged for
+
+    The posters are committed to the database before their usage reaches
+    the ledger, so a worker that dies in between leaves them unpaid; a
+    re-run compares what it finds saved with what the job was charged.
+
+    Args:
+        user_id: Owner
+        saved: Posters of the job found in the database
+        job: Running job
+    """
+    if job is None or saved <= 0:
+        return
+
+    try:
+        unpaid = saved - QuotaLedger(job.connection).charged(job.id)
+    except Exception as e:
+        print(f"⚠️  Could not read the usage charged to job {job.id}: {e}")
+        return
+
+    if unpaid > 0:
+        print(f"💳 Charging {unpaid} posters saved by an earlier run")
+        commit_job_usage(user_id, unpaid, job)
+
+
+def release_job_hold(job, count: int = None, pipeline=None) -> None:
+    """Give back what a job reserved (all of it, or `count` posters)"""
+    period, hold_id = job_hold(job)
+    if period is None or 'user_id' not in job.meta:
+        return
+
+    QuotaLedger(job.connection).release(
+        job.meta['user_id'], period, hold_id, count=count, pipeline=pipeline)
+
+
+def sync_quota_usage(batch_size: int = 500):
+    """
+    Flush quota usage from Redis to users.monthly_generations (background job)
+
+    Users whose usage changed since the last run are written with one
+    bulk UPDATE per `batch_size` users, along with last_reset set to the
+    start of the month the count belongs to. Stale holds are released
+    first.
+
+    Returns:
+        dict: Users synced and stale holds released
+    """
+    from sqlalchemy import update
+    from app.extensions import db
+    from app.models import User
+    from app.workers.render_job import get_app
+
+    with get_app().app_context():
+        connection = QueueManager.get_redis_connection()
+        ledger = QuotaLedger(connection)
+
+        released = ledger.release_stale()
+        synced = 0
+
+        while True:
+            members = [member.decode() for member in connection.spop(DIRTY_KEY, batch_size) or []]
+            if not members:
+                break
+
+            try:
+                # Latest month per user wins
+                periods = {}
+                for period, user_id in sorted(member.split('|') for member in members):
+                    periods[int(user_id)] = period
+
+                users = db.session.query(User.id, User.monthly_generations, User.last_reset).filter(
+                    User.id.in_(periods)
+                ).all()
+
+                with connection.pipeline() as pipe:
+                    for user in users:
+                        period = periods[user.id]
+                        ledger._seed(
+                            keys=[ledger.usage_key(user.id, period)],
+                            args=[seed_usage(user, period), USAGE_TTL],
+                            client=pipe
+                        )
+                    usage = pipe.execute()
+
+                rows = [
+                    {
+                        'id': user.id,
+                        'monthly_generations': int(used),
+                        'last_reset': period_start(periods[user.id]),
+                    }
+                    for user, (used, _) in zip(users, usage)
+                    # Skip a month that is older than what the row holds
+                    if user.last_reset is None or current_period(user.last_reset) <= periods[user.id]
+                ]
+
+                if rows:
+                    db.session.execute(update(User), rows)
+                    db.session.commit()
+                synced += len(rows)
+            except Exception:
+                db.session.rollback()
+                connection.sadd(DIRTY_KEY, *members)
+                raise
+
+        print(f"📊 Quota sync: {synced} users written, {released} stale holds released")
+
+        return {'synced': synced, 'released': released}
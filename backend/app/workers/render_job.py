@@ -1,13 +1,362 @@
 from app import create_app
 from app.extensions import db
-from app.models import Poster, Product, Template, Campaign, User
+from app.models import JobResult, Poster, Product, Template, Campaign, User
+from app.core.campaigns.rules import CampaignRules
+from app.workers.cancellation import CancelWatch
+from app.workers.checkpoint import PayloadCheckpoint, saved_posters
+from app.workers.payloads import unpack_payload, template_from_payload
+from app.workers.pipeline import ProductNotFound, run_render_pipeline
+from app.workers.progress import BatchProgress
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import commit_job_usage, commit_resumed_usage, release_job_hold
+from app.workers.rerender import retire_replaced
+from app.workers.results import expand_result, pack_detail, result_summary, store_job_result
+from app.workers.serialization import JobSerializer
 from renderer.engine import PosterRenderer
 from app.infrastructure.storage import upload_image
 from io import BytesIO
+from types import SimpleNamespace
+from rq import get_current_job
+from rq.job import Job
 import traceback
 
-# Create app context for workers
-app = create_app()
+# Queue for the database-writing half of self-contained payload jobs
+RESULTS_QUEUE = 'poster-results'
+
+# Flask app used for job contexts; created on first use so importing this
+# module (e.g. from the API to reference job functions) stays cheap
+_app = None
+
+
+def get_app():
+    """Return the worker's Flask app, creating it on first use"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def set_app(app):
+    """Reuse an already-created app (worker.py sets this before forking)"""
+    global _app
+    _app = app
+
+
+def tracking_job_id():
+    """
+    ID of the job clients poll for the running job
+
+    Chunks of a batch report their parent's ID (meta 'batch_id'), so every
+    poster of a batch links to the same job.
+    """
+    job = get_current_job()
+    if job is None:
+        return None
+    return job.meta.get('batch_id', job.id)
+
+
+def build_data_context(product, campaign=None, derived: dict = None) -> dict:
+    """
+    Build the renderer data context for one product
+
+    Args:
+        product: Product (or any row with the product columns)
+        campaign: Optional campaign
+        derived: Campaign-derived product fields, if already computed for
+            the whole batch (see campaign_fields)
+
+    Returns:
+        dict: Data context
+    """
+    data = {
+        'product': {
+            'name': product.name,
+            'price': product.price,
+            'image': product.image_url,
+            'category': product.category,
+            'sku': product.sku,
+            'description': product.description,
+        }
+    }
+
+    # Add campaign data if present
+    if campaign:
+        data['campaign'] = campaign.rules or {}
+        if derived is None:
+            derived = campaign_fields(campaign, [product])[0]
+        data['product'].update(derived)
+
+    return data
+
+
+def campaign_fields(campaign, products: list) -> list:
+    """
+    Campaign-derived fields (sale price etc.) for a set of products, in one pass
+
+    Rules that do not parse (saved before rules were validated) add no
+    fields, so the posters still render with the campaign's other data.
+
+    Returns:
+        list: Per product, fields to merge into data['product']
+    """
+    if not campaign:
+        return [{} for _ in products]
+
+    try:
+        rules = CampaignRules(campaign.rules)
+    except ValueError as e:
+        print(f"⚠️  Campaign {campaign.id} rules ignored for pricing: {e}")
+        return [{} for _ in products]
+
+    return rules.derive([product.price for product in products])
+
+
+# Only the columns build_data_context reads
+PRODUCT_CONTEXT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.price,
+    Product.image_url,
+    Product.category,
+    Product.sku,
+    Product.description,
+)
+
+
+def iter_data_contexts(product_ids: list, user_id: int, campaign=None):
+    """
+    Load a batch's products in one query and stream their data contexts
+
+    A single `IN (...)` query selects only the columns the renderer
+    needs, so database time no longer grows with one round trip per
+    product. The query runs before this returns; the contexts are then
+    built one at a time as the iterator is consumed, without touching
+    the database session, so it can be consumed on the pipeline's render
+    thread.
+
+    Args:
+        product_ids: Product IDs, in render order
+        user_id: Owner of the products
+        campaign: Optional campaign
+
+    Returns:
+        iterator: (product_id, product_name, data) tuples, with name and
+            data None when the product no longer exists
+    """
+    rows = db.session.query(*PRODUCT_CONTEXT_COLUMNS).filter(
+        Product.id.in_(product_ids),
+        Product.user_id == user_id
+    ).all()
+
+    by_id = {row.id: row for row in rows}
+    derived = dict(zip((row.id for row in rows), campaign_fields(campaign, rows)))
+
+    # Read now: a commit on the caller's thread expires the ORM object
+    if campaign is not None:
+        campaign = SimpleNamespace(id=campaign.id, rules=campaign.rules)
+
+    def contexts():
+        for product_id in product_ids:
+            row = by_id.get(product_id)
+            if row is None:
+                yield product_id, None, None
+            else:
+                yield product_id, row.name, build_data_context(row, campaign, derived[product_id])
+
+    return contexts()
+
+
+def skipped_error(product_id: int) -> dict:
+    """Error entry for a product deleted since its job was queued"""
+    return {
+        'product_id': product_id,
+        'error': f"Product {product_id} not found",
+        'skipped': True,
+    }
+
+
+def render_and_upload(renderer: PosterRenderer, template, data: dict, product_id: int) -> str:
+    """
+    Render one poster and upload it
+
+    Returns:
+        str: Image URL
+    """
+    image_bytes = render_poster(renderer, template, data)
+    return upload_poster(image_bytes, template, product_id)
+
+
+def render_poster(renderer: PosterRenderer, template, data: dict) -> bytes:
+    """Render one poster to PNG bytes"""
+    image_bytes = renderer.render(
+        template.json_definition,
+        data,
+        cache_key=template.cache_key,
+        background_url=template.background_url
+    )
+
+    print(f"✅ Poster rendered: {len(image_bytes)} bytes")
+
+    return image_bytes
+
+
+def upload_poster(image_bytes: bytes, template, product_id: int) -> str:
+    """
+    Upload a rendered poster to cloud storage
+
+    Returns:
+        str: Image URL
+    """
+    image_file = BytesIO(image_bytes)
+    image_file.name = f"poster_{product_id}_{template.id}.png"
+
+    image_url = upload_image(image_file, folder='posters')
+
+    if not image_url:
+        raise Exception("Failed to upload poster to storage")
+
+    return image_url
+
+
+class BatchPersister:
+    """
+    Buffers a batch's Poster rows and writes them in bulk
+
+    Every `flush_every` items (and at the end) the buffered posters are
+    inserted with one add_all (a single multi-row INSERT ... RETURNING on
+    SQLAlchemy 2) and the session commits once; the generated posters are
+    then charged to the user's quota out of the running job's hold (one
+    Redis call, see app.workers.quota). Every poster is linked to `job_id`.
+
+    Posters of products deleted since the batch was queued are dropped
+    at flush time (products.id is their foreign key) and their product
+    IDs listed in `missing`, so one deleted product cannot fail the
+    insert of everything buffered with it. Failure rows are written in
+    their own transaction after the successes; they only record what
+    `errors` already reports, so losing them is logged, not raised.
+
+    Once committed, the posters a re-render replaces are marked stale
+    (see app.workers.rerender).
+    """
+
+    def __init__(self, user_id: int, template, campaign_id: int = None, flush_every: int = 25,
+                 job_id: str = None):
+        self.user_id = user_id
+        self.template = template
+        self.campaign_id = campaign_id
+        self.flush_every = flush_every
+        self.job_id = job_id
+        self.job = get_current_job()
+        self._pending = []
+
+        # Result dicts of successful posters already written
+        self.results = []
+        # Products whose rendered poster was dropped because they were deleted
+        self.missing = []
+
+    def add_success(self, product_id: int, image_url: str, product_name: str = None) -> None:
+        poster = Poster(
+            user_id=self.user_id,
+            product_id=product_id,
+            campaign_id=self.campaign_id,
+            template_id=self.template.id,
+            image_url=image_url,
+            format=self.template.format,
+            status='generated',
+            template_version=getattr(self.template, 'render_version', None),
+            job_id=self.job_id
+        )
+        self._pending.append((poster, product_name))
+        self._maybe_flush()
+
+    def add_failure(self, product_id: int, error: str) -> None:
+        poster = Poster(
+            user_id=self.user_id,
+            product_id=product_id,
+            campaign_id=self.campaign_id,
+            template_id=self.template.id,
+            image_url='',
+            format=self.template.format,
+            status='failed',
+            error_message=error,
+            job_id=self.job_id
+        )
+        self._pending.append((poster, None))
+        self._maybe_flush()
+
+    def _retire_replaced(self, product_ids: list) -> None:
+        # The new posters are saved; a miss here only leaves old ones 'generated'
+        try:
+            retire_replaced(self.job_id, product_ids)
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Could not mark replaced posters stale: {e}")
+
+    def _maybe_flush(self) -> None:
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered posters in one transaction, then charge the quota"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+
+        existing = {
+            row.id for row in db.session.query(Product.id).filter(
+                Product.id.in_({poster.product_id for poster, _ in pending})
+            )
+        }
+
+        generated = []
+        failed = []
+        for poster, product_name in pending:
+            if poster.product_id not in existing:
+                if poster.status == 'generated':
+                    self.missing.append(poster.product_id)
+            elif poster.status == 'generated':
+                generated.append((poster, product_name))
+            else:
+                failed.append(poster)
+
+        if generated:
+            try:
+                db.session.add_all([poster for poster, _ in generated])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Kept for a later flush instead of being lost with the transaction
+                self._pending = generated + [(poster, None) for poster in failed] + self._pending
+                raise
+
+            commit_job_usage(self.user_id, len(generated), self.job)
+            self._retire_replaced([poster.product_id for poster, _ in generated])
+
+            self.results.extend(
+                {
+                    'poster_id': poster.id,
+                    'product_id': poster.product_id,
+                    'image_url': poster.image_url,
+                    'product_name': product_name,
+                    'template_name': self.template.name,
+                }
+                for poster, product_name in generated
+            )
+
+        if failed:
+            try:
+                db.session.add_all(failed)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️  Could not record {len(failed)} failed posters: {e}")
+
+        print(f"💾 Saved {len(generated) + len(failed)} posters ({len(generated)} generated)")
+
+        dropped = len(pending) - len(generated) - len(failed)
+        if dropped:
+            print(f"⚠️  Dropped {dropped} posters of deleted products")
 
 
 def generate_poster(template_id: int, product_id: int, user_id: int, campaign_id: int = None):
@@ -23,7 +372,9 @@ def generate_poster(template_id: int, product_id: int, user_id: int, campaign_id
     Returns:
         dict: Result with poster_id and image_url
     """
-    with app.app_context():
+    job = get_current_job()
+
+    with get_app().app_context():
         try:
             print(
                 f"🎨 Starting poster generation: Template {template_id}, Product {product_id}")
@@ -43,38 +394,25 @@ def generate_poster(template_id: int, product_id: int, user_id: int, campaign_id
             if not user:
                 raise ValueError(f"User {user_id} not found")
 
-            # Prepare data context
-            data = {
-                'product': {
-                    'name': product.name,
-                    'price': product.price,
-                    'image': product.image_url,
-                    'category': product.category,
-                    'sku': product.sku,
-                    'description': product.description,
+            # Re-run of a job that already saved its poster: don't charge twice
+            saved = saved_posters(tracking_job_id(), [product_id]).get(product_id)
+            if saved:
+                commit_resumed_usage(user_id, 1, job)
+                return {
+                    'poster_id': saved[0],
+                    'image_url': saved[1],
+                    'product_name': product.name,
+                    'template_name': template.name,
                 }
-            }
 
-            # Add campaign data if present
-            if campaign:
-                data['campaign'] = campaign.rules or {}
+            # Prepare data context
+            data = build_data_context(product, campaign)
 
             print(f"📦 Data prepared: {data['product']['name']}")
 
-            # Render poster
+            # Render poster and upload to cloud storage
             renderer = PosterRenderer()
-            image_bytes = renderer.render(template.json_definition, data)
-
-            print(f"✅ Poster rendered: {len(image_bytes)} bytes")
-
-            # Upload to cloud storage
-            image_file = BytesIO(image_bytes)
-            image_file.name = f"poster_{product_id}_{template_id}.png"
-
-            image_url = upload_image(image_file, folder='posters')
-
-            if not image_url:
-                raise Exception("Failed to upload poster to storage")
+            image_url = render_and_upload(renderer, template, data, product_id)
 
             print(f"☁️  Uploaded to: {image_url}")
 
@@ -86,15 +424,23 @@ def generate_poster(template_id: int, product_id: int, user_id: int, campaign_id
                 template_id=template_id,
                 image_url=image_url,
                 format=template.format,
-                status='generated'
+                status='generated',
+                template_version=template.render_version,
+                job_id=tracking_job_id()
             )
 
             db.session.add(poster)
+            db.session.commit()
 
-            # Increment user's generation count
-            user.monthly_generations += 1
+            # Charge the user's quota (out of this job's reservation)
+            commit_job_usage(user_id, 1, job)
 
-            db.session.commit()
+            # Re-render: the poster this one replaces is now stale
+            try:
+                retire_replaced(tracking_job_id(), [product_id])
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️  Could not mark replaced posters stale: {e}")
 
             print(f"✅ Poster saved to database: ID {poster.id}")
 
@@ -109,30 +455,53 @@ def generate_poster(template_id: int, product_id: int, user_id: int, campaign_id
             print(f"❌ Error generating poster: {e}")
             traceback.print_exc()
 
-            # Try to save failed poster record
+            # Try to save failed poster record (none for a deleted product,
+            # which it could not reference)
             try:
-                poster = Poster(
-                    user_id=user_id,
-                    product_id=product_id,
-                    campaign_id=campaign_id,
-                    template_id=template_id,
-                    image_url='',
-                    format='square',
-                    status='failed',
-                    error_message=str(e)
-                )
-                db.session.add(poster)
-                db.session.commit()
+                db.session.rollback()
+                if db.session.get(Product, product_id) is not None:
+                    poster = Poster(
+                        user_id=user_id,
+                        product_id=product_id,
+                        campaign_id=campaign_id,
+                        template_id=template_id,
+                        image_url='',
+                        format='square',
+                        status='failed',
+                        error_message=str(e),
+                        job_id=tracking_job_id()
+                    )
+                    db.session.add(poster)
+                    db.session.commit()
             except:
                 pass
 
             raise
 
+        finally:
+            # Nothing left to charge; free what was not used
+            release_job_hold(job)
+
 
 def generate_batch(template_id: int, product_ids: list, user_id: int, campaign_id: int = None):
     """
     Generate multiple posters (runs as background job)
 
+    Template, user and campaign are loaded once for the whole batch,
+    products come from a single query (iter_data_contexts), and posters
+    are written in bulk by BatchPersister (BATCH_FLUSH_SIZE rows,
+    one commit and one ledger charge per flush). Rendering, uploading and
+    persisting overlap (see app.workers.pipeline).
+
+    The committed posters double as a checkpoint: when the job is retried
+    or re-enqueued after being interrupted, products it already saved are
+    skipped (and only charged if the interrupted run had not got to it),
+    so only unfinished and failed items are rendered. If the batch is cancelled, rendering stops at the next
+    item and the products left are reported under 'cancelled'.
+
+    The per-poster results go to the job_results table; the job result
+    in Redis only keeps the counts (see app.workers.results).
+
     Args:
         template_id: Template ID
         product_ids: List of product IDs
@@ -142,30 +511,433 @@ def generate_batch(template_id: int, product_ids: list, user_id: int, campaign_i
     Returns:
         dict: Results summary
     """
+    app = get_app()
+
     with app.app_context():
         print(f"🚀 Starting batch generation: {len(product_ids)} posters")
 
-        results = []
+        template = Template.query.get(template_id)
+        user = User.query.get(user_id)
+        campaign = Campaign.query.get(campaign_id) if campaign_id else None
+
+        if not template:
+            raise ValueError(f"Template {template_id} not found")
+
+        if not user:
+            raise ValueError(f"User {user_id} not found")
+
+        job_id = tracking_job_id()
+        renderer = PosterRenderer()
+        persister = BatchPersister(
+            user_id,
+            template,
+            campaign_id,
+            flush_every=app.config['BATCH_FLUSH_SIZE'],
+            job_id=job_id
+        )
         errors = []
 
-        for product_id in product_ids:
-            try:
-                result = generate_poster(
-                    template_id, product_id, user_id, campaign_id)
-                results.append(result)
-            except Exception as e:
-                errors.append({
+        saved = saved_posters(job_id, product_ids)
+        pending = [product_id for product_id in product_ids if product_id not in saved]
+
+        resumed = []
+        if saved:
+            names = dict(db.session.query(Product.id, Product.name).filter(Product.id.in_(saved)))
+            resumed = [
+                {
+                    'poster_id': poster_id,
                     'product_id': product_id,
-                    'error': str(e)
-                })
+                    'image_url': image_url,
+                    'product_name': names.get(product_id),
+                    'template_name': template.name,
+                }
+                for product_id, (poster_id, image_url) in saved.items()
+            ]
+            print(f"↩️  Resuming batch: {len(resumed)} of {len(product_ids)} already saved")
+            commit_resumed_usage(user_id, len(saved), get_current_job())
+
+        progress = BatchProgress(total=len(product_ids))
+        progress.completed = len(resumed)
+        progress.flush(force=True)
+
+        # Streamed: contexts are built as the render stage gets to them
+        contexts = iter_data_contexts(pending, user_id, campaign)
+        processed = set()
+
+        def on_result(product_id, product_name, image_url, error):
+            processed.add(product_id)
+
+            if error is None:
+                persister.add_success(product_id, image_url, product_name)
+                progress.complete_item(product_id, success=True)
+                return
+
+            progress.complete_item(product_id, success=False)
+
+            # Deleted since the batch was queued: no poster row can point at it
+            if isinstance(error, ProductNotFound):
+                print(f"⏭️  Skipping deleted product {product_id}")
+                errors.append(skipped_error(product_id))
+                return
+
+            print(f"❌ Error generating poster for product {product_id}: {error}")
+            errors.append({
+                'product_id': product_id,
+                'error': str(error)
+            })
+            persister.add_failure(product_id, str(error))
+
+        run_render_pipeline(
+            app,
+            renderer,
+            template,
+            contexts,
+            on_result,
+            upload_workers=app.config['PIPELINE_UPLOAD_WORKERS'],
+            depth=app.config['PIPELINE_DEPTH'],
+            should_stop=CancelWatch(get_current_job(), job_id)
+        )
+
+        persister.flush()
+
+        # Rendered, but deleted before their poster could be saved
+        errors.extend(skipped_error(product_id) for product_id in persister.missing)
+
+        cancelled = [product_id for product_id in pending if product_id not in processed]
+        if cancelled:
+            print(f"🛑 Batch cancelled: {len(cancelled)} posters not rendered")
+
+        progress.current = None
+        progress.flush(force=True)
+
+        # Saved posters were charged; free the rest of the reservation
+        release_job_hold(get_current_job())
+
+        position = {product_id: i for i, product_id in enumerate(product_ids)}
+        results = sorted(resumed + persister.results,
+                         key=lambda result: position[result['product_id']])
 
         print(
             f"✅ Batch complete: {len(results)} success, {len(errors)} failed")
 
-        return {
+        result = {
             'total': len(product_ids),
             'successful': len(results),
             'failed': len(errors),
             'results': results,
-            'errors': errors
+            'errors': errors,
+            'cancelled': cancelled
+        }
+
+        job = get_current_job()
+        if job is None:
+            return result
+
+        return store_job_result(job.id, user_id, result, batch_id=job.meta.get('batch_id'))
+
+
+def render_payload(blob: bytes):
+    """
+    Render a self-contained payload (runs as background job)
+
+    Everything needed to draw comes from the payload, so this job never
+    opens a database session. Results are handed to a separate
+    ingest_render_results job on the 'poster-results' queue, which writes
+    them to the database in bulk.
+
+    Finished uploads are checkpointed in Redis (PayloadCheckpoint), so a
+    retry after an interruption only renders what is left, and the ingest
+    job has a fixed ID so results are never ingested twice.
+
+    With no database to write to, the per-poster results are kept
+    compressed inside the job result. Their poster IDs are filled in
+    from the ingest job when the status is read; until it has run, the
+    job reports 'ingesting' (see QueueManager.get_job_status).
+
+    Args:
+        blob: Packed payload (see app.workers.payloads)
+
+    Returns:
+        dict: Results summary (poster IDs are assigned by the ingest job)
+    """
+    payload = unpack_payload(blob)
+    template = template_from_payload(payload['template'])
+    items = payload['items']
+
+    app = get_app()
+
+    job = get_current_job()
+
+    # App context for storage configuration only
+    with app.app_context():
+        print(f"🚀 Starting payload render: {len(items)} posters")
+
+        checkpoint = PayloadCheckpoint(job, ttl=app.config['BATCH_CHECKPOINT_TTL'])
+        done = checkpoint.load()
+
+        renderer = PosterRenderer()
+        successes = [
+            [product_id, *done[product_id]]
+            for product_id, _, _ in items
+            if product_id in done
+        ]
+        errors = []
+
+        if successes:
+            print(f"↩️  Resuming payload: {len(successes)} of {len(items)} already uploaded")
+
+        progress = BatchProgress(total=len(items))
+        progress.completed = len(successes)
+        progress.flush(force=True)
+
+        pending = [tuple(item) for item in items if item[0] not in done]
+        processed = set()
+
+        def on_result(product_id, product_name, image_url, error):
+            processed.add(product_id)
+
+            if error is None:
+                checkpoint.record(product_id, image_url, product_name)
+                successes.append([product_id, image_url, product_name])
+                progress.complete_item(product_id, success=True)
+                return
+
+            print(f"❌ Error generating poster for product {product_id}: {error}")
+            errors.append({
+                'product_id': product_id,
+                'error': str(error)
+            })
+            progress.complete_item(product_id, success=False)
+
+        run_render_pipeline(
+            app,
+            renderer,
+            template,
+            pending,
+            on_result,
+            upload_workers=app.config['PIPELINE_UPLOAD_WORKERS'],
+            depth=app.config['PIPELINE_DEPTH'],
+            should_stop=CancelWatch(job, tracking_job_id())
+        )
+
+        cancelled = [item[0] for item in pending if item[0] not in processed]
+
+        # The ingest job charges the successes; free the rest
+        release_job_hold(job, count=len(items) - len(successes))
+
+        progress.current = None
+        progress.flush(force=True)
+
+        position = {item[0]: i for i, item in enumerate(items)}
+        successes.sort(key=lambda success: position[success[0]])
+
+        ingest_job_id = f'{job.id}-ingest' if job is not None else None
+
+        if ingest_job_id and Job.exists(ingest_job_id, connection=job.connection):
+            # An earlier run got as far as handing over its results
+            print(f"↩️  Results already handed to {ingest_job_id}")
+        else:
+            QueueManager.enqueue_job(
+                ingest_render_results,
+                payload['user_id'],
+                payload['campaign_id'],
+                {key: payload['template'].get(key) for key in ('id', 'name', 'format', 'render_version')},
+                successes,
+                [[error['product_id'], error['error']] for error in errors],
+                tracking_job_id(),
+                queue_name=RESULTS_QUEUE,
+                timeout=300,
+                job_id=ingest_job_id,
+                meta={
+                    # Its outcome is an event for whoever watches the batch
+                    'batch_id': tracking_job_id(),
+                    'user_id': payload['user_id'],
+                    'quota': job.meta.get('quota') if job is not None else None,
+                    'quota_hold': job.id if job is not None else None,
+                }
+            )
+
+        print(
+            f"✅ Payload render complete: {len(successes)} success, {len(errors)} failed")
+
+        result = {
+            'total': len(items),
+            'successful': len(successes),
+            'failed': len(errors),
+            'results': [
+                {
+                    'product_id': product_id,
+                    'image_url': image_url,
+                    'product_name': product_name,
+                    'template_name': template.name,
+                }
+                for product_id, image_url, product_name in successes
+            ],
+            'errors': errors,
+            'cancelled': cancelled,
+            'ingest_job_id': ingest_job_id,
+        }
+
+        return result_summary(result, pack_detail(result))
+
+
+def ingest_render_results(user_id: int, campaign_id, template: dict, successes: list, failures: list,
+                          job_id: str = None):
+    """
+    Write the results of a payload render to the database (background job)
+
+    Args:
+        user_id: Owner
+        campaign_id: Optional campaign ID
+        template: Template id, name and format
+        successes: [product_id, image_url, product_name] entries
+        failures: [product_id, error] entries
+        job_id: Job the posters belong to
+
+    Successes and failures of products deleted since the render are
+    not saved (see BatchPersister) and come back under 'skipped'.
+
+    Returns:
+        dict: [product_id, poster_id] of every saved success, and the
+            skipped product IDs
+    """
+    app = get_app()
+
+    with app.app_context():
+        persister = BatchPersister(
+            user_id,
+            template_from_payload(template),
+            campaign_id,
+            flush_every=app.config['BATCH_FLUSH_SIZE'],
+            job_id=job_id
+        )
+
+        for product_id, image_url, product_name in successes:
+            persister.add_success(product_id, image_url, product_name)
+
+        for product_id, error in failures:
+            persister.add_failure(product_id, error)
+
+        persister.flush()
+
+        release_job_hold(get_current_job())
+
+        return {
+            'saved': len(persister.results),
+            'posters': [[result['product_id'], result['poster_id']] for result in persister.results],
+            'skipped': persister.missing,
         }
+
+
+def collect_batch_results(child_job_ids: list):
+    """
+    Merge the results of a chunked batch (runs after every chunk job)
+
+    Chunks that failed outright (timeout, killed worker) count every one
+    of their products as failed (the parent keeps each chunk's product
+    IDs); chunks taken off the queue by a cancel count theirs as
+    cancelled. A chunk whose job is gone (deleted by hand, or merged by an
+    earlier run of this job) is rebuilt from the posters it saved. The
+    quota still reserved by chunks that did not finish is released.
+
+    The merged per-poster results are stored under the batch's ID, and
+    the chunks' own rows and jobs deleted.
+
+    Args:
+        child_job_ids: Chunk job IDs, in product order
+
+    Returns:
+        dict: Results summary, same shape as generate_batch
+    """
+    app = get_app()
+
+    with app.app_context():
+        return _collect_batch_results(child_job_ids)
+
+
+def _collect_batch_results(child_job_ids: list) -> dict:
+    job = get_current_job()
+    connection = job.connection
+    children = Job.fetch_many(child_job_ids, connection=connection, serializer=JobSerializer)
+
+    chunk_product_ids = job.meta.get('chunk_product_ids') or [[] for _ in child_job_ids]
+
+    results = []
+    errors = []
+    cancelled = []
+    ingest_job_ids = []
+    total = 0
+
+    for child, product_ids in zip(children, chunk_product_ids):
+        if child is None:
+            total += len(product_ids)
+            saved = saved_posters(job.id, product_ids)
+            results.extend(
+                {'poster_id': saved[product_id][0], 'product_id': product_id, 'image_url': saved[product_id][1]}
+                for product_id in product_ids if product_id in saved
+            )
+            errors.extend(
+                {'product_id': product_id, 'error': 'Chunk job expired'}
+                for product_id in product_ids if product_id not in saved
+            )
+            continue
+
+        if child.is_finished and child.result:
+            summary = expand_result(child.id, child.result)
+            total += summary['total']
+            results.extend(summary['results'])
+            errors.extend(summary['errors'])
+            cancelled.extend(summary.get('cancelled', []))
+            if summary.get('ingest_job_id'):
+                ingest_job_ids.append(summary['ingest_job_id'])
+            continue
+
+        product_ids = child.meta.get('product_ids', product_ids)
+        total += len(product_ids)
+
+        if child.meta.get('cancelled'):
+            cancelled.extend(product_ids)
+            continue
+
+        # Whole chunk failed; report each of its products
+        reason = (child.exc_info or 'Chunk failed').strip().splitlines()[-1]
+        errors.extend(
+            {'product_id': product_id, 'error': reason}
+            for product_id in product_ids
+        )
+
+    with connection.pipeline() as pipe:
+        for child in children:
+            if child is not None and child.get_status(refresh=False) != 'finished':
+                release_job_hold(child, pipeline=pipe)
+        pipe.execute()
+
+    print(f"✅ Batch complete: {len(results)} success, {len(errors)} failed, "
+          f"{len(cancelled)} cancelled across {len(child_job_ids)} chunks")
+
+    merged = {
+        'total': total,
+        'successful': len(results),
+        'failed': len(errors),
+        'results': results,
+        'errors': errors,
+        'cancelled': cancelled
+    }
+    # Payload chunks: their posters are written by these, maybe still running
+    if ingest_job_ids:
+        merged['ingest_job_ids'] = ingest_job_ids
+
+    stored = store_job_result(job.id, job.meta.get('user_id'), merged)
+
+    # Folded into the batch's row
+    JobResult.query.filter(JobResult.job_id.in_(child_job_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+    # Kept without a TTL until now (see batch_job._enqueue_chunks)
+    with connection.pipeline() as pipe:
+        for child in children:
+            if child is not None:
+                child.delete(pipeline=pipe)
+        pipe.execute()
+
+    return stored
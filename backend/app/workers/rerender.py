@@ -0,0 +1,105 @@
+from app.extensions import db
+from app.models import Poster
+from app.workers.queue_manager import QueueManager
+
+# Posters a re-render job replaces: hash of product ID -> poster IDs
+REPLACES_PREFIX = 'postraft:replaces'
+
+# Outlives a re-render job waiting on a busy bulk lane
+REPLACES_TTL = 86400
+
+
+def _replaces_key(job_id: str) -> str:
+    return f'{REPLACES_PREFIX}:{job_id}'
+
+
+def record_replaced(job_id: str, replaced: dict) -> None:
+    """
+    Remember which posters a re-render job replaces
+
+    Args:
+        job_id: Re-render job (the ID callers poll)
+        replaced: product_id -> IDs of its posters the job replaces
+    """
+    if not replaced:
+        return
+
+    key = _replaces_key(job_id)
+
+    with QueueManager.get_redis_connection().pipeline() as pipe:
+        pipe.hset(key, mapping={
+            product_id: ','.join(str(poster_id) for poster_id in poster_ids)
+            for product_id, poster_ids in replaced.items()
+        })
+        pipe.expire(key, REPLACES_TTL)
+        pipe.execute()
+
+
+def retire_replaced(job_id: str, product_ids: list) -> int:
+    """
+    Mark the posters replaced by a job stale, once their replacements are saved
+
+    Called by BatchPersister (and generate_poster) after committing the
+    new posters, so a re-render that fails or is cancelled leaves the
+    old posters as they were. Jobs that are not re-renders have nothing
+    recorded and cost one Redis call.
+
+    Args:
+        job_id: Job the new posters belong to
+        product_ids: Products whose new poster was just committed
+
+    Returns:
+        int: Posters marked stale
+    """
+    if not job_id or not product_ids:
+        return 0
+
+    redis_conn = QueueManager.get_redis_connection()
+    key = _replaces_key(job_id)
+
+    values = redis_conn.hmget(key, product_ids)
+    poster_ids = [
+        int(poster_id)
+        for value in values if value
+        for poster_id in value.decode().split(',')
+    ]
+    if not poster_ids:
+        return 0
+
+    retired = Poster.query.filter(
+        Poster.id.in_(poster_ids),
+        Poster.status == 'generated'
+    ).update({'status': 'stale'}, synchronize_session=False)
+    db.session.commit()
+
+    redis_conn.hdel(key, *product_ids)
+
+    return retired
+
+
+def rerender_changes(user_id: int):
+    """
+    Re-render a user's posters affected by recent edits (background job)
+
+    Scheduled by ChangeTracker after the first edit of a burst; see
+    ChangeTracker.flush.
+
+    Args:
+        user_id: User whose edits to flush
+
+    Returns:
+        dict: Summary (see ChangeTracker.flush)
+    """
+    from app.core.posters.change_tracking import ChangeTracker
+    from app.workers.render_job import get_app
+
+    app = get_app()
+
+    with app.app_context():
+        summary = ChangeTracker.flush(user_id)
+
+        if not summary['deferred']:
+            print(f"♻️ Re-render for user {user_id}: {len(summary['queued'])} jobs queued, "
+                  f"{summary['replacing']} posters to replace, {len(summary['refused'])} refused")
+
+        return summary
@@ -0,0 +1,175 @@
+from flask import current_app
+from app.extensions import db
+from app.models import JobResult
+from datetime import datetime, timedelta
+import json
+import zlib
+
+# Per-poster lists of a batch result; the job itself only keeps counts
+DETAIL_KEYS = ('results', 'errors', 'cancelled')
+
+# Summary 'detail' value when the lists are in the job_results table
+IN_DATABASE = 'db'
+
+
+def pack_detail(detail: dict) -> bytes:
+    """Compress the per-poster lists of a result"""
+    raw = json.dumps({key: detail.get(key, []) for key in DETAIL_KEYS},
+                     separators=(',', ':'), default=str)
+    return zlib.compress(raw.encode('utf-8'), 6)
+
+
+def unpack_detail(blob: bytes) -> dict:
+    """Inverse of pack_detail"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def result_summary(result: dict, detail) -> dict:
+    """
+    Job result with the per-poster lists replaced by where they are kept
+
+    Args:
+        result: Full result (total, successful, failed, lists, extras)
+        detail: IN_DATABASE, or the packed lists themselves (for jobs
+            without database access)
+
+    Returns:
+        dict: Counts and extras plus 'detail'
+    """
+    summary = {key: value for key, value in result.items() if key not in DETAIL_KEYS}
+    summary['cancelled_count'] = len(result.get('cancelled') or [])
+    summary['detail'] = detail
+    return summary
+
+
+def store_job_result(job_id: str, user_id: int, result: dict, batch_id: str = None) -> dict:
+    """
+    Write a batch result's per-poster lists to the database
+
+    Args:
+        job_id: Job the result belongs to
+        user_id: Owner
+        result: Full result
+        batch_id: Batch the job is a chunk of, if any
+
+    Returns:
+        dict: Summary to return from the job (see result_summary)
+    """
+    db.session.merge(JobResult(
+        job_id=job_id,
+        user_id=user_id,
+        batch_id=batch_id if batch_id != job_id else None,
+        data=pack_detail(result),
+        created_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+    return result_summary(result, IN_DATABASE)
+
+
+def expand_result(job_id: str, result):
+    """
+    Full result of a job from its summary (anything else is returned as is)
+
+    Lists whose database row has been purged come back empty, with
+    'detail_expired' set.
+    """
+    if not isinstance(result, dict) or 'detail' not in result:
+        return result
+
+    full = {key: value for key, value in result.items() if key not in ('detail', 'cancelled_count')}
+    detail = result['detail']
+
+    if detail == IN_DATABASE:
+        row = db.session.get(JobResult, job_id)
+        if row is None:
+            full.update({key: [] for key in DETAIL_KEYS}, detail_expired=True)
+            return full
+        detail = row.data
+
+    full.update(unpack_detail(detail))
+    return full
+
+
+def ingest_job_ids(summary) -> list:
+    """IDs of the ingest jobs saving a payload job's posters (see render_payload)"""
+    if not isinstance(summary, dict):
+        return []
+    if summary.get('ingest_job_ids'):
+        return list(summary['ingest_job_ids'])
+    if summary.get('ingest_job_id'):
+        return [summary['ingest_job_id']]
+    return []
+
+
+def attach_ingested(result: dict, ingested: list) -> dict:
+    """
+    Fill in the poster IDs of a payload job's full result
+
+    Successes whose product was deleted before the ingest job saved them
+    are moved to the errors, marked skipped (as generate_batch does).
+
+    Args:
+        result: Full result (see expand_result)
+        ingested: Return values of its finished ingest jobs
+
+    Returns:
+        dict: The result, updated in place
+    """
+    poster_ids = {}
+    skipped = set()
+    for value in ingested:
+        poster_ids.update((product_id, poster_id) for product_id, poster_id in value.get('posters', []))
+        skipped.update(value.get('skipped', []))
+
+    kept = []
+    for entry in result.get('results', []):
+        if entry['product_id'] in skipped:
+            result['errors'].append({
+                'product_id': entry['product_id'],
+                'error': f"Product {entry['product_id']} not found",
+                'skipped': True,
+            })
+            continue
+        entry['poster_id'] = poster_ids.get(entry['product_id'])
+        kept.append(entry)
+
+    result['results'] = kept
+    result['successful'] = len(kept)
+    result['failed'] = len(result['errors'])
+    return result
+
+
+def purge_job_results():
+    """
+    Delete stored results older than JOB_RESULT_TTL (periodic background job)
+
+    Rows of a chunk are only purged with its batch's merged row: until
+    then the collector still needs them, however long the batch runs.
+
+    Returns:
+        int: Rows deleted
+    """
+    from app.workers.render_job import get_app
+
+    app = get_app()
+
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_RESULT_TTL'])
+        stale = db.session.query(JobResult.job_id, JobResult.batch_id).filter(
+            JobResult.created_at < cutoff
+        ).all()
+
+        finished = {job_id for job_id, batch_id in stale if batch_id is None}
+        purged = [job_id for job_id, batch_id in stale if batch_id is None or batch_id in finished]
+
+        deleted = 0
+        for i in range(0, len(purged), 500):
+            deleted += JobResult.query.filter(
+                JobResult.job_id.in_(purged[i:i + 500])
+            ).delete(synchronize_session=False)
+        db.session.commit()
+
+        print(f"🧹 Job results purged: {deleted}")
+
+        return deleted
@@ -0,0 +1,48 @@
+import base64
+import json
+import pickle
+
+# Marks a bytes value (e.g. a packed render payload) in serialized JSON
+_BYTES_TAG = '__b64__'
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {_BYTES_TAG: base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'{type(value).__name__} is not job-serializable')
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and _BYTES_TAG in obj:
+        return base64.b64decode(obj[_BYTES_TAG])
+    return obj
+
+
+class JobSerializer:
+    """
+    Compact JSON serializer for job arguments, meta and results
+
+    Used instead of RQ's default pickle by every queue, worker and job
+    fetch, so all sides must agree on it. Bytes arguments are stored as
+    tagged base64, tuples come back as lists, and anything else JSON
+    cannot hold is refused at enqueue time instead of being pickled.
+    Data pickled before the switch (jobs still queued, results not yet
+    expired) is still read.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), default=_encode).encode('utf-8')
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        # Every pickle protocol >= 2 starts with the PROTO opcode
+        if data[:1] == b'\x80':
+            return pickle.loads(data)
+
+        return json.loads(data.decode('utf-8'), object_hook=_decode)
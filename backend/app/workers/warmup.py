@@ -0,0 +1,63 @@
+from app.extensions import db
+from app.models import Template
+from renderer.engine import PosterRenderer
+from sqlalchemy.orm import configure_mappers
+from PIL import Image
+from io import BytesIO
+import time
+
+
+def warm_up_worker(app):
+    """
+    Preload render dependencies in the worker parent process
+
+    Runs once before the worker starts taking jobs. RQ forks a work-horse
+    per job, and the children inherit everything loaded here copy-on-write,
+    so the first job does not pay for mapper configuration, Pillow plugin
+    registration or font loading.
+
+    Args:
+        app: Flask app
+
+    Returns:
+        dict: Warm-up summary
+    """
+    started = time.time()
+
+    with app.app_context():
+        # SQLAlchemy mappers are otherwise configured on the first query
+        configure_mappers()
+
+        # Register all Pillow plugins and load the PNG encoder
+        Image.init()
+        Image.new('RGB', (1, 1)).save(BytesIO(), format='PNG')
+
+        # Compile system templates, load their fonts and scale backgrounds
+        renderer = PosterRenderer()
+        try:
+            templates = Template.query.filter_by(
+                is_system=True, is_active=True).all()
+        except Exception as e:
+            # Database not reachable yet: start cold rather than not at all
+            print(f"⚠️  Could not load templates to preload: {e}")
+            db.session.rollback()
+            templates = []
+
+        for template in templates:
+            try:
+                renderer.preload(
+                    template.json_definition,
+                    cache_key=template.cache_key,
+                    background_url=template.background_url
+                )
+            except Exception as e:
+                print(f"⚠️  Could not preload template {template.id}: {e}")
+
+        # Don't hand pooled connections down to forked work-horses
+        db.session.remove()
+        db.engine.dispose()
+
+    return {
+        'templates': len(templates),
+        'seconds': round(time.time() - started, 2),
+    }
@@ -0,0 +1,26 @@
+"""Index products by owner and category for campaign product resolution
+
+Revision ID: 5d8e2b7c41f0
+Revises: c3f1a9d27b54
+Create Date: 2026-10-19 00:14:12.530981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2b7c41f0'
+down_revision = 'c3f1a9d27b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_user_id_category', ['user_id', 'category'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_user_id_category')
@@ -0,0 +1,26 @@
+"""Record the template version each poster was rendered from
+
+Revision ID: 9a4c6e1f3b27
+Revises: 5d8e2b7c41f0
+Create Date: 2026-10-19 00:21:47.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e1f3b27'
+down_revision = '5d8e2b7c41f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template_version', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('posters', schema=None) as batch_op:
+        batch_op.drop_column('template_version')
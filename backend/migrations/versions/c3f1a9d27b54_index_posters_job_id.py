@@ -0,0 +1,30 @@
+"""Index posters.job_id instead of requiring it to be unique
+
+Every poster of a batch is linked to the batch's job, so job_id is shared.
+
+Revision ID: c3f1a9d27b54
+Revises: 1ab4da1bc43a
+Create Date: 2026-10-18 23:58:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a9d27b54'
+down_revision = '1ab4da1bc43a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posters', schema=None) as batch_op:
+        batch_op.drop_constraint('posters_job_id_key', type_='unique')
+        batch_op.create_index(batch_op.f('ix_posters_job_id'), ['job_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posters', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_posters_job_id'))
+        batch_op.create_unique_constraint('posters_job_id_key', ['job_id'])
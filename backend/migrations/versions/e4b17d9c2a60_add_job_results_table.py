@@ -0,0 +1,36 @@
+"""Add job_results table
+
+Revision ID: e4b17d9c2a60
+Revises: 9a4c6e1f3b27
+Create Date: 2026-10-19 00:34:12.508917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b17d9c2a60'
+down_revision = '9a4c6e1f3b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_results',
+    sa.Column('job_id', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    with op.batch_alter_table('job_results', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_results_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_results', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_results_created_at'))
+
+    op.drop_table('job_results')
@@ -0,0 +1,31 @@
+"""Add job_results.batch_id
+
+Chunk rows record the batch they belong to, so they are only purged once
+the batch has been merged.
+
+Revision ID: f2a8c61d9e35
+Revises: e4b17d9c2a60
+Create Date: 2026-10-19 01:12:37.640215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c61d9e35'
+down_revision = 'e4b17d9c2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_job_results_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_results', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_results_batch_id'))
+        batch_op.drop_column('batch_id')
@@ -0,0 +1,129 @@
+from PIL import Image
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+import requests
+
+# Shared HTTP session so keep-alive connections survive between renders
+_session = requests.Session()
+
+# Decoded images kept by this process, most recently used last
+_local = OrderedDict()
+_local_bytes = 0
+
+# Host-wide SharedImageCache, when enabled through configure()
+_shared = None
+
+_max_bytes = 64 * 1024 * 1024
+
+
+def configure(shared: bool = False, max_mb: int = 64) -> None:
+    """
+    Configure the decoded asset cache for this process
+
+    Args:
+        shared: Keep decoded pixels in shared memory so every worker
+            process on the host can reuse them
+        max_mb: Byte budget for the cache (per process when local,
+            per host when shared)
+    """
+    global _shared, _max_bytes
+
+    _max_bytes = max_mb * 1024 * 1024
+    clear()
+
+    if shared:
+        from renderer.shared_cache import SharedImageCache
+        _shared = SharedImageCache(max_bytes=_max_bytes)
+    else:
+        _shared = None
+
+
+def clear() -> None:
+    """Drop this process's decoded images"""
+    global _local_bytes
+    _local.clear()
+    _local_bytes = 0
+
+
+def fetch(url: str, timeout: int = 10) -> bytes:
+    """Download an asset"""
+    response = _session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def decode(content: bytes) -> Image.Image:
+    """
+    Decode image bytes to RGB, or RGBA if the image has transparency
+
+    Opacity is decided here, once per asset: an alpha channel that is
+    fully opaque is dropped, so layers can take the plain paste path for
+    any cached image whose mode is RGB.
+    """
+    image = Image.open(BytesIO(content))
+
+    if image.mode == 'RGBA':
+        pass
+    elif image.mode in ('LA', 'PA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    image.load()
+
+    if image.mode == 'RGBA' and image.getchannel('A').getextrema()[0] == 255:
+        image = image.convert('RGB')
+
+    return image
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+def _remember(url: str, image: Image.Image) -> None:
+    global _local_bytes
+
+    size = _image_bytes(image)
+    if size > _max_bytes:
+        return
+
+    _local[url] = image
+    _local_bytes += size
+
+    while _local_bytes > _max_bytes:
+        _, evicted = _local.popitem(last=False)
+        _local_bytes -= _image_bytes(evicted)
+
+
+@contextmanager
+def open_asset(url: str):
+    """
+    Yield the decoded image for a URL, downloading it only on a miss
+
+    The image is shared with later renders and must be treated as
+    read-only: use resize/crop/convert/copy, never draw on it in place.
+
+    Usage:
+        with open_asset(url) as image:
+            canvas.paste(image.resize((w, h)), (x, y))
+    """
+    if _shared is not None:
+        image = _shared.get(url)
+        if image is None:
+            image = _shared.put(url, decode(fetch(url)))
+        try:
+            yield image
+        finally:
+            _shared.release(url)
+        return
+
+    image = _local.get(url)
+    if image is None:
+        image = decode(fetch(url))
+        _remember(url, image)
+    else:
+        _local.move_to_end(url)
+
+    yield image
@@ -1,9 +1,21 @@
 from PIL import Image, ImageDraw
+from collections import OrderedDict
 from io import BytesIO
+from renderer.asset_cache import fetch, decode
 from renderer.layers.background_layer import BackgroundLayer
-from renderer.layers.image_layer import ImageLayer
+from renderer.layers.image_layer import ImageLayer, cover_resize
 from renderer.layers.text_layer import TextLayer
 
+# Compiled layer plans, keyed by template cache key (see Template.cache_key),
+# most recent last; every template edit adds a key, so old ones age out
+_plan_cache = OrderedDict()
+PLAN_CACHE_SIZE = 128
+
+# Template background art, already scaled to the canvas, most recent last
+_background_cache = OrderedDict()
+BACKGROUND_CACHE_SIZE = 32
+
+
 class PosterRenderer:
     """Main poster rendering engine"""
     
@@ -16,40 +28,84 @@ class PosterRenderer:
     def __init__(self):
         pass
     
-    def render(self, template_json: dict, data: dict) -> bytes:
+    def compile(self, template_json: dict, cache_key: str = None) -> list:
+        """
+        Build the layer objects for a template
+
+        Args:
+            template_json: Template JSON definition
+            cache_key: Optional template version key; when given the
+                compiled plan is reused by later renders in this process
+
+        Returns:
+            list: (layer_type, layer) tuples in paint order
+        """
+        if cache_key is not None and cache_key in _plan_cache:
+            _plan_cache.move_to_end(cache_key)
+            return _plan_cache[cache_key]
+
+        plan = []
+        for layer_config in template_json.get('layers', []):
+            layer_type = layer_config.get('type')
+
+            if layer_type in self.LAYER_CLASSES:
+                layer_class = self.LAYER_CLASSES[layer_type]
+                plan.append((layer_type, layer_class(layer_config)))
+
+        if cache_key is not None:
+            _plan_cache[cache_key] = plan
+            while len(_plan_cache) > PLAN_CACHE_SIZE:
+                _plan_cache.popitem(last=False)
+
+        return plan
+
+    def preload(self, template_json: dict, cache_key: str = None, background_url: str = None) -> None:
+        """
+        Compile a template and load its fonts and background
+
+        Args:
+            template_json: Template JSON definition
+            cache_key: Optional template version key
+            background_url: Optional template background image
+        """
+        if background_url:
+            width, height = self._canvas_size(template_json)
+            self._background(background_url, width, height, cache_key)
+
+        for layer_type, layer in self.compile(template_json, cache_key):
+            if layer_type == 'text':
+                layer._get_font(
+                    layer.config.get('font', 'regular'),
+                    layer.config.get('size', 48)
+                )
+
+    def render(self, template_json: dict, data: dict, cache_key: str = None, background_url: str = None) -> bytes:
         """
         Render a poster from template and data
         
         Args:
             template_json: Template JSON definition
             data: Data context (product, campaign, etc.)
+            cache_key: Optional template version key for plan and
+                background caching
+            background_url: Optional template background image, used as
+                the starting canvas
             
         Returns:
             bytes: PNG image data
         """
         # Create canvas
-        canvas_config = template_json.get('canvas', {})
-        width = canvas_config.get('w', 1080)
-        height = canvas_config.get('h', 1080)
-        
-        # Create image
-        canvas = Image.new('RGB', (width, height), color='white')
+        width, height = self._canvas_size(template_json)
+        canvas = self._base_canvas(width, height, background_url, cache_key)
         draw = ImageDraw.Draw(canvas)
         
         # Render each layer
-        layers = template_json.get('layers', [])
-        for layer_config in layers:
-            layer_type = layer_config.get('type')
-            
-            if layer_type in self.LAYER_CLASSES:
-                layer_class = self.LAYER_CLASSES[layer_type]
-                layer = layer_class(layer_config)
-                
-                try:
-                    layer.render(canvas, draw, data)
-                except Exception as e:
-                    print(f"Error rendering layer {layer_type}: {e}")
-                    # Continue with other layers
+        for layer_type, layer in self.compile(template_json, cache_key):
+            try:
+                layer.render(canvas, draw, data)
+            except Exception as e:
+                print(f"Error rendering layer {layer_type}: {e}")
+                # Continue with other layers
         
         # Convert to bytes
         output = BytesIO()
@@ -57,6 +113,49 @@ class PosterRenderer:
         output.seek(0)
         
         return output.getvalue()
+
+    def _canvas_size(self, template_json: dict) -> tuple:
+        canvas_config = template_json.get('canvas', {})
+        return canvas_config.get('w', 1080), canvas_config.get('h', 1080)
+
+    def _base_canvas(self, width: int, height: int, background_url: str = None, cache_key: str = None) -> Image.Image:
+        """White canvas, or a copy of the template background if it has one"""
+        if background_url:
+            try:
+                return self._background(background_url, width, height, cache_key).copy()
+            except Exception as e:
+                print(f"Error loading background {background_url}: {e}")
+
+        return Image.new('RGB', (width, height), color='white')
+
+    def _background(self, url: str, width: int, height: int, cache_key: str = None) -> Image.Image:
+        """
+        Template background scaled to the canvas, cached per template version
+
+        The full-size download is decoded and scaled once; later renders of
+        the same template version only copy the canvas-sized result.
+        """
+        key = (cache_key, url, width, height)
+
+        background = _background_cache.get(key)
+        if background is not None:
+            _background_cache.move_to_end(key)
+            return background
+
+        image = decode(fetch(url, timeout=30))
+        background = cover_resize(image, width, height)
+
+        # Flatten transparency onto white
+        if background.mode == 'RGBA':
+            flat = Image.new('RGB', background.size, (255, 255, 255))
+            flat.paste(background, mask=background.split()[-1])
+            background = flat
+
+        _background_cache[key] = background
+        while len(_background_cache) > BACKGROUND_CACHE_SIZE:
+            _background_cache.popitem(last=False)
+
+        return background
     
     def render_to_file(self, template_json: dict, data: dict, output_path: str) -> None:
         """
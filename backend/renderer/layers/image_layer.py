@@ -1,8 +1,46 @@
-from PIL import Image, ImageDraw
-import requests
-from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw
+from renderer.asset_cache import open_asset
 from renderer.layers.base_layer import BaseLayer
 
+# Layer 'blend' modes: fn(canvas_region, layer_image) -> blended RGB
+BLEND_MODES = {
+    'multiply': ImageChops.multiply,
+    'screen': ImageChops.screen,
+    'overlay': ImageChops.overlay,
+    'darken': ImageChops.darker,
+    'lighten': ImageChops.lighter,
+    'difference': ImageChops.difference,
+    'add': ImageChops.add,
+}
+
+
+def cover_resize(image: Image.Image, target_w: int, target_h: int) -> Image.Image:
+    """Scale image to cover target dimensions, then center-crop to them"""
+    # Calculate aspect ratios
+    img_aspect = image.width / image.height
+    target_aspect = target_w / target_h
+    
+    if img_aspect > target_aspect:
+        # Image is wider - scale by height
+        new_height = target_h
+        new_width = int(target_h * img_aspect)
+    else:
+        # Image is taller - scale by width
+        new_width = target_w
+        new_height = int(target_w / img_aspect)
+    
+    # Resize
+    resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    
+    # Crop to exact size
+    left = (new_width - target_w) // 2
+    top = (new_height - target_h) // 2
+    right = left + target_w
+    bottom = top + target_h
+    
+    return resized.crop((left, top, right, bottom))
+
+
 class ImageLayer(BaseLayer):
     """Renders product images"""
     
@@ -19,94 +57,109 @@ class ImageLayer(BaseLayer):
             return
         
         try:
-            # Download image
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            product_image = Image.open(BytesIO(response.content))
-            
-            # Convert to RGB if needed
-            if product_image.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                background = Image.new('RGB', product_image.size, (255, 255, 255))
-                if product_image.mode == 'P':
-                    product_image = product_image.convert('RGBA')
-                background.paste(product_image, mask=product_image.split()[-1] if product_image.mode == 'RGBA' else None)
-                product_image = background
-            
-            # Get position and size
-            x = self.config.get('x', 0)
-            y = self.config.get('y', 0)
-            w = self.config.get('w', 400)
-            h = self.config.get('h', 400)
-            
-            # Resize image
-            fit_mode = self.config.get('fit', 'cover')
-            resized_image = self._resize_image(product_image, w, h, fit_mode)
-            
-            # Apply border radius if specified
-            border_radius = self.config.get('border_radius', 0)
-            if border_radius > 0:
-                resized_image = self._apply_border_radius(resized_image, border_radius)
-            
-            # Paste image onto canvas
-            canvas.paste(resized_image, (x, y))
-            
-            # Draw border if specified
-            border = self.config.get('border')
-            if border:
-                border_width = border.get('width', 2)
-                border_color = border.get('color', '#000000')
-                draw.rectangle(
-                    [(x, y), (x + w, y + h)],
-                    outline=border_color,
-                    width=border_width
-                )
+            # Download and decode (cached; the image is shared, so never
+            # modify it in place)
+            with open_asset(image_url) as product_image:
+                self._render_image(canvas, draw, product_image)
         
         except Exception as e:
             print(f"Error loading image: {e}")
             self._draw_placeholder(draw)
     
+    def _render_image(self, canvas: Image.Image, draw: ImageDraw.Draw, product_image: Image.Image) -> None:
+        """Fit a decoded image into the layer box and composite it"""
+        
+        # Get position and size
+        x = self.config.get('x', 0)
+        y = self.config.get('y', 0)
+        w = self.config.get('w', 400)
+        h = self.config.get('h', 400)
+        
+        # Resize image
+        fit_mode = self.config.get('fit', 'cover')
+        resized_image = self._resize_image(product_image, w, h, fit_mode)
+        
+        # 'contain' keeps the aspect ratio; center it in the box
+        offset = (
+            x + (w - resized_image.width) // 2,
+            y + (h - resized_image.height) // 2
+        )
+        
+        # Apply border radius if specified
+        border_radius = self.config.get('border_radius', 0)
+        if border_radius > 0:
+            resized_image = self._apply_border_radius(resized_image, border_radius)
+        
+        # Composite image onto canvas
+        self._composite(canvas, resized_image, offset)
+        
+        # Draw border if specified
+        border = self.config.get('border')
+        if border:
+            border_width = border.get('width', 2)
+            border_color = border.get('color', '#000000')
+            draw.rectangle(
+                [(x, y), (x + w, y + h)],
+                outline=border_color,
+                width=border_width
+            )
+    
+    def _composite(self, canvas: Image.Image, image: Image.Image, offset: tuple) -> None:
+        """
+        Composite an RGB or RGBA image onto the canvas
+        
+        Opaque images with default opacity and blend take a direct paste.
+        Anything else is blended in place through its alpha channel (scaled
+        by the layer's opacity). The canvas is always opaque, so this gives
+        the same result as alpha_composite without converting the canvas
+        to RGBA.
+        """
+        opacity = float(self.config.get('opacity', 1))
+        blend = self.config.get('blend', 'normal')
+        
+        if opacity <= 0:
+            return
+        
+        # Fast path: nothing to blend
+        if image.mode == 'RGB' and opacity >= 1 and blend == 'normal':
+            canvas.paste(image, offset)
+            return
+        
+        mask = image.getchannel('A') if image.mode == 'RGBA' else None
+        if opacity < 1:
+            if mask is None:
+                mask = Image.new('L', image.size, round(255 * opacity))
+            else:
+                mask = mask.point(lambda a: round(a * opacity))
+        
+        source = image.convert('RGB') if image.mode != 'RGB' else image
+        
+        if blend in BLEND_MODES:
+            box = (offset[0], offset[1], offset[0] + image.width, offset[1] + image.height)
+            source = BLEND_MODES[blend](canvas.crop(box), source)
+        
+        canvas.paste(source, offset, mask)
+    
     def _resize_image(self, image: Image.Image, target_w: int, target_h: int, fit: str) -> Image.Image:
         """Resize image to fit target dimensions"""
         
         if fit == 'cover':
-            # Calculate aspect ratios
-            img_aspect = image.width / image.height
-            target_aspect = target_w / target_h
-            
-            if img_aspect > target_aspect:
-                # Image is wider - scale by height
-                new_height = target_h
-                new_width = int(target_h * img_aspect)
-            else:
-                # Image is taller - scale by width
-                new_width = target_w
-                new_height = int(target_w / img_aspect)
-            
-            # Resize
-            resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Crop to exact size
-            left = (new_width - target_w) // 2
-            top = (new_height - target_h) // 2
-            right = left + target_w
-            bottom = top + target_h
-            
-            return resized.crop((left, top, right, bottom))
+            return cover_resize(image, target_w, target_h)
         
         else:  # contain
-            image.thumbnail((target_w, target_h), Image.Resampling.LANCZOS)
-            
-            # Create centered image on white background
-            result = Image.new('RGB', (target_w, target_h), (255, 255, 255))
-            offset_x = (target_w - image.width) // 2
-            offset_y = (target_h - image.height) // 2
-            result.paste(image, (offset_x, offset_y))
+            # Shrink to fit (never enlarge); unlike thumbnail() this leaves
+            # the cached source image untouched
+            scale = min(target_w / image.width, target_h / image.height)
+            if scale < 1:
+                image = image.resize(
+                    (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                    Image.Resampling.LANCZOS
+                )
             
-            return result
+            return image
     
     def _apply_border_radius(self, image: Image.Image, radius: int) -> Image.Image:
-        """Apply rounded corners to image"""
+        """Apply rounded corners to image (corners become transparent)"""
         # Create mask
         mask = Image.new('L', image.size, 0)
         mask_draw = ImageDraw.Draw(mask)
@@ -116,9 +169,12 @@ class ImageLayer(BaseLayer):
             fill=255
         )
         
-        # Apply mask
-        result = Image.new('RGB', image.size, (255, 255, 255))
-        result.paste(image, mask=mask)
+        # Combine with the image's own transparency
+        if image.mode == 'RGBA':
+            mask = ImageChops.multiply(mask, image.getchannel('A'))
+        
+        result = image.convert('RGB') if image.mode != 'RGB' else image.copy()
+        result.putalpha(mask)
         
         return result
     
@@ -1,7 +1,20 @@
 from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
 import os
 from renderer.layers.base_layer import BaseLayer
 
+
+@lru_cache(maxsize=128)
+def load_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a TrueType font, cached per process
+
+    Fonts are immutable once loaded, so every layer and every render in
+    the same process shares one instance per (path, size).
+    """
+    return ImageFont.truetype(font_path, size)
+
+
 class TextLayer(BaseLayer):
     """Renders text"""
     
@@ -82,7 +95,7 @@ class TextLayer(BaseLayer):
         
         if font_path and os.path.exists(font_path):
             try:
-                return ImageFont.truetype(font_path, size)
+                return load_font(font_path, size)
             except Exception as e:
                 print(f"Error loading font {font_path}: {e}")
         
@@ -0,0 +1,425 @@
+from multiprocessing import shared_memory, resource_tracker
+from PIL import Image
+from typing import Optional
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import time
+
+# Index segment: header followed by fixed-size slots
+_INDEX_HEADER = struct.Struct('<4sIQQ')    # magic, slot count, bytes in use, eviction count
+_SLOT = struct.Struct('<20sQdi')           # key digest, size, last used, refcount
+_INDEX_MAGIC = b'PRX2'
+
+# Asset segment: header followed by raw pixel data
+_ASSET_HEADER = struct.Struct('<4sBII')    # magic, mode, width, height
+_ASSET_MAGIC = b'PRA1'
+_DATA_OFFSET = 16
+
+_MODES = ('RGB', 'RGBA', 'L', 'LA')
+_EMPTY = b'\x00' * 20
+
+# Pins older than this are assumed to belong to a crashed process
+STALE_PIN_SECONDS = 600
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    Open a shared memory segment that outlives the process opening it
+
+    Python < 3.13 registers every segment with the resource tracker, which
+    unlinks it when the process exits. Cache segments belong to the host,
+    not to whichever worker happened to create them.
+    """
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    try:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+    return segment
+
+
+def _unlink_segment(segment: shared_memory.SharedMemory) -> None:
+    """Unlink a segment opened with _open_segment"""
+    # unlink() also unregisters it, which the tracker reports as an error
+    # for a segment _open_segment never left registered
+    try:
+        resource_tracker.register(segment._name, 'shared_memory')
+    except Exception:
+        pass
+    segment.unlink()
+
+
+class SharedImageCache:
+    """
+    Host-wide cache of decoded images in shared memory
+
+    Every cached image lives in its own shared memory segment as raw
+    pixels, so any worker process on the host can wrap it zero-copy with
+    Image.frombuffer instead of downloading and decoding it again. A small
+    index segment (guarded by an flock) tracks size, last use and a pin
+    count per entry. When the byte budget or slot table is full, the least
+    recently used unpinned entry is evicted.
+
+    An evicted segment is unlinked, but its memory is only returned once
+    every process that mapped it lets go. The index counts evictions, and
+    each process compares that count with the last one it saw on every
+    call, closing its mappings of entries that are gone; so the host
+    holds at most max_bytes plus what is pinned at that moment.
+
+    Usage:
+        cache = SharedImageCache(max_bytes=256 * 1024 * 1024)
+        image = cache.get(url)
+        if image is None:
+            image = cache.put(url, decoded)
+        try:
+            ...  # image is read-only; Pillow copies on write
+        finally:
+            cache.release(url)
+    """
+
+    def __init__(self, namespace: str = 'postraft', max_bytes: int = 256 * 1024 * 1024, slots: int = 512):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.slots = slots
+        self._lock_path = os.path.join(
+            tempfile.gettempdir(), f'{namespace}-assets.lock')
+        self._lock_file = None
+        self._lock_pid = None
+        self._index = None
+        # Segments this process has attached to, by key digest
+        self._attached = {}
+        # Index eviction count when this process last dropped evicted segments
+        self._generation = 0
+
+    def _lock(self):
+        # flock belongs to the open file, so a forked child needs its own
+        if self._lock_file is None or self._lock_pid != os.getpid():
+            self._lock_file = open(self._lock_path, 'a+b')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _unlock(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _open_index(self):
+        """Attach to (or create) the index segment. Caller holds the lock."""
+        if self._index is not None:
+            return self._index
+
+        # Versioned: the header layout changed with the eviction count
+        name = f'{self.namespace}-idx2'
+        size = _INDEX_HEADER.size + _SLOT.size * self.slots
+
+        try:
+            self._index = _open_segment(name)
+        except FileNotFoundError:
+            self._index = _open_segment(name, create=True, size=size)
+            self._index.buf[:size] = b'\x00' * size
+            _INDEX_HEADER.pack_into(
+                self._index.buf, 0, _INDEX_MAGIC, self.slots, 0, 0)
+
+        magic, slots, _, _ = _INDEX_HEADER.unpack_from(self._index.buf, 0)
+        if magic != _INDEX_MAGIC:
+            raise RuntimeError(f'Corrupt shared asset index {name}')
+        self.slots = slots
+
+        return self._index
+
+    def _slot_offset(self, i: int) -> int:
+        return _INDEX_HEADER.size + i * _SLOT.size
+
+    def _read_slot(self, i: int):
+        return _SLOT.unpack_from(self._index.buf, self._slot_offset(i))
+
+    def _write_slot(self, i: int, digest: bytes, size: int, last_used: float, refcount: int):
+        _SLOT.pack_into(self._index.buf, self._slot_offset(i),
+                        digest, size, last_used, refcount)
+
+    def _find_slot(self, digest: bytes) -> Optional[int]:
+        for i in range(self.slots):
+            if self._read_slot(i)[0] == digest:
+                return i
+        return None
+
+    def _bytes_used(self) -> int:
+        return _INDEX_HEADER.unpack_from(self._index.buf, 0)[2]
+
+    def _index_generation(self) -> int:
+        return _INDEX_HEADER.unpack_from(self._index.buf, 0)[3]
+
+    def _write_header(self, bytes_used: int, generation: int):
+        _INDEX_HEADER.pack_into(
+            self._index.buf, 0, _INDEX_MAGIC, self.slots, max(0, bytes_used), generation)
+
+    def _set_bytes_used(self, value: int):
+        self._write_header(value, self._index_generation())
+
+    def _segment_name(self, digest: bytes) -> str:
+        return f'{self.namespace}-{digest.hex()[:24]}'
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.sha1(key.encode('utf-8')).digest()
+
+    def _evict_slot(self, i: int):
+        """Drop one entry and unlink its segment. Caller holds the lock."""
+        digest, size, _, _ = self._read_slot(i)
+        self._write_slot(i, _EMPTY, 0, 0.0, 0)
+        self._write_header(self._bytes_used() - size, self._index_generation() + 1)
+        self._detach(digest)
+
+        try:
+            segment = _open_segment(self._segment_name(digest))
+            segment.close()
+            # Processes that still map it keep their view until they close
+            _unlink_segment(segment)
+        except FileNotFoundError:
+            pass
+
+    def _make_room(self, size: int) -> Optional[int]:
+        """
+        Evict LRU entries until `size` bytes and one slot are free
+
+        Returns:
+            int: Free slot index, or None if pinned entries fill the cache
+        """
+        now = time.time()
+
+        while True:
+            free_slot = None
+            victim = None
+            victim_used = None
+
+            for i in range(self.slots):
+                digest, _, last_used, refcount = self._read_slot(i)
+                if digest == _EMPTY:
+                    if free_slot is None:
+                        free_slot = i
+                    continue
+
+                pinned = refcount > 0 and now - last_used < STALE_PIN_SECONDS
+                if not pinned and (victim_used is None or last_used < victim_used):
+                    victim, victim_used = i, last_used
+
+            fits = self._bytes_used() + size <= self.max_bytes
+            if free_slot is not None and fits:
+                return free_slot
+
+            if victim is None:
+                return None
+
+            self._evict_slot(victim)
+
+    def _attach(self, digest: bytes) -> Optional[shared_memory.SharedMemory]:
+        segment = self._attached.get(digest)
+        if segment is not None:
+            return segment
+
+        try:
+            segment = _open_segment(self._segment_name(digest))
+        except FileNotFoundError:
+            return None
+
+        self._attached[digest] = segment
+        return segment
+
+    def _detach(self, digest: bytes) -> bool:
+        """Close this process's mapping of a segment; False if an image still uses it"""
+        segment = self._attached.pop(digest, None)
+        if segment is None:
+            return True
+        try:
+            segment.close()
+        except BufferError:
+            # An image still wraps the buffer; keep the mapping alive
+            self._attached[digest] = segment
+            return False
+        return True
+
+    def _drop_evicted(self):
+        """
+        Close this process's mappings once anything was evicted. Caller holds the lock.
+
+        Every mapping not in use is closed, not only those of entries
+        gone from the index: an entry may have been evicted and cached
+        again under the same name, leaving us mapped to the unlinked
+        copy. Live entries are simply attached again on their next use.
+        Evicted entries an image still wraps are retried on the next call.
+        """
+        generation = self._index_generation()
+        if generation == self._generation or not self._attached:
+            self._generation = generation
+            return
+
+        cached = {self._read_slot(i)[0] for i in range(self.slots)}
+        busy = [
+            digest
+            for digest in list(self._attached)
+            if not self._detach(digest) and digest not in cached
+        ]
+
+        if not busy:
+            self._generation = generation
+
+    @staticmethod
+    def _wrap(segment: shared_memory.SharedMemory) -> Optional[Image.Image]:
+        magic, mode_code, width, height = _ASSET_HEADER.unpack_from(
+            segment.buf, 0)
+        if magic != _ASSET_MAGIC:
+            return None
+
+        mode = _MODES[mode_code]
+        nbytes = width * height * len(mode)
+        data = segment.buf[_DATA_OFFSET:_DATA_OFFSET + nbytes]
+
+        return Image.frombuffer(mode, (width, height), data, 'raw', mode, 0, 1)
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        """
+        Look up a cached image and pin it
+
+        Args:
+            key: Cache key (usually the asset URL)
+
+        Returns:
+            Image: Read-only image sharing the cache's memory, or None.
+                Call release(key) once done with it.
+        """
+        digest = self._digest(key)
+
+        self._lock()
+        try:
+            self._open_index()
+            self._drop_evicted()
+            i = self._find_slot(digest)
+            if i is None:
+                self._detach(digest)
+                return None
+
+            segment = self._attach(digest)
+            if segment is None:
+                # Its segment was unlinked from outside; free the slot
+                self._evict_slot(i)
+                return None
+
+            _, size, _, refcount = self._read_slot(i)
+            self._write_slot(i, digest, size, time.time(), refcount + 1)
+        finally:
+            self._unlock()
+
+        return self._wrap(segment)
+
+    def put(self, key: str, image: Image.Image) -> Image.Image:
+        """
+        Store a decoded image and pin it
+
+        Args:
+            key: Cache key (usually the asset URL)
+            image: Decoded image (RGB, RGBA, L or LA)
+
+        Returns:
+            Image: Shared read-only view of the image, or the image itself
+                if it could not be cached. Call release(key) once done.
+        """
+        if image.mode not in _MODES:
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        data = image.tobytes()
+        size = _DATA_OFFSET + len(data)
+        if size > self.max_bytes:
+            return image
+
+        digest = self._digest(key)
+
+        self._lock()
+        try:
+            self._open_index()
+            self._drop_evicted()
+
+            # Another worker may have cached it while we were decoding
+            i = self._find_slot(digest)
+            if i is not None:
+                segment = self._attach(digest)
+                if segment is not None:
+                    _, existing, _, refcount = self._read_slot(i)
+                    self._write_slot(i, digest, existing,
+                                     time.time(), refcount + 1)
+                    return self._wrap(segment)
+
+                # Slot left behind by a segment that is gone: one slot per digest
+                self._evict_slot(i)
+
+            i = self._make_room(size)
+            if i is None:
+                return image
+
+            name = self._segment_name(digest)
+            try:
+                segment = _open_segment(name, create=True, size=size)
+            except FileExistsError:
+                # Orphan from a crashed writer
+                orphan = _open_segment(name)
+                orphan.close()
+                _unlink_segment(orphan)
+                segment = _open_segment(name, create=True, size=size)
+
+            _ASSET_HEADER.pack_into(
+                segment.buf, 0, _ASSET_MAGIC, _MODES.index(image.mode),
+                image.width, image.height)
+            segment.buf[_DATA_OFFSET:size] = data
+
+            self._attached[digest] = segment
+            self._write_slot(i, digest, size, time.time(), 1)
+            self._set_bytes_used(self._bytes_used() + size)
+        finally:
+            self._unlock()
+
+        return self._wrap(segment)
+
+    def release(self, key: str) -> None:
+        """Unpin an image returned by get() or put()"""
+        digest = self._digest(key)
+
+        self._lock()
+        try:
+            self._open_index()
+            self._drop_evicted()
+            i = self._find_slot(digest)
+            if i is None:
+                # Evicted while we held it; drop our mapping if we can
+                self._detach(digest)
+                return
+
+            _, size, last_used, refcount = self._read_slot(i)
+            self._write_slot(i, digest, size, last_used, max(0, refcount - 1))
+        finally:
+            self._unlock()
+
+    def clear(self) -> None:
+        """Evict every entry (pinned or not)"""
+        self._lock()
+        try:
+            self._open_index()
+            for i in range(self.slots):
+                if self._read_slot(i)[0] != _EMPTY:
+                    self._evict_slot(i)
+        finally:
+            self._unlock()
+
+    def stats(self) -> dict:
+        """Entry count and bytes used"""
+        self._lock()
+        try:
+            self._open_index()
+            entries = sum(
+                1 for i in range(self.slots) if self._read_slot(i)[0] != _EMPTY)
+            return {
+                'entries': entries,
+                'bytes': self._bytes_used(),
+                'max_bytes': self.max_bytes,
+            }
+        finally:
+            self._unlock()
@@ -0,0 +1,147 @@
+"""
+Fixtures for the unit tests
+
+The unit tests run against a throwaway SQLite database (with foreign
+keys enforced, as on PostgreSQL) and fakeredis, so they need neither a
+running API server nor Redis. The older test_*.py scripts that call the
+live API on localhost:5000 are unaffected.
+"""
+import fakeredis
+import pytest
+from flask_jwt_extended import create_access_token
+from rq import SimpleWorker
+from sqlalchemy import event
+from app import create_app
+from app.config import ProductionConfig
+from app.extensions import db
+from app.models import Plan, Product, Template, User
+from app.workers import render_job
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+
+# Small template drawing the product name and price
+TEMPLATE_DEFINITION = {
+    'canvas': {'w': 60, 'h': 60},
+    'layers': [
+        {'type': 'text', 'key': 'product.name', 'x': 2, 'y': 2, 'size': 10},
+        {'type': 'text', 'key': 'product.price', 'x': 2, 'y': 20, 'size': 10},
+    ],
+}
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """Flask app on SQLite + fakeredis, with uploads kept in memory"""
+    # A file, not :memory:, so upload threads and engine.dispose() see the same data
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/postraft.db')
+
+    flask_app = create_app('production')
+    flask_app.config.update(
+        TESTING=True,
+        BATCH_CHUNK_SIZE=3,
+        BATCH_FLUSH_SIZE=2,
+        PIPELINE_UPLOAD_WORKERS=0,
+        BATCH_MAX_RETRIES=0,
+        RERENDER_ON_CHANGE=False,
+    )
+
+    QueueManager.reset()
+    QueueManager._redis_conn = fakeredis.FakeStrictRedis()
+    render_job.set_app(flask_app)
+
+    uploads = []
+
+    def fake_upload(image_file, folder='posters'):
+        uploads.append(image_file.name)
+        return f'https://cdn.test/{folder}/{image_file.name}'
+
+    monkeypatch.setattr(render_job, 'upload_image', fake_upload)
+    flask_app.uploads = uploads
+
+    with flask_app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def enforce_foreign_keys(connection, record):
+            connection.execute('PRAGMA foreign_keys=ON')
+
+        db.create_all()
+
+        yield flask_app
+
+        db.session.remove()
+        db.drop_all()
+        event.remove(db.engine, 'connect', enforce_foreign_keys)
+
+    QueueManager.reset()
+    render_job.set_app(None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def redis_conn(app):
+    return QueueManager.get_redis_connection()
+
+
+@pytest.fixture
+def plan(app):
+    plan = Plan(name='free', monthly_generations=100, features={})
+    db.session.add(plan)
+    db.session.commit()
+    return plan
+
+
+@pytest.fixture
+def user(app, plan):
+    return make_user(plan, 'owner@postraft.test')
+
+
+@pytest.fixture
+def template(app):
+    template = Template(
+        name='Price tag',
+        format='square',
+        json_definition=TEMPLATE_DEFINITION,
+        is_system=True,
+        is_active=True
+    )
+    db.session.add(template)
+    db.session.commit()
+    return template
+
+
+@pytest.fixture
+def products(user):
+    items = [
+        Product(user_id=user.id, name=f'Product {i}', price=10.0 + i, category='Groceries')
+        for i in range(5)
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+def make_user(plan, email: str) -> User:
+    user = User(email=email, password_hash='x', plan_id=plan.id, monthly_generations=0)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user) -> dict:
+    """Authorization header for API requests as `user`"""
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+def run_jobs(*queue_names, connection=None, max_jobs=None):
+    """Run the jobs queued on `queue_names` in this process, until none (or max_jobs) are left"""
+    connection = connection or QueueManager.get_redis_connection()
+    worker = SimpleWorker(
+        list(queue_names) or ['default'],
+        connection=connection,
+        serializer=JobSerializer
+    )
+    worker.work(burst=True, max_jobs=max_jobs)
+    return worker
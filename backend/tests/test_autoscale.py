@@ -0,0 +1,68 @@
+from rq import Queue
+from app.workers.autoscale import Autoscaler, queue_demand
+from app.workers.lanes import BULK, INTERACTIVE
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+
+
+def demand(waiting=0, running=0, oldest_age=0.0):
+    return {'waiting': waiting, 'running': running, 'oldest_age': oldest_age}
+
+
+def test_scales_up_to_the_backlog_at_once():
+    scaler = Autoscaler(min_workers=1, max_workers=8, jobs_per_worker=10, cooldown=30)
+
+    assert scaler.desired(1, demand(waiting=45), now=0) == 5
+    # Cooldown: no change straight after
+    assert scaler.desired(5, demand(waiting=200), now=10) == 5
+    assert scaler.desired(5, demand(waiting=200), now=40) == 8
+
+
+def test_scales_up_for_an_old_job_even_with_a_short_queue():
+    scaler = Autoscaler(min_workers=1, max_workers=4, max_queue_age=60)
+
+    assert scaler.desired(1, demand(waiting=1, oldest_age=90), now=0) == 2
+
+
+def test_scales_down_one_worker_per_quiet_delay():
+    scaler = Autoscaler(min_workers=1, max_workers=4, scale_down_delay=120, cooldown=30)
+    quiet = demand(waiting=0, running=0)
+
+    assert scaler.desired(3, quiet, now=0) == 3
+    assert scaler.desired(3, quiet, now=100) == 3
+    assert scaler.desired(3, quiet, now=120) == 2
+    assert scaler.desired(2, quiet, now=200) == 2
+    assert scaler.desired(2, quiet, now=240) == 1
+    # Never below the minimum
+    assert scaler.desired(1, quiet, now=1000) == 1
+
+
+def test_a_busy_spell_restarts_the_quiet_clock():
+    scaler = Autoscaler(min_workers=1, max_workers=4, scale_down_delay=120, cooldown=0)
+    quiet = demand(waiting=0, running=0)
+
+    scaler.desired(3, quiet, now=0)
+    scaler.desired(3, demand(waiting=0, running=3), now=100)
+
+    assert scaler.desired(3, quiet, now=150) == 3
+    assert scaler.desired(3, quiet, now=270) == 2
+
+
+def test_bounds_are_enforced_first():
+    scaler = Autoscaler(min_workers=2, max_workers=4)
+
+    assert scaler.desired(0, demand(), now=0) == 2
+    assert scaler.desired(9, demand(waiting=500), now=100) == 4
+
+
+def test_queue_demand_counts_waiting_jobs(app):
+    connection = QueueManager.get_redis_connection()
+    for name, count in ((INTERACTIVE, 2), (BULK, 3)):
+        queue = Queue(name, connection=connection, serializer=JobSerializer)
+        for _ in range(count):
+            queue.enqueue('time.time')
+
+    measured = queue_demand([INTERACTIVE, BULK])
+
+    assert (measured['waiting'], measured['running']) == (5, 0)
+    assert measured['oldest_age'] >= 0
@@ -0,0 +1,70 @@
+from PIL import Image
+from io import BytesIO
+import pytest
+from renderer import engine
+from renderer.engine import PosterRenderer
+
+TEMPLATE = {'canvas': {'w': 20, 'h': 10}, 'layers': []}
+BACKGROUND_URL = 'https://cdn.test/backgrounds/sale.png'
+
+
+def png(image: Image.Image) -> bytes:
+    output = BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def pixel(image_bytes: bytes, xy=(10, 5)):
+    return Image.open(BytesIO(image_bytes)).convert('RGB').getpixel(xy)
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Count background downloads, served from memory"""
+    fetched = []
+    art = {BACKGROUND_URL: png(Image.new('RGB', (80, 40), (0, 128, 0)))}
+
+    def fake_fetch(url, timeout=10):
+        fetched.append(url)
+        return art[url]
+
+    monkeypatch.setattr(engine, 'fetch', fake_fetch)
+    engine._background_cache.clear()
+    yield fetched
+    engine._background_cache.clear()
+
+
+def test_background_is_the_starting_canvas(downloads):
+    image_bytes = PosterRenderer().render(TEMPLATE, {}, cache_key='1:a', background_url=BACKGROUND_URL)
+
+    assert Image.open(BytesIO(image_bytes)).size == (20, 10)
+    assert pixel(image_bytes) == (0, 128, 0)
+
+
+def test_background_is_downloaded_once_per_template_version(downloads):
+    renderer = PosterRenderer()
+
+    for _ in range(3):
+        renderer.render(TEMPLATE, {}, cache_key='1:a', background_url=BACKGROUND_URL)
+    renderer.render(TEMPLATE, {}, cache_key='1:b', background_url=BACKGROUND_URL)
+
+    assert downloads == [BACKGROUND_URL, BACKGROUND_URL]
+
+
+def test_cached_background_is_not_drawn_on(downloads):
+    renderer = PosterRenderer()
+    template = {
+        'canvas': {'w': 20, 'h': 10},
+        'layers': [{'type': 'text', 'value': 'SALE', 'x': 0, 'y': 0, 'size': 10, 'color': '#ff0000'}],
+    }
+
+    renderer.render(template, {}, cache_key='1:a', background_url=BACKGROUND_URL)
+
+    cached = engine._background_cache[('1:a', BACKGROUND_URL, 20, 10)]
+    assert cached.getcolors() == [(200, (0, 128, 0))]
+
+
+def test_unreachable_background_falls_back_to_white(downloads):
+    image_bytes = PosterRenderer().render(TEMPLATE, {}, background_url='https://cdn.test/missing.png')
+
+    assert pixel(image_bytes) == (255, 255, 255)
@@ -0,0 +1,92 @@
+from rq.job import Job
+from app.extensions import db
+from app.models import JobResult, Poster
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def batch_status(job_id):
+    return QueueManager.get_job_status(job_id)
+
+
+def test_small_batch_runs_as_one_job(app, user, template, products):
+    product_ids = [product.id for product in products[:3]]
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    run_jobs(LANE)
+
+    status = batch_status(job_id)
+    assert status['status'] == 'completed'
+    assert status['result']['successful'] == 3
+    assert [result['product_id'] for result in status['result']['results']] == product_ids
+    assert Poster.query.filter_by(job_id=job_id, status='generated').count() == 3
+
+
+def test_large_batch_is_chunked_and_merged(app, user, template, products):
+    product_ids = [product.id for product in products]
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    parent = Job.fetch(job_id, connection=QueueManager.get_redis_connection(), serializer=JobSerializer)
+    assert len(parent.meta['children']) == 2
+
+    run_jobs(LANE)
+
+    result = batch_status(job_id)['result']
+    assert (result['total'], result['successful'], result['failed']) == (5, 5, 0)
+    assert [entry['product_id'] for entry in result['results']] == product_ids
+    # Chunk rows are folded into the batch's
+    assert JobResult.query.count() == 1
+    assert Poster.query.filter_by(job_id=job_id).count() == 5
+
+
+def test_chunks_are_kept_until_merged(app, user, template, products):
+    connection = QueueManager.get_redis_connection()
+
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+    children = Job.fetch(job_id, connection=connection, serializer=JobSerializer).meta['children']
+
+    run_jobs(LANE, max_jobs=2)
+    # Finished, and waiting for the collector without a TTL
+    assert all(connection.ttl(f'rq:job:{child_id}') == -1 for child_id in children)
+
+    run_jobs(LANE)
+    assert Job.fetch_many(children, connection=connection, serializer=JobSerializer) == [None, None]
+
+
+def test_chunk_gone_before_the_merge_counts_its_saved_posters(app, user, template, products):
+    product_ids = [product.id for product in products]
+    connection = QueueManager.get_redis_connection()
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    parent = Job.fetch(job_id, connection=connection, serializer=JobSerializer)
+    _, second_chunk = parent.meta['children']
+
+    # Both chunks run; the second one's job is gone before the merge
+    run_jobs(LANE, max_jobs=2)
+    Job.fetch(second_chunk, connection=connection, serializer=JobSerializer).delete()
+    run_jobs(LANE)
+
+    result = batch_status(job_id)['result']
+    assert (result['total'], result['successful'], result['failed']) == (5, 5, 0)
+    assert [entry['product_id'] for entry in result['results']] == product_ids
+    assert all(entry['poster_id'] for entry in result['results'])
+
+
+def test_product_deleted_before_the_job_is_skipped(app, user, template, products):
+    product_ids = [product.id for product in products[:3]]
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    db.session.delete(products[1])
+    db.session.commit()
+    run_jobs(LANE)
+
+    result = batch_status(job_id)['result']
+    assert result['successful'] == 2
+    assert result['errors'] == [
+        {'product_id': product_ids[1], 'error': f'Product {product_ids[1]} not found', 'skipped': True}
+    ]
+    assert Poster.query.filter_by(job_id=job_id).count() == 2
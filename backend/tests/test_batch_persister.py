@@ -0,0 +1,87 @@
+from sqlalchemy import delete
+from app.extensions import db
+from app.models import Poster, Product
+from app.workers import render_job
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import QuotaLedger
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def delete_product(product_id):
+    db.session.execute(delete(Product).where(Product.id == product_id))
+    db.session.commit()
+
+
+def test_product_deleted_mid_batch_does_not_lose_the_flush(app, user, template, products, monkeypatch):
+    app.config['BATCH_FLUSH_SIZE'] = 10
+    product_ids = [product.id for product in products[:3]]
+    deleted = product_ids[0]
+    upload = render_job.upload_image
+
+    def upload_then_delete(image_file, folder='posters'):
+        # Deleted once its own poster is rendered and buffered
+        if image_file.name.startswith(f'poster_{product_ids[1]}_'):
+            delete_product(deleted)
+        return upload(image_file, folder)
+
+    monkeypatch.setattr(render_job, 'upload_image', upload_then_delete)
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    run_jobs(LANE)
+
+    result = QueueManager.get_job_status(job_id)['result']
+    assert result['successful'] == 2
+    assert [error['product_id'] for error in result['errors']] == [deleted]
+    assert {poster.product_id for poster in Poster.query.filter_by(job_id=job_id)} == set(product_ids[1:])
+    assert QuotaLedger(QueueManager.get_redis_connection()).usage(user)['used'] == 2
+
+
+def test_failure_of_deleted_product_is_not_persisted(app, user, template, products, monkeypatch):
+    app.config['BATCH_FLUSH_SIZE'] = 10
+    product_ids = [product.id for product in products[:3]]
+    broken = product_ids[1]
+    render = render_job.render_poster
+
+    def render_or_fail(renderer, template, data):
+        if data['product']['name'] == products[1].name:
+            delete_product(broken)
+            raise RuntimeError('font missing')
+        return render(renderer, template, data)
+
+    monkeypatch.setattr(render_job, 'render_poster', render_or_fail)
+
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    run_jobs(LANE)
+
+    result = QueueManager.get_job_status(job_id)['result']
+    assert result['successful'] == 2
+    assert result['errors'] == [{'product_id': broken, 'error': 'font missing'}]
+    assert Poster.query.filter_by(job_id=job_id, status='generated').count() == 2
+    assert Poster.query.filter_by(job_id=job_id, status='failed').count() == 0
+
+
+def test_failed_insert_keeps_buffered_posters(app, user, template, products, monkeypatch):
+    persister = render_job.BatchPersister(user.id, template, flush_every=10, job_id='job-1')
+    persister.add_success(products[0].id, 'https://cdn.test/a.png', 'A')
+    persister.add_failure(products[1].id, 'boom')
+
+    def fail_commit():
+        raise RuntimeError('connection lost')
+
+    monkeypatch.setattr(db.session, 'commit', fail_commit)
+    try:
+        persister.flush()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('flush should raise')
+    monkeypatch.undo()
+
+    persister.flush()
+
+    assert Poster.query.filter_by(job_id='job-1', status='generated').count() == 1
+    assert Poster.query.filter_by(job_id='job-1', status='failed').count() == 1
+    assert [result['product_id'] for result in persister.results] == [products[0].id]
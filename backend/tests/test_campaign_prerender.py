@@ -0,0 +1,126 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app.extensions import db
+from app.models import Campaign, Plan, Poster
+from app.core.campaigns.prerender_service import CampaignPrerenderService
+from app.workers import prerender
+from app.workers.lanes import BULK, BULK_PRIORITY, INTERACTIVE
+from conftest import make_user, run_jobs
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture
+def prerender_plan(plan):
+    plan.features = {CampaignPrerenderService.FEATURE: True}
+    db.session.commit()
+    return plan
+
+
+def add_campaign(user, template, start_date, **fields):
+    campaign = Campaign(
+        user_id=user.id,
+        name='Spring sale',
+        start_date=start_date,
+        template_id=template.id,
+        rules={'category': 'Groceries'},
+        **fields
+    )
+    db.session.add(campaign)
+    db.session.commit()
+    return campaign
+
+
+def add_poster(campaign, product, status):
+    db.session.add(Poster(
+        user_id=campaign.user_id,
+        product_id=product.id,
+        template_id=campaign.template_id,
+        campaign_id=campaign.id,
+        image_url='' if status == 'failed' else f'https://cdn.test/posters/{product.id}.png',
+        status=status
+    ))
+    db.session.commit()
+
+
+def test_hour_windows_may_wrap_midnight():
+    assert [CampaignPrerenderService.in_hours('0-6', hour) for hour in (0, 5, 6, 23)] == [True, True, False, False]
+    assert [CampaignPrerenderService.in_hours('22-5', hour) for hour in (21, 22, 2, 5)] == [False, True, True, False]
+    assert CampaignPrerenderService.in_hours('', 12) is True
+
+
+def test_missing_products_retries_failed_posters(app, user, template, products):
+    campaign = add_campaign(user, template, date(2026, 11, 1))
+
+    add_poster(campaign, products[0], 'generated')
+    add_poster(campaign, products[1], 'failed')
+
+    assert CampaignPrerenderService.missing_products(campaign) == [product.id for product in products[1:]]
+
+
+def test_only_opted_in_campaigns_within_the_horizon_are_due(app, user, prerender_plan, template):
+    due = add_campaign(user, template, TODAY + timedelta(days=1))
+    add_campaign(user, template, TODAY + timedelta(days=4))
+    add_campaign(user, template, TODAY - timedelta(days=1))
+    add_campaign(user, template, TODAY + timedelta(days=1), is_active=False)
+
+    free = Plan(name='basic', monthly_generations=100, features={})
+    db.session.add(free)
+    db.session.commit()
+    add_campaign(make_user(free, 'other@postraft.test'), template, TODAY + timedelta(days=1))
+
+    assert CampaignPrerenderService.due_campaigns(TODAY, 3) == [due]
+
+
+def test_campaign_is_skipped_while_its_prerender_runs(app, user, prerender_plan, template, products):
+    add_campaign(user, template, TODAY + timedelta(days=2))
+
+    first = CampaignPrerenderService.prerender_due(3, today=TODAY)
+    assert [(entry['queue'], entry['total']) for entry in first['queued']] == [(BULK, 5)]
+
+    assert CampaignPrerenderService.prerender_due(3, today=TODAY)['skipped'] == 1
+
+    run_jobs(BULK, INTERACTIVE)
+    assert Poster.query.filter_by(status='generated').count() == 5
+
+    # Finished, and nothing left to render
+    again = CampaignPrerenderService.prerender_due(3, today=TODAY)
+    assert (again['queued'], again['skipped']) == ([], 1)
+
+
+def test_priority_plan_prerenders_on_its_own_bulk_lane(app, user, prerender_plan, template, products):
+    prerender_plan.price = 9
+    db.session.commit()
+    add_campaign(user, template, TODAY + timedelta(days=1))
+
+    summary = CampaignPrerenderService.prerender_due(3, today=TODAY)
+
+    assert summary['queued'][0]['queue'] == BULK_PRIORITY
+
+
+def test_refused_campaign_is_reported_and_retried_later(app, user, prerender_plan, template, products):
+    prerender_plan.monthly_generations = 2
+    db.session.commit()
+    campaign = add_campaign(user, template, TODAY + timedelta(days=1))
+
+    summary = CampaignPrerenderService.prerender_due(3, today=TODAY)
+
+    assert summary['queued'] == []
+    assert summary['refused'][0]['campaign_id'] == campaign.id
+
+
+@pytest.mark.parametrize('hour, runs', [(2, True), (12, False)])
+def test_scheduler_only_queues_off_peak(app, user, prerender_plan, template, products, monkeypatch, hour, runs):
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow().replace(hour=hour)
+
+    monkeypatch.setattr(prerender, 'datetime', Clock)
+    app.config['PRERENDER_HOURS'] = '0-6'
+    add_campaign(user, template, datetime.utcnow().date() + timedelta(days=1))
+
+    summary = prerender.prerender_campaigns()
+
+    assert len(summary['queued']) == (1 if runs else 0)
+    assert summary.get('off_peak', True) is runs
@@ -0,0 +1,117 @@
+from datetime import date
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models import Campaign, Poster, Product
+from app.core.campaigns.campaign_service import CampaignService
+from app.core.campaigns.rules import CampaignRules
+from app.core.posters.generation_service import PosterGenerationService
+from app.workers.batch_job import enqueue_single_poster
+from app.workers.queue_manager import QueueManager
+from app.workers.render_job import campaign_fields, iter_data_contexts
+from conftest import make_user, run_jobs
+
+LANE = 'poster-generation'
+LEGACY_RULES = {'discount': '20%', 'product_ids': '1,2'}
+
+
+@pytest.fixture
+def legacy_campaign(user, template):
+    """Campaign whose free-form rules were saved before rules were validated"""
+    campaign = Campaign(user_id=user.id, name='Old sale', start_date=date(2026, 11, 1), template_id=template.id)
+    db.session.add(campaign)
+    db.session.commit()
+
+    db.session.execute(Campaign.__table__.update().values(rules=LEGACY_RULES))
+    db.session.commit()
+    db.session.expire_all()
+    return campaign
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run while the test is recording"""
+    recorded = []
+
+    def record(conn, cursor, statement, *args):
+        recorded.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_rules_select_products_with_one_query(app, user, plan, products, statements):
+    toy = Product(user_id=user.id, name='Toy', price=5.0, category='Toys')
+    others = Product(user_id=make_user(plan, 'other@postraft.test').id, name='Theirs', price=10.0,
+                     category='Groceries')
+    db.session.add_all([toy, others])
+    db.session.commit()
+
+    campaign = Campaign(user_id=user.id, name='Sale', rules={
+        'category': 'Groceries',
+        'product_ids': [products[0].id, products[1].id, products[3].id, toy.id, others.id],
+        'exclude_product_ids': [products[1].id],
+    })
+
+    statements.clear()
+    assert CampaignService.resolve_product_ids(campaign) == [products[0].id, products[3].id]
+    assert len(statements) == 1
+
+
+def test_price_range_and_category_list(app, user, products):
+    campaign = Campaign(user_id=user.id, name='Sale', rules={
+        'category': ['Groceries', 'Toys'], 'min_price': 11, 'max_price': 13
+    })
+
+    assert CampaignService.resolve_product_ids(campaign) == [product.id for product in products[1:4]]
+
+
+def test_derived_prices_apply_percentage_then_amount():
+    derived = CampaignRules({'discount': 20, 'discount_amount': 1}).derive([10.0, 2.0, 0.0])
+
+    assert derived == [
+        {'original_price': 10.0, 'sale_price': 7.0, 'savings': 3.0, 'discount_percent': 30},
+        {'original_price': 2.0, 'sale_price': 0.6, 'savings': 1.4, 'discount_percent': 70},
+        {'original_price': 0.0, 'sale_price': 0.0, 'savings': 0.0, 'discount_percent': 0},
+    ]
+    assert CampaignRules({'banner_text': 'SALE'}).derive([10.0]) == [{}]
+
+
+def test_batch_contexts_carry_the_sale_price(app, user, products):
+    campaign = Campaign(user_id=user.id, name='Sale', rules={'discount': 50, 'banner_text': 'SALE'})
+    db.session.add(campaign)
+    db.session.commit()
+
+    assert [fields['sale_price'] for fields in campaign_fields(campaign, products[:2])] == [5.0, 5.5]
+
+    contexts = list(iter_data_contexts([products[2].id, products[0].id], user.id, campaign))
+    assert [data['product']['sale_price'] for _, _, data in contexts] == [6.0, 5.0]
+    assert contexts[0][2]['campaign']['banner_text'] == 'SALE'
+
+
+def test_invalid_rules_are_refused_on_save(app, user):
+    with pytest.raises(ValueError, match='discount must be a number'):
+        Campaign(user_id=user.id, name='Sale', rules={'discount': '20%'})
+
+    campaign = Campaign(user_id=user.id, name='Sale', rules={'discount': 20, 'banner_text': 'SALE'})
+    assert campaign.rules['discount'] == 20
+
+
+def test_legacy_rules_are_refused_when_queued(app, user, products, legacy_campaign):
+    with pytest.raises(ValueError, match='Invalid campaign rules'):
+        PosterGenerationService.queue_generation(
+            user, legacy_campaign.template_id, [products[0].id], campaign_id=legacy_campaign.id
+        )
+
+
+def test_legacy_rules_render_without_derived_fields(app, user, template, products, legacy_campaign):
+    assert campaign_fields(legacy_campaign, products[:2]) == [{}, {}]
+
+    job_id = enqueue_single_poster(template.id, products[0].id, user.id,
+                                   campaign_id=legacy_campaign.id, queue_name=LANE)
+    run_jobs(LANE)
+
+    assert QueueManager.get_job_status(job_id)['status'] == 'completed'
+    poster = Poster.query.filter_by(job_id=job_id).one()
+    assert (poster.status, poster.campaign_id) == ('generated', legacy_campaign.id)
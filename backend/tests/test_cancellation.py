@@ -0,0 +1,73 @@
+from rq import Queue
+from rq.job import Job, JobStatus
+from app.models import Poster
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.cancellation import _dequeue, is_cancel_requested, request_cancel
+from app.workers.fair import FairScheduler
+from app.workers.lanes import BULK
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def fetch(job_id):
+    return Job.fetch(job_id, connection=QueueManager.get_redis_connection(), serializer=JobSerializer)
+
+
+def test_cancel_dequeues_waiting_chunks(app, user, template, products):
+    connection = QueueManager.get_redis_connection()
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+
+    assert request_cancel(connection, fetch(job_id)) == {'dequeued': 2, 'running': 0}
+    assert is_cancel_requested(connection, job_id)
+
+    for chunk_id in fetch(job_id).meta['children']:
+        chunk = fetch(chunk_id)
+        assert chunk.get_status() == JobStatus.FAILED
+        assert chunk.meta['cancelled'] is True
+
+    # Only the collector is left to run
+    assert Queue(LANE, connection=connection, serializer=JobSerializer).count == 1
+    run_jobs(LANE)
+
+    status = QueueManager.get_job_status(job_id)
+    assert status['status'] == 'cancelled'
+    assert status['result']['cancelled'] == [product.id for product in products]
+    assert Poster.query.filter_by(job_id=job_id).count() == 0
+
+
+def test_chunk_taken_by_a_worker_is_left_to_stop_itself(app, user, template, products):
+    connection = QueueManager.get_redis_connection()
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+    first_chunk, second_chunk = fetch(job_id).meta['children']
+    queue = Queue(LANE, connection=connection, serializer=JobSerializer)
+
+    # A worker pops the first chunk after its status was read as queued
+    chunk = fetch(first_chunk)
+    assert connection.lpop(queue.key).decode() == first_chunk
+
+    assert _dequeue(connection, chunk) is False
+    assert fetch(first_chunk).get_status() == JobStatus.QUEUED
+    assert 'cancelled' not in fetch(first_chunk).meta
+
+    assert _dequeue(connection, fetch(second_chunk)) is True
+    assert fetch(second_chunk).get_status() == JobStatus.FAILED
+
+
+def test_cancel_takes_chunks_out_of_the_fair_queue(app, user, template, products):
+    app.config.update(FAIR_LANE_DEPTH=1, FAIR_TENANT_CONCURRENCY=1, BATCH_CHUNK_SIZE=2)
+    connection = QueueManager.get_redis_connection()
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=BULK)
+    chunk_ids = fetch(job_id).meta['children']
+    scheduler = FairScheduler(connection, BULK)
+
+    # One chunk dispatched to the lane, two held
+    assert len(chunk_ids) == 3
+    assert scheduler.pending_count() == 2
+
+    assert request_cancel(connection, fetch(job_id)) == {'dequeued': 3, 'running': 0}
+    assert scheduler.pending_count() == 0
+    assert all(fetch(chunk_id).get_status() == JobStatus.FAILED for chunk_id in chunk_ids)
+    assert not connection.smembers(scheduler._key('running', user.id))
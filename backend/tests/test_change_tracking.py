@@ -0,0 +1,81 @@
+import pytest
+from app.extensions import db
+from app.models import Poster
+from app.core.posters.change_tracking import ChangeTracker
+from app.core.products.product_service import ProductService
+from app.workers import render_job
+from app.workers.lanes import BULK
+from app.workers.queue_manager import QueueManager
+from conftest import run_jobs
+
+
+@pytest.fixture
+def tracking(app):
+    app.config.update(RERENDER_ON_CHANGE=True, RERENDER_DEBOUNCE=0)
+    return app
+
+
+@pytest.fixture
+def poster(user, template, products):
+    poster = Poster(
+        user_id=user.id,
+        product_id=products[0].id,
+        template_id=template.id,
+        image_url='https://cdn.test/posters/old.png',
+        status='generated',
+        template_version=template.render_version
+    )
+    db.session.add(poster)
+    db.session.commit()
+    return poster
+
+
+def recorded_changes(user):
+    changes_key, _, _ = ChangeTracker._keys(user.id)
+    return {member.decode() for member in QueueManager.get_redis_connection().smembers(changes_key)}
+
+
+def test_sku_and_price_edit_records_both(tracking, user, products):
+    product = products[0]
+
+    ProductService.update_product(product.id, user, {'sku': 'SKU-1', 'price': 99.0})
+
+    assert recorded_changes(user) == {f'p:{product.id}:price', f'p:{product.id}:sku'}
+
+
+def test_changes_are_not_recorded_by_default(app, user, products):
+    ProductService.update_product(products[0].id, user, {'price': 99.0})
+
+    assert recorded_changes(user) == set()
+
+
+def test_old_poster_goes_stale_once_its_replacement_is_saved(tracking, user, products, poster):
+    ProductService.update_product(products[0].id, user, {'price': 99.0})
+
+    summary = ChangeTracker.flush(user.id)
+    assert len(summary['queued']) == 1
+    assert summary['replacing'] == 1
+    # Still the poster shown until the re-render is saved
+    assert db.session.get(Poster, poster.id).status == 'generated'
+
+    run_jobs(BULK)
+
+    db.session.expire_all()
+    assert db.session.get(Poster, poster.id).status == 'stale'
+    replacement = Poster.query.filter_by(job_id=summary['queued'][0]).one()
+    assert replacement.status == 'generated'
+
+
+def test_failed_rerender_keeps_the_old_poster(tracking, monkeypatch, user, products, poster):
+    def failing_upload(image_file, folder='posters'):
+        raise RuntimeError('storage unavailable')
+
+    monkeypatch.setattr(render_job, 'upload_image', failing_upload)
+    ProductService.update_product(products[0].id, user, {'price': 99.0})
+
+    summary = ChangeTracker.flush(user.id)
+    run_jobs(BULK)
+
+    db.session.expire_all()
+    assert QueueManager.get_job_status(summary['queued'][0])['status'] == 'failed'
+    assert db.session.get(Poster, poster.id).status == 'generated'
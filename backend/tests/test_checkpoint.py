@@ -0,0 +1,83 @@
+from app.extensions import db
+from app.models import Poster
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.checkpoint import PayloadCheckpoint, saved_posters
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import QuotaLedger
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def save_earlier_poster(user, template, product, job_id):
+    """What an earlier, interrupted run of the job committed"""
+    db.session.add(Poster(
+        user_id=user.id,
+        product_id=product.id,
+        template_id=template.id,
+        image_url='https://cdn.test/posters/earlier.png',
+        status='generated',
+        job_id=job_id
+    ))
+    db.session.commit()
+
+
+def test_rerun_batch_skips_posters_it_already_saved(app, user, template, products):
+    product_ids = [product.id for product in products[:3]]
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    ledger = QuotaLedger(QueueManager.get_redis_connection())
+
+    # The earlier run saved the first poster and was charged for it
+    save_earlier_poster(user, template, products[0], job_id)
+    ledger.commit(user.id, 1, job_id=job_id)
+
+    run_jobs(LANE)
+
+    result = QueueManager.get_job_status(job_id)['result']
+    assert result['successful'] == 3
+    assert result['results'][0]['image_url'] == 'https://cdn.test/posters/earlier.png'
+    # Only the two unfinished products were rendered, and charged
+    assert len(app.uploads) == 2
+    assert ledger.usage(user)['used'] == 3
+    assert ledger.charged(job_id) == 3
+    assert Poster.query.filter_by(job_id=job_id).count() == 3
+
+
+def test_rerun_charges_posters_saved_before_the_worker_died(app, user, template, products):
+    product_ids = [product.id for product in products[:3]]
+    job_id = enqueue_batch_posters(template.id, product_ids, user.id, queue_name=LANE)
+    ledger = QuotaLedger(QueueManager.get_redis_connection())
+
+    # Committed to the database, but the usage never reached the ledger
+    save_earlier_poster(user, template, products[0], job_id)
+
+    run_jobs(LANE)
+
+    assert len(app.uploads) == 2
+    assert ledger.usage(user) == {'used': 3, 'reserved': 0}
+    assert ledger.charged(job_id) == 3
+
+
+def test_saved_posters_only_counts_generated_rows_of_the_job(app, user, template, products):
+    for product, status, job_id in ((products[0], 'generated', 'job-1'),
+                                    (products[1], 'failed', 'job-1'),
+                                    (products[2], 'generated', 'job-2')):
+        db.session.add(Poster(user_id=user.id, product_id=product.id, template_id=template.id,
+                              image_url='https://cdn.test/posters/x.png', status=status, job_id=job_id))
+    db.session.commit()
+
+    saved = saved_posters('job-1', [product.id for product in products])
+
+    assert list(saved) == [products[0].id]
+    assert saved_posters(None, [products[0].id]) == {}
+
+
+def test_payload_checkpoint_round_trip(app):
+    job = QueueManager.get_queue('default').enqueue('time.time')
+    checkpoint = PayloadCheckpoint(job)
+
+    checkpoint.record(7, 'https://cdn.test/posters/7.png', 'Product 7')
+    assert PayloadCheckpoint(job).load() == {7: ('https://cdn.test/posters/7.png', 'Product 7')}
+
+    checkpoint.clear()
+    assert checkpoint.load() == {}
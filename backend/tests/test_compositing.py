@@ -0,0 +1,73 @@
+from PIL import Image
+from io import BytesIO
+import pytest
+from renderer import asset_cache
+from renderer.engine import PosterRenderer
+from renderer.layers.image_layer import ImageLayer
+
+
+def png(image: Image.Image) -> bytes:
+    output = BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def assets(monkeypatch):
+    """Serve image URLs from memory instead of the network"""
+    served = {}
+    monkeypatch.setattr(asset_cache, 'fetch', lambda url, timeout=10: served[url])
+    asset_cache.configure(shared=False)
+    yield served
+    asset_cache.clear()
+
+
+def test_decode_drops_an_opaque_alpha_channel():
+    assert asset_cache.decode(png(Image.new('RGBA', (4, 4), (10, 20, 30, 255)))).mode == 'RGB'
+    assert asset_cache.decode(png(Image.new('RGBA', (4, 4), (10, 20, 30, 128)))).mode == 'RGBA'
+    assert asset_cache.decode(png(Image.new('LA', (4, 4), (10, 0)))).mode == 'RGBA'
+    assert asset_cache.decode(png(Image.new('L', (4, 4), 10))).mode == 'RGB'
+
+
+def test_opaque_image_is_pasted_as_is():
+    canvas = Image.new('RGB', (4, 4), 'white')
+
+    ImageLayer({})._composite(canvas, Image.new('RGB', (2, 2), (255, 0, 0)), (1, 1))
+
+    assert canvas.getpixel((1, 1)) == (255, 0, 0)
+    assert canvas.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_transparency_and_opacity_blend_with_the_canvas():
+    canvas = Image.new('RGB', (2, 2), 'white')
+    ImageLayer({})._composite(canvas, Image.new('RGBA', (2, 2), (0, 0, 0, 128)), (0, 0))
+    assert canvas.getpixel((0, 0)) == (127, 127, 127)
+
+    canvas = Image.new('RGB', (2, 2), 'white')
+    ImageLayer({'opacity': 0.5})._composite(canvas, Image.new('RGB', (2, 2), (0, 0, 0)), (0, 0))
+    assert canvas.getpixel((0, 0)) == (127, 127, 127)
+
+    canvas = Image.new('RGB', (2, 2), 'white')
+    ImageLayer({'opacity': 0})._composite(canvas, Image.new('RGB', (2, 2), (0, 0, 0)), (0, 0))
+    assert canvas.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_blend_mode_uses_the_canvas_below():
+    canvas = Image.new('RGB', (2, 2), (200, 100, 50))
+
+    ImageLayer({'blend': 'multiply'})._composite(canvas, Image.new('RGB', (2, 2), (128, 128, 128)), (0, 0))
+
+    assert canvas.getpixel((0, 0)) == (100, 50, 25)
+
+
+def test_transparent_product_image_renders_over_the_canvas(assets):
+    assets['https://cdn.test/cutout.png'] = png(Image.new('RGBA', (10, 10), (0, 0, 255, 0)))
+    template = {
+        'canvas': {'w': 20, 'h': 20},
+        'layers': [{'type': 'image', 'key': 'product.image', 'x': 5, 'y': 5, 'w': 10, 'h': 10}],
+    }
+
+    rendered = Image.open(BytesIO(PosterRenderer().render(template, {'product': {'image': 'https://cdn.test/cutout.png'}})))
+
+    # Fully transparent pixels leave the white canvas showing
+    assert rendered.convert('RGB').getpixel((10, 10)) == (255, 255, 255)
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from rq import Queue
+from app.workers.fair import FairScheduler, fair_callbacks, tenant_cap
+from app.workers.lanes import BULK
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from conftest import run_jobs
+
+
+def held_jobs(user_id, count):
+    return [
+        QueueManager.create_job(
+            'time.time',
+            queue_name=BULK,
+            meta={'fair': {'lane': BULK, 'user_id': user_id}},
+            **fair_callbacks()
+        )
+        for _ in range(count)
+    ]
+
+
+def lane():
+    return Queue(BULK, connection=QueueManager.get_redis_connection(), serializer=JobSerializer)
+
+
+def take_all(queue):
+    """What a worker would pop next, in order (the lane is emptied)"""
+    taken = []
+    while True:
+        job_id = queue.connection.lpop(queue.key)
+        if job_id is None:
+            return taken
+        taken.append(job_id.decode())
+
+
+def test_small_tenant_is_not_stuck_behind_a_large_one(app):
+    scheduler = FairScheduler(QueueManager.get_redis_connection(), BULK)
+    scheduler.configure(depth=2, quantum=3)
+
+    big = held_jobs(1, 6)
+    small = held_jobs(2, 1)
+    scheduler.submit(1, big, costs=[3] * 6, cap=2)
+    scheduler.submit(2, small, costs=[3], cap=2)
+
+    # The big tenant filled the lane first; the small one waits for room
+    assert take_all(lane()) == [big[0].id, big[1].id]
+    assert scheduler.pending_count() == 5
+
+    scheduler.release(big[0].id, 1)
+
+    # Its next turn goes to the small tenant too, not only to the big one
+    assert set(take_all(lane())) == {big[2].id, small[0].id}
+
+
+def test_tenant_cap_limits_dispatched_chunks(app):
+    scheduler = FairScheduler(QueueManager.get_redis_connection(), BULK)
+    scheduler.configure(depth=4, quantum=3)
+
+    jobs = held_jobs(1, 3)
+    scheduler.submit(1, jobs, costs=[3] * 3, cap=1)
+
+    assert take_all(lane()) == [jobs[0].id]
+    assert scheduler.pending_count() == 2
+
+    scheduler.release(jobs[0].id, 1)
+    assert take_all(lane()) == [jobs[1].id]
+
+
+def test_costly_chunk_waits_for_enough_credit(app):
+    scheduler = FairScheduler(QueueManager.get_redis_connection(), BULK)
+    scheduler.configure(depth=4, quantum=2)
+
+    # A full lane holds both submissions back
+    blockers = [lane().enqueue('time.time') for _ in range(4)]
+    costly = held_jobs(1, 1)
+    cheap = held_jobs(2, 2)
+    scheduler.submit(1, costly, costs=[5], cap=4)
+    scheduler.submit(2, cheap, costs=[1, 1], cap=4)
+    assert take_all(lane()) == [job.id for job in blockers]
+
+    scheduler.dispatch()
+
+    # Tenant 1 saves up credit over three turns while tenant 2 is served
+    assert take_all(lane()) == [cheap[0].id, cheap[1].id, costly[0].id]
+
+
+def test_finished_chunks_release_their_slot(app):
+    scheduler = FairScheduler(QueueManager.get_redis_connection(), BULK)
+    scheduler.configure(depth=1, quantum=3)
+
+    jobs = held_jobs(1, 3)
+    scheduler.submit(1, jobs, costs=[3] * 3, cap=1)
+    run_jobs(BULK)
+
+    assert all(QueueManager.get_job(job.id).get_status() == 'finished' for job in jobs)
+    assert scheduler.pending_count() == 0
+
+
+def test_plan_can_set_its_own_cap():
+    assert tenant_cap(None, 2) == 2
+    assert tenant_cap(SimpleNamespace(features={'max_concurrent_chunks': 5}), 2) == 5
+    assert tenant_cap(SimpleNamespace(features={'max_concurrent_chunks': 0}), 2) == 1
@@ -0,0 +1,56 @@
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import QuotaLedger
+from conftest import auth_headers
+
+
+def generate(client, user, body, key=None):
+    headers = auth_headers(user)
+    if key is not None:
+        headers['Idempotency-Key'] = key
+    return client.post('/api/posters/generate', json=body, headers=headers)
+
+
+def test_same_key_returns_the_original_job(client, user, template, products):
+    body = {'template_id': template.id, 'product_ids': [products[0].id, products[1].id]}
+
+    first = generate(client, user, body, key='order-42')
+    retry = generate(client, user, body, key='order-42')
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.get_json()['data']['job_id'] == first.get_json()['data']['job_id']
+    assert retry.get_json()['data']['deduplicated'] is True
+    # Reserved once
+    assert QuotaLedger(QueueManager.get_redis_connection()).usage(user)['reserved'] == 2
+
+
+def test_key_reused_for_another_request_is_refused(client, user, template, products):
+    generate(client, user, {'template_id': template.id, 'product_ids': [products[0].id]}, key='order-42')
+
+    response = generate(client, user, {'template_id': template.id, 'product_ids': [products[1].id]}, key='order-42')
+
+    assert response.status_code == 400
+    assert 'different request' in response.get_json()['error']
+
+
+def test_identical_requests_are_folded_within_the_window(app, client, user, template, products):
+    body = {'template_id': template.id, 'product_ids': [products[1].id, products[0].id]}
+    reordered = {'template_id': template.id, 'product_ids': [products[0].id, products[1].id]}
+
+    first = generate(client, user, body).get_json()['data']['job_id']
+    assert generate(client, user, reordered).get_json()['data']['job_id'] == first
+
+    app.config['GENERATION_DEDUP_WINDOW'] = 0
+    assert generate(client, user, body).get_json()['data']['job_id'] != first
+
+
+def test_refused_request_does_not_keep_its_key(client, user, template, products):
+    user.plan.monthly_generations = 1
+    body = {'template_id': template.id, 'product_ids': [products[0].id, products[1].id]}
+
+    refused = generate(client, user, body, key='order-42')
+    assert refused.status_code == 400
+    assert 'limit exceeded' in refused.get_json()['error']
+
+    user.plan.monthly_generations = 2
+    assert generate(client, user, body, key='order-42').status_code == 201
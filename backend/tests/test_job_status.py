@@ -0,0 +1,48 @@
+from app.workers.batch_job import enqueue_batch_posters
+from conftest import auth_headers, make_user, run_jobs
+
+LANE = 'poster-generation'
+
+
+def test_bulk_status_reports_own_jobs(client, user, template, products):
+    done = enqueue_batch_posters(template.id, [products[0].id], user.id, queue_name=LANE)
+    run_jobs(LANE)
+    waiting = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+
+    response = client.get(f'/api/posters/jobs/status?ids={done},{waiting},nope', headers=auth_headers(user))
+
+    statuses = response.get_json()['data']
+    assert statuses[done] == {'status': 'completed'}
+    assert statuses[waiting]['status'] == 'pending'
+    assert statuses[waiting]['chunks']['total'] == 2
+    assert statuses['nope'] == {'status': 'not_found'}
+
+
+def test_bulk_status_hides_other_users_jobs(client, plan, user, template, products):
+    job_id = enqueue_batch_posters(template.id, [products[0].id], user.id, queue_name=LANE)
+    run_jobs(LANE)
+    intruder = make_user(plan, 'intruder@postraft.test')
+
+    response = client.get(f'/api/posters/jobs/status?ids={job_id}', headers=auth_headers(intruder))
+
+    assert response.get_json()['data'] == {job_id: {'status': 'not_found'}}
+
+
+def test_single_status_hides_other_users_jobs(client, plan, user, template, products):
+    job_id = enqueue_batch_posters(template.id, [products[0].id], user.id, queue_name=LANE)
+    run_jobs(LANE)
+    intruder = make_user(plan, 'intruder@postraft.test')
+
+    own = client.get(f'/api/posters/job/{job_id}', headers=auth_headers(user)).get_json()['data']
+    other = client.get(f'/api/posters/job/{job_id}', headers=auth_headers(intruder)).get_json()['data']
+
+    assert own['status'] == 'completed' and own['result']['successful'] == 1
+    assert other['status'] == 'not_found' and 'result' not in other
+
+
+def test_bulk_status_limits_ids(app, client, user):
+    app.config['JOB_STATUS_BATCH_MAX'] = 2
+
+    response = client.get('/api/posters/jobs/status?ids=a,b,c', headers=auth_headers(user))
+
+    assert response.status_code == 400
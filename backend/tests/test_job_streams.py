@@ -0,0 +1,103 @@
+from app.core.posters.generation_service import PosterGenerationService
+from app.core.posters.job_streams import JobStreamService
+from app.workers.batch_job import enqueue_batch_posters
+from conftest import auth_headers, make_user, run_jobs
+from werkzeug.test import EnvironBuilder
+import json
+import pytest
+
+LANE = 'poster-generation'
+
+
+@pytest.fixture
+def finished_job(user, template, products):
+    job_id = enqueue_batch_posters(template.id, [products[0].id], user.id, queue_name=LANE)
+    run_jobs(LANE)
+    return job_id
+
+
+def stream_token(client, user, job_id):
+    response = client.post(f'/api/posters/job/{job_id}/stream-token', headers=auth_headers(user))
+    assert response.status_code == 200
+    return response.get_json()['data']['token']
+
+
+def test_stream_with_token_sends_final_status(client, user, finished_job):
+    token = stream_token(client, user, finished_job)
+
+    response = client.get(f'/api/posters/job/{finished_job}/events?token={token}')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    event = response.get_data(as_text=True).strip().split('\n')
+    assert event[0] == 'event: status'
+    assert json.loads(event[1][len('data: '):])['status'] == 'completed'
+
+
+def test_stream_token_is_single_use(client, user, finished_job):
+    token = stream_token(client, user, finished_job)
+    client.get(f'/api/posters/job/{finished_job}/events?token={token}').get_data()
+
+    assert client.get(f'/api/posters/job/{finished_job}/events?token={token}').status_code == 401
+
+
+def test_stream_token_is_bound_to_its_job(client, user, template, products, finished_job):
+    other_job = enqueue_batch_posters(template.id, [products[1].id], user.id, queue_name=LANE)
+    token = stream_token(client, user, finished_job)
+
+    assert client.get(f'/api/posters/job/{other_job}/events?token={token}').status_code == 401
+
+
+def test_jwt_in_query_string_is_refused(client, user, finished_job):
+    jwt = auth_headers(user)['Authorization'].split()[1]
+
+    assert client.get(f'/api/posters/job/{finished_job}/events?jwt={jwt}').status_code == 401
+
+
+def test_other_users_job_cannot_be_streamed(client, plan, finished_job):
+    intruder = make_user(plan, 'intruder@postraft.test')
+
+    token_response = client.post(f'/api/posters/job/{finished_job}/stream-token', headers=auth_headers(intruder))
+    stream_response = client.get(f'/api/posters/job/{finished_job}/events', headers=auth_headers(intruder))
+
+    assert token_response.status_code == 404
+    assert stream_response.status_code == 404
+
+
+def test_open_streams_are_capped_per_user(app, client, user, finished_job):
+    app.config['JOB_STREAM_MAX_PER_USER'] = 1
+
+    _, slot = PosterGenerationService.stream_job_status(user, finished_job)
+    try:
+        response = client.get(f'/api/posters/job/{finished_job}/events', headers=auth_headers(user))
+        assert response.status_code == 429
+    finally:
+        JobStreamService.close_stream(slot)
+
+    # Ending the first stream gave its slot back
+    response = client.get(f'/api/posters/job/{finished_job}/events', headers=auth_headers(user))
+    assert response.status_code == 200
+
+
+def test_slot_is_given_back_when_the_client_leaves_before_the_first_event(app, client, user, finished_job):
+    app.config['JOB_STREAM_MAX_PER_USER'] = 1
+
+    # The server closes the response without sending a single event
+    environ = EnvironBuilder(path=f'/api/posters/job/{finished_job}/events', headers=auth_headers(user)).get_environ()
+    app(environ, lambda status, headers: None).close()
+
+    response = client.get(f'/api/posters/job/{finished_job}/events', headers=auth_headers(user))
+    assert response.status_code == 200
+
+
+def test_open_streams_are_capped_in_total(app, plan, user):
+    app.config['JOB_STREAM_MAX_OPEN'] = 2
+    other = make_user(plan, 'other@postraft.test')
+
+    slots = [JobStreamService.open_stream(user.id), JobStreamService.open_stream(other.id)]
+
+    with pytest.raises(ValueError):
+        JobStreamService.open_stream(other.id)
+
+    JobStreamService.close_stream(slots[0])
+    JobStreamService.open_stream(other.id)
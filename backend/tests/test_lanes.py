@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+from rq import Queue, SimpleWorker
+from app.workers.lanes import (
+    BULK, BULK_PRIORITY, INTERACTIVE, INTERACTIVE_PRIORITY, LEGACY, WeightedLanesMixin, affinity_lane,
+    affinity_order, base_lane, interactive_lane, is_priority_plan, parse_lane_weights, queue_slot,
+    select_lane, weighted_order, with_affinity_queues
+)
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+
+
+class AffinityWorker(WeightedLanesMixin, SimpleWorker):
+    pass
+
+
+def fake_queues(names):
+    return [SimpleNamespace(name=name) for name in names]
+
+
+def names(queues):
+    return [queue.name for queue in queues]
+
+
+def user_on(price=0, features=None):
+    return SimpleNamespace(plan=SimpleNamespace(price=price, features=features or {}))
+
+
+def test_lane_follows_plan_tier_and_request_size():
+    assert select_lane(user_on(), 1) == INTERACTIVE
+    assert select_lane(user_on(), 2) == BULK
+    assert select_lane(user_on(price=9), 1) == INTERACTIVE_PRIORITY
+    assert select_lane(user_on(price=9), 50, interactive_max=10) == BULK_PRIORITY
+
+
+def test_plan_feature_overrides_priority():
+    assert is_priority_plan(None) is False
+    assert is_priority_plan(user_on(price=9, features={'priority_generation': False}).plan) is False
+    assert is_priority_plan(user_on(features={'priority_generation': True}).plan) is True
+
+
+def test_follow_up_jobs_use_the_interactive_lane_of_the_tier():
+    assert interactive_lane(BULK_PRIORITY) == INTERACTIVE_PRIORITY
+    assert interactive_lane(BULK) == INTERACTIVE
+    assert interactive_lane(LEGACY) == LEGACY
+
+
+def test_weighted_order_favours_heavy_lanes_without_dropping_any():
+    weights = parse_lane_weights(f'{INTERACTIVE_PRIORITY}:8, {BULK}:1, broken')
+    queues = fake_queues([BULK, INTERACTIVE_PRIORITY])
+
+    firsts = [names(weighted_order(queues, weights))[0] for _ in range(500)]
+
+    assert weights == {INTERACTIVE_PRIORITY: 8.0, BULK: 1.0}
+    # 8:1 odds of going first (about 89%)
+    assert 0.8 < firsts.count(INTERACTIVE_PRIORITY) / len(firsts) < 0.97
+    assert all(sorted(names(weighted_order(queues, weights))) == sorted(names(queues)) for _ in range(20))
+
+
+def test_affinity_lane_is_stable_and_within_the_slots():
+    lane = affinity_lane(BULK, 7, 3, slots=4)
+
+    assert lane == affinity_lane(BULK, 7, 3, slots=4)
+    assert base_lane(lane) == BULK
+    assert 0 <= queue_slot(lane) < 4
+    assert affinity_lane(BULK, 7, 3, slots=0) == BULK
+
+
+def test_affinity_order_keeps_lanes_in_order():
+    queues = fake_queues(with_affinity_queues([INTERACTIVE, BULK], 3))
+
+    ordered = names(affinity_order(queues, None, slot=1))
+
+    assert ordered[:2] == [f'{INTERACTIVE}@1', INTERACTIVE]
+    assert set(ordered[2:4]) == {f'{INTERACTIVE}@0', f'{INTERACTIVE}@2'}
+    assert ordered[4:6] == [f'{BULK}@1', BULK]
+    assert set(ordered[6:]) == {f'{BULK}@0', f'{BULK}@2'}
+
+
+def test_weighted_affinity_order_groups_each_lane():
+    weights = parse_lane_weights(f'{INTERACTIVE}:8,{BULK}:1')
+    queues = fake_queues(with_affinity_queues([INTERACTIVE, BULK], 3))
+
+    for _ in range(50):
+        ordered = names(affinity_order(queues, weights, slot=2))
+        lanes = [base_lane(name) for name in ordered]
+
+        # Each lane's queues stay together, own slot first
+        assert lanes in ([INTERACTIVE] * 4 + [BULK] * 4, [BULK] * 4 + [INTERACTIVE] * 4)
+        assert ordered[0] in (f'{INTERACTIVE}@2', f'{BULK}@2')
+        assert ordered[4] in (f'{INTERACTIVE}@2', f'{BULK}@2')
+
+
+def test_other_workers_interactive_job_goes_before_own_bulk_job(app):
+    connection = QueueManager.get_redis_connection()
+    queue_names = with_affinity_queues([INTERACTIVE, BULK], 2)
+
+    bulk = Queue(f'{BULK}@0', connection=connection, serializer=JobSerializer).enqueue('time.time')
+    interactive = Queue(f'{INTERACTIVE}@1', connection=connection, serializer=JobSerializer).enqueue('time.time')
+
+    worker = AffinityWorker(queue_names, connection=connection, serializer=JobSerializer)
+    worker.affinity_slot = 0
+    worker.work(burst=True, max_jobs=1)
+
+    assert interactive.get_status() == 'finished'
+    assert bulk.get_status() == 'queued'
@@ -0,0 +1,52 @@
+from app.extensions import db
+from app.models import Poster
+from app.workers.batch_job import enqueue_payload_posters
+from app.workers.queue_manager import QueueManager
+from app.workers.render_job import RESULTS_QUEUE
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def test_single_payload_job_is_ingesting_until_posters_are_saved(app, user, template, products):
+    job_id = enqueue_payload_posters(template, products[:2], user.id, queue_name=LANE)
+
+    run_jobs(LANE)
+    assert QueueManager.get_job_status(job_id)['status'] == 'ingesting'
+    assert QueueManager.get_jobs_status([job_id])[job_id]['status'] == 'ingesting'
+
+    run_jobs(RESULTS_QUEUE)
+    status = QueueManager.get_job_status(job_id)
+    assert status['status'] == 'completed'
+
+    saved = {poster.product_id: poster.id for poster in Poster.query.filter_by(job_id=job_id)}
+    assert {entry['product_id']: entry['poster_id'] for entry in status['result']['results']} == saved
+
+
+def test_chunked_payload_batch_waits_for_every_ingest(app, user, template, products):
+    job_id = enqueue_payload_posters(template, products, user.id, queue_name=LANE)
+
+    # Chunks and the merge have run, the ingest jobs have not
+    run_jobs(LANE)
+    assert QueueManager.get_job_status(job_id)['status'] == 'ingesting'
+
+    run_jobs(RESULTS_QUEUE)
+    result = QueueManager.get_job_status(job_id)['result']
+    assert result['successful'] == 5
+    assert all(entry['poster_id'] for entry in result['results'])
+    assert Poster.query.filter_by(job_id=job_id).count() == 5
+
+
+def test_product_deleted_before_ingest_is_skipped(app, user, template, products):
+    job_id = enqueue_payload_posters(template, products[:3], user.id, queue_name=LANE)
+    deleted = products[1].id
+
+    run_jobs(LANE)
+    db.session.delete(products[1])
+    db.session.commit()
+    run_jobs(RESULTS_QUEUE)
+
+    result = QueueManager.get_job_status(job_id)['result']
+    assert result['successful'] == 2
+    assert result['errors'] == [{'product_id': deleted, 'error': f'Product {deleted} not found', 'skipped': True}]
+    assert Poster.query.filter_by(job_id=job_id).count() == 2
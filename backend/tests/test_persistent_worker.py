@@ -0,0 +1,43 @@
+from rq import Queue
+from app.workers import persistent
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.persistent import PersistentWorker, current_rss_mb
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from renderer import engine
+
+LANE = 'poster-generation'
+
+
+def worker_for(*queue_names):
+    connection = QueueManager.get_redis_connection()
+    return PersistentWorker(list(queue_names), connection=connection, serializer=JobSerializer)
+
+
+def test_jobs_run_in_process_and_keep_render_caches(app, user, template, products):
+    engine._plan_cache.clear()
+    first = enqueue_batch_posters(template.id, [products[0].id], user.id, queue_name=LANE)
+    second = enqueue_batch_posters(template.id, [products[1].id], user.id, queue_name=LANE)
+
+    worker_for(LANE).work(burst=True)
+
+    assert QueueManager.get_job_status(first)['status'] == 'completed'
+    assert QueueManager.get_job_status(second)['status'] == 'completed'
+    # Compiled here, in this process, and still there for the next job
+    assert template.cache_key in engine._plan_cache
+
+
+def test_worker_stops_once_past_its_memory_limit(app, monkeypatch):
+    queue = Queue('default', connection=QueueManager.get_redis_connection(), serializer=JobSerializer)
+    jobs = [queue.enqueue('time.time') for _ in range(2)]
+    monkeypatch.setattr(persistent, 'current_rss_mb', lambda: 2048.0)
+
+    worker = worker_for('default')
+    worker.max_memory_mb = 1024
+    worker.work(burst=True)
+
+    assert [job.get_status() for job in jobs] == ['finished', 'queued']
+
+
+def test_rss_is_measured():
+    assert current_rss_mb() > 0
@@ -0,0 +1,119 @@
+from app.workers import render_job
+from app.workers.pipeline import ProductNotFound, run_render_pipeline
+from renderer.engine import PosterRenderer
+import pytest
+
+
+def items_for(products):
+    return [
+        (product.id, product.name, render_job.build_data_context(product))
+        for product in products
+    ]
+
+
+@pytest.mark.parametrize('upload_workers', [0, 3])
+def test_results_come_back_in_product_order(app, template, products, upload_workers):
+    reported = []
+
+    run_render_pipeline(
+        app, PosterRenderer(), template, items_for(products),
+        lambda product_id, name, image_url, error: reported.append((product_id, image_url, error)),
+        upload_workers=upload_workers,
+        depth=2
+    )
+
+    assert [product_id for product_id, _, _ in reported] == [product.id for product in products]
+    assert all(image_url and error is None for _, image_url, error in reported)
+
+
+@pytest.mark.parametrize('upload_workers', [0, 2])
+def test_missing_product_is_reported_as_not_found(app, template, products, upload_workers):
+    items = items_for(products[:2]) + [(999, None, None)]
+    reported = {}
+
+    run_render_pipeline(
+        app, PosterRenderer(), template, items,
+        lambda product_id, name, image_url, error: reported.setdefault(product_id, error),
+        upload_workers=upload_workers
+    )
+
+    assert isinstance(reported[999], ProductNotFound)
+    assert reported[products[0].id] is None
+
+
+@pytest.mark.parametrize('upload_workers', [0, 2])
+def test_upload_error_is_reported_per_item(app, template, products, monkeypatch, upload_workers):
+    def flaky_upload(image_file, folder='posters'):
+        if image_file.name.startswith(f'poster_{products[1].id}_'):
+            raise ConnectionError('storage unavailable')
+        return f'https://cdn.test/{image_file.name}'
+
+    monkeypatch.setattr(render_job, 'upload_image', flaky_upload)
+    reported = {}
+
+    run_render_pipeline(
+        app, PosterRenderer(), template, items_for(products[:3]),
+        lambda product_id, name, image_url, error: reported.setdefault(product_id, error),
+        upload_workers=upload_workers
+    )
+
+    assert isinstance(reported[products[1].id], ConnectionError)
+    assert reported[products[0].id] is None and reported[products[2].id] is None
+
+
+@pytest.mark.parametrize('upload_workers', [0, 2])
+def test_should_stop_ends_the_batch_early(app, template, products, upload_workers):
+    reported = []
+
+    run_render_pipeline(
+        app, PosterRenderer(), template, items_for(products),
+        lambda product_id, name, image_url, error: reported.append(product_id),
+        upload_workers=upload_workers,
+        depth=1,
+        should_stop=lambda: len(reported) >= 2
+    )
+
+    assert reported == [product.id for product in products[:2]]
+
+
+@pytest.mark.parametrize('upload_workers', [0, 2])
+def test_items_are_pulled_as_rendering_gets_to_them(app, template, products, upload_workers):
+    pulled = []
+    reported = []
+
+    items = items_for(products) * 4
+
+    def lazy_items():
+        for item in items:
+            pulled.append(item[0])
+            yield item
+
+    run_render_pipeline(
+        app, PosterRenderer(), template, lazy_items(),
+        lambda product_id, name, image_url, error: reported.append(product_id),
+        upload_workers=upload_workers,
+        depth=1,
+        should_stop=lambda: len(reported) >= 1
+    )
+
+    # Stopped early, without building every context first
+    assert len(pulled) <= 5
+
+
+def test_batch_streams_campaign_contexts_across_flushes(app, user, template, products):
+    from app.extensions import db
+    from app.models import Campaign, Poster
+    from app.workers.batch_job import enqueue_batch_posters
+    from conftest import run_jobs
+
+    app.config['PIPELINE_UPLOAD_WORKERS'] = 2
+    campaign = Campaign(user_id=user.id, name='Sale', rules={'discount': 50})
+    db.session.add(campaign)
+    db.session.commit()
+
+    # Flushes (and commits) every 2 posters while contexts are still being built
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products[:3]], user.id,
+                                   campaign_id=campaign.id, queue_name='poster-generation')
+    run_jobs('poster-generation')
+
+    assert Poster.query.filter_by(job_id=job_id, status='generated', campaign_id=campaign.id).count() == 3
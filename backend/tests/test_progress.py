@@ -0,0 +1,75 @@
+import json
+from rq import Queue
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.events import job_channel
+from app.workers.progress import BatchProgress
+from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+
+def saved_progress(job):
+    job.refresh()
+    return job.meta.get('progress')
+
+
+def make_job():
+    queue = Queue('default', connection=QueueManager.get_redis_connection(), serializer=JobSerializer)
+    return queue.enqueue('time.time')
+
+
+def test_progress_writes_are_throttled(app):
+    job = make_job()
+    progress = BatchProgress(total=3, job=job, min_interval=60)
+
+    progress.start_item(1)
+    progress.finish_item(success=True)
+    assert saved_progress(job)['completed'] == 1
+
+    progress.start_item(2)
+    progress.finish_item(success=False)
+    # Within min_interval: not written yet
+    assert saved_progress(job)['failed'] == 0
+
+    progress.flush(force=True)
+    assert saved_progress(job) == {
+        'total': 3, 'completed': 1, 'failed': 1, 'current': 2,
+        'avg_duration': progress.to_dict()['avg_duration'],
+        'eta_seconds': progress.eta_seconds,
+    }
+
+
+def test_eta_follows_pipeline_throughput(app):
+    progress = BatchProgress(total=4, job=make_job(), min_interval=0)
+
+    progress.complete_item(10)
+    progress.complete_item(11)
+
+    assert progress.remaining == 2
+    assert progress.current == 11
+    assert progress.eta_seconds == round(progress.avg_duration * 2, 1)
+
+
+def test_each_write_notifies_status_watchers(app):
+    connection = QueueManager.get_redis_connection()
+    job = make_job()
+    pubsub = connection.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(job_channel(job.id))
+
+    BatchProgress(total=1, job=job, min_interval=0).flush()
+
+    # The first read only consumes the subscription confirmation
+    messages = [pubsub.get_message(timeout=0.1) for _ in range(2)]
+    assert [json.loads(message['data'])['event'] for message in messages if message] == ['progress']
+    pubsub.close()
+
+
+def test_finished_batch_reports_full_progress(app, user, template, products):
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products[:3]], user.id, queue_name=LANE)
+    run_jobs(LANE)
+
+    progress = saved_progress(QueueManager.get_job(job_id))
+    assert (progress['total'], progress['completed'], progress['failed']) == (3, 3, 0)
+    assert progress['current'] is None
@@ -0,0 +1,76 @@
+from app.extensions import db
+from app.models import User
+from app.workers.queue_manager import QueueManager
+from app.workers.quota import HOLDS_KEY, QuotaLedger, current_period, period_start, sync_quota_usage
+
+PERIOD = '2026-10'
+
+
+def ledger():
+    return QuotaLedger(QueueManager.get_redis_connection())
+
+
+def test_reserve_refuses_what_the_plan_does_not_allow(app, user):
+    quota = ledger()
+
+    assert quota.reserve(user, 60, 'job-1', PERIOD) == (True, 40)
+    assert quota.reserve(user, 50, 'job-2', PERIOD) == (False, 40)
+    assert quota.reserve(user, 40, 'job-3', PERIOD) == (True, 0)
+    assert quota.usage(user, PERIOD) == {'used': 0, 'reserved': 100}
+
+
+def test_commit_takes_from_the_hold_and_release_frees_the_rest(app, user):
+    quota = ledger()
+    quota.reserve(user, 5, 'job-1', PERIOD)
+
+    quota.commit(user.id, 3, PERIOD, 'job-1')
+    assert quota.usage(user, PERIOD) == {'used': 3, 'reserved': 2}
+
+    assert quota.release(user.id, PERIOD, 'job-1') == 2
+    assert quota.usage(user, PERIOD) == {'used': 3, 'reserved': 0}
+    assert QueueManager.get_redis_connection().zcard(HOLDS_KEY) == 0
+    # Nothing left to release twice
+    assert quota.release(user.id, PERIOD, 'job-1') == 0
+
+
+def test_split_hold_is_settled_per_chunk(app, user):
+    quota = ledger()
+    quota.reserve(user, 5, 'batch', PERIOD)
+    quota.split(user.id, PERIOD, 'batch', {'chunk-1': 2, 'chunk-2': 3})
+
+    quota.commit(user.id, 2, PERIOD, 'chunk-1')
+    quota.commit(user.id, 1, PERIOD, 'chunk-2')
+    quota.release(user.id, PERIOD, 'chunk-2')
+
+    assert quota.usage(user, PERIOD) == {'used': 3, 'reserved': 0}
+    assert quota.remaining(user, PERIOD) == 97
+
+
+def test_usage_is_seeded_from_the_database_for_the_same_month(app, user):
+    user.monthly_generations = 30
+    user.last_reset = period_start(PERIOD)
+    db.session.commit()
+
+    assert ledger().usage(user, PERIOD)['used'] == 30
+    # A later month starts from zero
+    assert ledger().usage(user, '2026-11')['used'] == 0
+
+
+def test_stale_hold_without_a_job_is_released(app, user):
+    quota = ledger()
+    quota.reserve(user, 5, 'lost-job', PERIOD)
+
+    assert quota.release_stale(grace=0) == 1
+    assert quota.usage(user, PERIOD)['reserved'] == 0
+
+
+def test_sync_writes_usage_back_to_the_database(app, user):
+    period = current_period()
+    ledger().commit(user.id, 4, period)
+
+    assert sync_quota_usage()['synced'] == 1
+
+    db.session.expire_all()
+    row = db.session.get(User, user.id)
+    assert row.monthly_generations == 4
+    assert row.last_reset == period_start(period)
@@ -0,0 +1,60 @@
+from PIL import Image
+from io import BytesIO
+from app.workers import warmup
+from renderer import engine
+from renderer.engine import PosterRenderer
+from conftest import TEMPLATE_DEFINITION
+
+
+def test_render_produces_canvas_sized_png():
+    image_bytes = PosterRenderer().render(TEMPLATE_DEFINITION, {'product': {'name': 'Rice', 'price': 4.5}})
+
+    assert Image.open(BytesIO(image_bytes)).size == (60, 60)
+
+
+def test_plan_cache_reuses_compiled_plan():
+    engine._plan_cache.clear()
+    renderer = PosterRenderer()
+
+    first = renderer.compile(TEMPLATE_DEFINITION, cache_key='1:a')
+
+    assert renderer.compile(TEMPLATE_DEFINITION, cache_key='1:a') is first
+    assert renderer.compile(TEMPLATE_DEFINITION) is not first
+
+
+def test_plan_cache_is_bounded_lru(monkeypatch):
+    engine._plan_cache.clear()
+    monkeypatch.setattr(engine, 'PLAN_CACHE_SIZE', 3)
+    renderer = PosterRenderer()
+
+    for version in range(3):
+        renderer.compile(TEMPLATE_DEFINITION, cache_key=f'1:{version}')
+
+    # Touch the oldest, then push one more in
+    renderer.compile(TEMPLATE_DEFINITION, cache_key='1:0')
+    renderer.compile(TEMPLATE_DEFINITION, cache_key='1:3')
+
+    assert list(engine._plan_cache) == ['1:2', '1:0', '1:3']
+
+
+def test_warm_up_preloads_system_templates(app, template):
+    engine._plan_cache.clear()
+    cache_key = template.cache_key
+
+    summary = warmup.warm_up_worker(app)
+
+    assert summary['templates'] == 1
+    assert cache_key in engine._plan_cache
+
+
+def test_warm_up_starts_cold_when_database_fails(app, monkeypatch):
+    class BrokenQuery:
+        def filter_by(self, **kwargs):
+            raise RuntimeError('database is unreachable')
+
+    with app.app_context():
+        monkeypatch.setattr(warmup.Template, 'query', BrokenQuery())
+
+        summary = warmup.warm_up_worker(app)
+
+    assert summary['templates'] == 0
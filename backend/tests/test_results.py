@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+import pickle
+import pytest
+from app.extensions import db
+from app.models import JobResult
+from app.workers.batch_job import enqueue_batch_posters
+from app.workers.queue_manager import QueueManager
+from app.workers.results import (
+    IN_DATABASE, expand_result, pack_detail, purge_job_results, store_job_result, unpack_detail
+)
+from app.workers.serialization import JobSerializer
+from conftest import run_jobs
+
+LANE = 'poster-generation'
+
+RESULT = {
+    'total': 2,
+    'successful': 1,
+    'failed': 1,
+    'results': [{'product_id': 1, 'poster_id': 10, 'image_url': 'https://cdn.test/posters/1.png'}],
+    'errors': [{'product_id': 2, 'error': 'boom'}],
+    'cancelled': [],
+}
+
+
+def test_serializer_round_trip():
+    value = {'blob': b'\x00\x01payload', 'ids': (1, 2), 'tags': {'a'}, 'nested': {'x': [1.5, None]}}
+
+    restored = JobSerializer.loads(JobSerializer.dumps(value))
+
+    assert restored == {'blob': b'\x00\x01payload', 'ids': [1, 2], 'tags': ['a'], 'nested': {'x': [1.5, None]}}
+
+
+def test_serializer_reads_pickled_data_and_refuses_objects():
+    assert JobSerializer.loads(pickle.dumps({'legacy': True})) == {'legacy': True}
+
+    with pytest.raises(TypeError, match='not job-serializable'):
+        JobSerializer.dumps({'when': datetime.utcnow()})
+
+
+def test_detail_round_trip_through_the_database(app, user):
+    assert unpack_detail(pack_detail(RESULT)) == {key: RESULT[key] for key in ('results', 'errors', 'cancelled')}
+
+    summary = store_job_result('job-1', user.id, RESULT)
+    assert summary['detail'] == IN_DATABASE
+    assert 'results' not in summary
+
+    assert expand_result('job-1', summary) == RESULT
+
+
+def test_purged_rows_come_back_empty(app, user):
+    app.config['JOB_RESULT_TTL'] = 60
+    summary = store_job_result('job-1', user.id, RESULT)
+    store_job_result('job-2', user.id, RESULT)
+    db.session.get(JobResult, 'job-1').created_at = datetime.utcnow() - timedelta(seconds=120)
+    db.session.commit()
+
+    assert purge_job_results() == 1
+
+    expanded = expand_result('job-1', summary)
+    assert expanded['detail_expired'] is True
+    assert expanded['results'] == [] and expanded['total'] == 2
+
+
+def test_chunk_rows_wait_for_their_batch_to_be_merged(app, user, template, products):
+    app.config['JOB_RESULT_TTL'] = 60
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+
+    # Both chunks ran long ago; the batch is still waiting for its merge
+    run_jobs(LANE, max_jobs=2)
+    for row in JobResult.query.all():
+        row.created_at = datetime.utcnow() - timedelta(seconds=120)
+    db.session.commit()
+
+    assert purge_job_results() == 0
+
+    run_jobs(LANE)
+    assert QueueManager.get_job_status(job_id)['result']['successful'] == 5
+
+
+def test_orphaned_chunk_rows_go_with_their_merged_batch(app, user):
+    app.config['JOB_RESULT_TTL'] = 60
+    old = datetime.utcnow() - timedelta(seconds=120)
+    store_job_result('chunk-1', user.id, RESULT, batch_id='batch-1')
+    store_job_result('batch-1', user.id, RESULT)
+    for row in JobResult.query.all():
+        row.created_at = old
+    db.session.commit()
+
+    assert purge_job_results() == 2
+    assert JobResult.query.count() == 0
+
+
+def test_jobs_keep_their_result_as_long_as_its_rows(app, user, template, products):
+    app.config['JOB_RESULT_TTL'] = 1234
+
+    job_id = enqueue_batch_posters(template.id, [product.id for product in products], user.id, queue_name=LANE)
+    job = QueueManager.get_job(job_id)
+
+    assert job.result_ttl == 1234
+    # Chunks are kept until the batch is merged
+    for child_id in job.meta['children']:
+        assert QueueManager.get_job(child_id).result_ttl == -1
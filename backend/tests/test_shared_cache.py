@@ -0,0 +1,103 @@
+from multiprocessing import shared_memory
+from PIL import Image
+from renderer.shared_cache import SharedImageCache, _open_segment, _unlink_segment
+import pytest
+import uuid
+
+
+@pytest.fixture
+def namespace():
+    namespace = f'pt-{uuid.uuid4().hex[:8]}'
+    yield namespace
+
+    SharedImageCache(namespace=namespace).clear()
+    shared_memory.SharedMemory(f'{namespace}-idx2').unlink()
+
+
+def test_image_round_trips_between_processes(namespace):
+    writer = SharedImageCache(namespace=namespace, max_bytes=10_000)
+    reader = SharedImageCache(namespace=namespace, max_bytes=10_000)
+
+    writer.put('logo', Image.new('RGBA', (10, 10), (1, 2, 3, 4)))
+    writer.release('logo')
+
+    image = reader.get('logo')
+    assert image.mode == 'RGBA'
+    assert image.getpixel((5, 5)) == (1, 2, 3, 4)
+    del image
+    reader.release('logo')
+
+
+def test_lru_entry_is_evicted_past_budget(namespace):
+    cache = SharedImageCache(namespace=namespace, max_bytes=800)
+
+    for key in ('a', 'b'):
+        cache.put(key, Image.new('RGB', (10, 10)))
+        cache.release(key)
+    cache.put('c', Image.new('RGB', (10, 10)))
+    cache.release('c')
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get('a') is None
+
+
+def test_other_processes_drop_evicted_segments(namespace):
+    reader = SharedImageCache(namespace=namespace, max_bytes=800)
+    writer = SharedImageCache(namespace=namespace, max_bytes=800)
+
+    writer.put('a', Image.new('RGB', (10, 10)))
+    writer.release('a')
+
+    image = reader.get('a')
+    del image
+    reader.release('a')
+    assert reader._attached
+
+    # Evicts 'a' (two 316-byte entries fit in 800)
+    for key in ('b', 'c'):
+        writer.put(key, Image.new('RGB', (10, 10)))
+        writer.release(key)
+
+    assert reader.get('missing') is None
+    assert SharedImageCache._digest('a') not in reader._attached
+
+
+def test_evicted_segment_in_use_is_dropped_once_released(namespace):
+    reader = SharedImageCache(namespace=namespace, max_bytes=900)
+    writer = SharedImageCache(namespace=namespace, max_bytes=900)
+
+    writer.put('a', Image.new('RGBA', (10, 10)))
+    writer.release('a')
+
+    # RGBA views share the segment's memory (RGB ones are copied by Pillow)
+    # Unpinned but still referenced, so eviction goes ahead under it
+    image = reader.get('a')
+    reader.release('a')
+    for key in ('b', 'c'):
+        writer.put(key, Image.new('RGBA', (10, 10)))
+        writer.release(key)
+
+    reader.get('missing')
+    assert SharedImageCache._digest('a') in reader._attached
+
+    del image
+    reader.get('missing')
+    assert SharedImageCache._digest('a') not in reader._attached
+
+
+def test_slot_whose_segment_is_gone_is_reused(namespace):
+    SharedImageCache(namespace=namespace, max_bytes=10_000).put('a', Image.new('RGB', (10, 10)))
+    cache = SharedImageCache(namespace=namespace, max_bytes=10_000)
+
+    # Unlinked behind the index's back (e.g. /dev/shm cleaned up)
+    segment = _open_segment(cache._segment_name(cache._digest('a')))
+    segment.close()
+    _unlink_segment(segment)
+
+    image = cache.put('a', Image.new('RGB', (10, 10), (9, 9, 9)))
+    assert image.getpixel((0, 0)) == (9, 9, 9)
+    del image
+    cache.release('a')
+
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == 316
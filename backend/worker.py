@@ -2,14 +2,30 @@
 RQ Worker Entry Point
 
 Run with: python worker.py
-Or with specific queues: python worker.py poster-generation default
+Or with specific queues: python worker.py poster-interactive poster-bulk default
+
+Generation lanes are consumed with weighted priority (LANE_WEIGHTS), so
+interactive single posters stay fast while bulk batches run.
+
+Set WORKER_MODE=persistent to run a pool of long-lived, non-forking
+workers that keep render caches between jobs (see app/workers/persistent.py),
+or WORKER_MODE=autoscale to grow and shrink that pool with queue length and
+wait time between AUTOSCALE_MIN_WORKERS and AUTOSCALE_MAX_WORKERS
+(see app/workers/autoscale.py).
 """
 
 import sys
 import os
-from rq import Worker, Queue, Connection
+from rq import Queue, Connection
 from app import create_app
 from app.workers.queue_manager import QueueManager
+from app.workers.serialization import JobSerializer
+from app.workers import render_job
+from app.workers.warmup import warm_up_worker
+from app.workers.persistent import run_pool
+from app.workers.autoscale import Autoscaler, run_autoscaled
+from app.workers.lanes import GENERATION_LANES, LEGACY, WeightedWorker, parse_lane_weights, with_affinity_queues
+from renderer import asset_cache
 
 
 def main():
@@ -18,25 +34,91 @@ def main():
     # Create Flask app for context
     app = create_app()
 
+    # Share this app with job functions instead of creating a second one
+    render_job.set_app(app)
+
+    # Decoded image cache, optionally shared by all workers on this host
+    asset_cache.configure(
+        shared=app.config['ASSET_CACHE_SHARED'],
+        max_mb=app.config['ASSET_CACHE_MAX_MB']
+    )
+
+    # Preload fonts, templates and codecs so forked work-horses inherit them
+    if app.config['WORKER_WARMUP']:
+        summary = warm_up_worker(app)
+        print(f"🔥 Warm-up done: {summary['templates']} templates "
+              f"in {summary['seconds']}s")
+
+    # Get queue names from command line or use defaults
+    queue_names = sys.argv[1:] if len(sys.argv) > 1 else [
+        *GENERATION_LANES, LEGACY, 'poster-results', 'default']
+
+    # Every worker also serves the per-worker affinity queues (its own
+    # first in pool modes), so no job waits on a particular process
+    if app.config['AFFINITY_ROUTING']:
+        queue_names = with_affinity_queues(queue_names, app.config['AFFINITY_SLOTS'])
+
+    lane_weights = parse_lane_weights(app.config['LANE_WEIGHTS'])
+
+    if app.config['WORKER_MODE'] == 'persistent':
+        size = app.config['WORKER_POOL_SIZE']
+
+        print(f"\n🔧 Starting {size} persistent RQ workers")
+        print(f"📋 Listening on queues: {', '.join(queue_names)}")
+        print(f"🔄 Press Ctrl+C to stop\n")
+
+        run_pool(
+            app,
+            queue_names,
+            size=size,
+            max_jobs=app.config['WORKER_MAX_JOBS'],
+            max_memory_mb=app.config['WORKER_MAX_MEMORY_MB'],
+            lane_weights=lane_weights
+        )
+        return
+
+    if app.config['WORKER_MODE'] == 'autoscale':
+        scaler = Autoscaler(
+            min_workers=app.config['AUTOSCALE_MIN_WORKERS'],
+            max_workers=app.config['AUTOSCALE_MAX_WORKERS'],
+            jobs_per_worker=app.config['AUTOSCALE_JOBS_PER_WORKER'],
+            max_queue_age=app.config['AUTOSCALE_MAX_QUEUE_AGE'],
+            scale_down_delay=app.config['AUTOSCALE_SCALE_DOWN_DELAY'],
+            cooldown=app.config['AUTOSCALE_COOLDOWN']
+        )
+
+        print(f"\n🔧 Starting autoscaled RQ workers "
+              f"({scaler.min_workers}-{scaler.max_workers} processes)")
+        print(f"📋 Listening on queues: {', '.join(queue_names)}")
+        print(f"🔄 Press Ctrl+C to stop\n")
+
+        run_autoscaled(
+            app,
+            queue_names,
+            scaler,
+            interval=app.config['AUTOSCALE_INTERVAL'],
+            max_jobs=app.config['WORKER_MAX_JOBS'],
+            max_memory_mb=app.config['WORKER_MAX_MEMORY_MB'],
+            lane_weights=lane_weights
+        )
+        return
+
     with app.app_context():
         # Get Redis connection
         redis_conn = QueueManager.get_redis_connection()
 
-        # Get queue names from command line or use defaults
-        queue_names = sys.argv[1:] if len(sys.argv) > 1 else [
-            'poster-generation', 'default']
-
         print(f"\n🔧 Starting RQ Worker")
         print(f"📋 Listening on queues: {', '.join(queue_names)}")
         print(f"🔄 Press Ctrl+C to stop\n")
 
         # Create queues
-        queues = [Queue(name, connection=redis_conn) for name in queue_names]
+        queues = [Queue(name, connection=redis_conn, serializer=JobSerializer) for name in queue_names]
 
         # Start worker
         with Connection(redis_conn):
-            worker = Worker(queues, connection=redis_conn)
-            worker.work()
+            worker = WeightedWorker(queues, connection=redis_conn, serializer=JobSerializer)
+            worker.lane_weights = lane_weights
+            worker.work(with_scheduler=True)
 
 if __name__ == '__main__':
     main()